@@ -0,0 +1,282 @@
+# backend/analytics.py
+"""
+Ad-hoc grouped aggregates for /api/analytics (group by keyword / source / country /
+label, optional time bucket). Every backend only produces six sums per group
+(n, score sum, score sum of squares, pos, neu, neg); avg/std/shares are derived
+from those, so results match across:
+
+- rollups: SQL GROUP BY over post_rollups (default; O(buckets), covers archived periods)
+- posts:   SQL GROUP BY over raw posts (needed for label grouping)
+- duckdb:  the same aggregate over the Parquet export, vectorized (optional: duckdb + pyarrow)
+
+export_parquet() keeps the Parquet copy current incrementally: one file per
+(day, keyword), rewritten only when that day's rollup totals changed.
+CLI:  python analytics.py export
+"""
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from db_async import sync_read
+from models import Post, PostRollup
+from queries import cutoff_for
+from retention import retention_horizon
+from rollups import hour_floor
+from settings import ANALYTICS_MAX_GROUPS, ANALYTICS_PARQUET_DIR
+
+try:
+    import duckdb
+except Exception:
+    duckdb = None
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except Exception:
+    pa = pq = None
+
+GROUP_KEYS = ("keyword", "source", "country", "label")
+BUCKETS = ("none", "hour", "day", "week", "month")
+METRICS = ("n", "avg", "std", "pos", "neu", "neg", "pos_share", "neg_share")
+SOURCES = ("auto", "rollups", "posts")
+ENGINES = ("sql", "duckdb")
+
+_SUMS = ("n", "s", "sq", "pos", "neu", "neg")
+_BUCKET_FMT = {"hour": "%Y-%m-%dT%H:00:00", "day": "%Y-%m-%d", "week": "%Y-%m-%d", "month": "%Y-%m"}
+_STATE_FILE = "_export_state.json"
+_EXPORT_COLS = ("id", "keyword", "source", "country_code", "created_at", "sentiment_score", "sentiment_label")
+
+
+@dataclass
+class AnalyticsQuery:
+    keywords: List[str]
+    hours: int
+    group_by: List[str]
+    metrics: List[str]
+    bucket: str = "none"
+    source: str = "auto"
+
+    @property
+    def keys(self) -> List[str]:
+        return self.group_by + (["bucket"] if self.bucket != "none" else [])
+
+
+def _csv(value: Optional[str]) -> List[str]:
+    return [v.strip().lower() for v in (value or "").split(",") if v.strip()]
+
+
+def parse_query(q: Optional[str], hours: int, group_by: Optional[str], metrics: Optional[str],
+                bucket: str = "none", source: str = "auto") -> AnalyticsQuery:
+    """Validate request params against the whitelists; raises ValueError with a message for the client."""
+    keys, mets = _csv(group_by), _csv(metrics) or ["n", "avg"]
+    bad = [k for k in keys if k not in GROUP_KEYS] + [m for m in mets if m not in METRICS]
+    if bad:
+        raise ValueError(f"Unknown group_by/metrics: {', '.join(bad)}")
+    if bucket not in BUCKETS:
+        raise ValueError(f"bucket must be one of {', '.join(BUCKETS)}")
+    if source not in SOURCES:
+        raise ValueError(f"source must be one of {', '.join(SOURCES)}")
+    if source == "rollups" and "label" in keys:
+        raise ValueError("label grouping needs source=posts (rollups only keep label counts)")
+    if source == "auto":
+        source = "posts" if "label" in keys else "rollups"
+    return AnalyticsQuery(_csv(q), max(1, int(hours)), list(dict.fromkeys(keys)), mets, bucket, source)
+
+
+def _label_case(col):
+    return case((col.like("pos%"), "positive"), (col.like("neg%"), "negative"), else_="neutral")
+
+
+def _bucket_expr(col, bucket: str, dialect: str):
+    if dialect == "sqlite":
+        if bucket == "week":
+            return func.date(col, "weekday 0", "-6 days")  # Monday of the week
+        return func.strftime(_BUCKET_FMT[bucket], col)
+    return func.date_trunc(bucket, col)
+
+
+def _sql_stmt(query: AnalyticsQuery, dialect: str):
+    if query.source == "rollups":
+        cols = {"keyword": PostRollup.keyword, "source": PostRollup.source, "country": PostRollup.country_code}
+        sums = [func.sum(PostRollup.n), func.sum(PostRollup.score_sum), func.sum(PostRollup.score_sq_sum),
+                func.sum(PostRollup.pos), func.sum(PostRollup.neu), func.sum(PostRollup.neg)]
+        ts, since, kw_col = PostRollup.bucket, hour_floor(cutoff_for(query.hours)), PostRollup.keyword
+    else:
+        label = _label_case(Post.sentiment_label)
+        score = func.coalesce(Post.sentiment_score, 0.0)
+        cols = {"keyword": Post.keyword, "source": Post.source, "country": Post.country_code, "label": label}
+        sums = [func.count(), func.sum(score), func.sum(score * score),
+                func.sum(case((label == "positive", 1), else_=0)),
+                func.sum(case((label == "neutral", 1), else_=0)),
+                func.sum(case((label == "negative", 1), else_=0))]
+        ts, since, kw_col = Post.created_at, cutoff_for(query.hours), Post.keyword
+    keys = [cols[k].label(k) for k in query.group_by]
+    if query.bucket != "none":
+        keys.append(_bucket_expr(ts, query.bucket, dialect).label("bucket"))
+    stmt = select(*keys, *[s.label(n) for s, n in zip(sums, _SUMS)]).where(ts >= since)
+    if query.keywords:
+        stmt = stmt.where(kw_col.in_(query.keywords))
+    if keys:
+        stmt = stmt.group_by(*keys).order_by(*keys)
+    return stmt.limit(ANALYTICS_MAX_GROUPS)
+
+
+def _duckdb_sql(query: AnalyticsQuery, parquet_dir: str) -> Tuple[str, List[Any]]:
+    label = ("CASE WHEN sentiment_label LIKE 'pos%' THEN 'positive' "
+             "WHEN sentiment_label LIKE 'neg%' THEN 'negative' ELSE 'neutral' END")
+    cols = {"keyword": "keyword", "source": "source", "country": "country_code", "label": label}
+    keys = [f"{cols[k]} AS {k}" for k in query.group_by]
+    if query.bucket != "none":
+        keys.append(f"date_trunc('{query.bucket}', created_at) AS bucket")
+    score = "coalesce(sentiment_score, 0.0)"
+    sums = [
+        "count(*) AS n", f"sum({score}) AS s", f"sum({score} * {score}) AS sq",
+        f"sum(CASE WHEN ({label}) = 'positive' THEN 1 ELSE 0 END) AS pos",
+        f"sum(CASE WHEN ({label}) = 'neutral' THEN 1 ELSE 0 END) AS neu",
+        f"sum(CASE WHEN ({label}) = 'negative' THEN 1 ELSE 0 END) AS neg",
+    ]
+    params: List[Any] = [os.path.join(parquet_dir, "*", "*.parquet"), cutoff_for(query.hours).replace(tzinfo=None)]
+    sql = (f"SELECT {', '.join(keys + sums)} "
+           "FROM read_parquet(?, hive_partitioning = true, union_by_name = true) "
+           "WHERE created_at >= ?")
+    if query.keywords:
+        sql += f" AND keyword IN ({', '.join('?' for _ in query.keywords)})"
+        params += query.keywords
+    if keys:
+        order = ", ".join(str(i + 1) for i in range(len(keys)))
+        sql += f" GROUP BY {order} ORDER BY {order}"
+    return sql + f" LIMIT {int(ANALYTICS_MAX_GROUPS)}", params
+
+
+def _fmt_key(name: str, value: Any, bucket: str) -> Any:
+    if name == "bucket" and isinstance(value, datetime):
+        return value.strftime(_BUCKET_FMT[bucket])
+    if name in ("source", "country") and value == "":
+        return None  # rollups store unknown as ""
+    return value
+
+
+def _finish(query: AnalyticsQuery, rows: Sequence[Sequence[Any]]) -> List[Dict[str, Any]]:
+    """(keys..., six sums) rows -> [{keys..., requested metrics...}]."""
+    out = []
+    nk = len(query.keys)
+    for row in rows:
+        n, s, sq, pos, neu, neg = [v or 0 for v in row[nk:]]
+        if n <= 0:
+            continue
+        mean = s / n
+        derived = {
+            "n": int(n), "avg": mean, "std": max(0.0, sq / n - mean * mean) ** 0.5,
+            "pos": int(pos), "neu": int(neu), "neg": int(neg),
+            "pos_share": pos / n, "neg_share": neg / n,
+        }
+        item = {k: _fmt_key(k, v, query.bucket) for k, v in zip(query.keys, row[:nk])}
+        item.update({m: derived[m] for m in query.metrics})
+        out.append(item)
+    # backends disagree on where NULLs sort; unknown ("" / NULL) goes first everywhere
+    out.sort(key=lambda it: [(it[k] is not None, it[k] if it[k] is not None else "") for k in query.keys])
+    return out
+
+
+def run_sql(sess: Session, query: AnalyticsQuery) -> List[Dict[str, Any]]:
+    stmt = _sql_stmt(query, sess.get_bind().dialect.name)
+    return _finish(query, sess.execute(stmt).all())
+
+
+def run_duckdb(query: AnalyticsQuery, parquet_dir: str = ANALYTICS_PARQUET_DIR) -> List[Dict[str, Any]]:
+    """Same aggregate over the Parquet export (raw posts, so label grouping works)."""
+    if duckdb is None:
+        raise RuntimeError("duckdb is not installed")
+    if not os.path.isdir(parquet_dir) or not any(d.startswith("day=") for d in os.listdir(parquet_dir)):
+        raise RuntimeError("no Parquet export yet; run `python analytics.py export`")
+    sql, params = _duckdb_sql(query, parquet_dir)
+    con = duckdb.connect()
+    try:
+        return _finish(query, con.execute(sql, params).fetchall())
+    finally:
+        con.close()
+
+
+# ---------------------------
+# Parquet export
+# ---------------------------
+def _day_totals(sess: Session) -> Dict[str, List[float]]:
+    """Signature per (keyword, day) from rollups; a change means that day's posts changed."""
+    day = _bucket_expr(PostRollup.bucket, "day", sess.get_bind().dialect.name)
+    stmt = (
+        select(PostRollup.keyword, day.label("day"), func.sum(PostRollup.n), func.sum(PostRollup.score_sum),
+               func.sum(PostRollup.pos), func.sum(PostRollup.neg))
+        .group_by(PostRollup.keyword, day)
+    )
+    out = {}
+    for kw, d, n, s, pos, neg in sess.execute(stmt):
+        d = d.strftime("%Y-%m-%d") if isinstance(d, datetime) else str(d)
+        out[f"{kw}\x1f{d}"] = [int(n or 0), round(float(s or 0.0), 6), int(pos or 0), int(neg or 0)]
+    return out
+
+
+def _part_path(out_dir: str, day: str, keyword: str) -> str:
+    return os.path.join(out_dir, f"day={day}", hashlib.sha1(keyword.encode("utf-8")).hexdigest()[:16] + ".parquet")
+
+
+def _part_rows(sess: Session, kw: str, start: datetime) -> List[Any]:
+    cols = [getattr(Post, c) for c in _EXPORT_COLS]
+    return sess.execute(
+        select(*cols).where(Post.keyword == kw, Post.created_at >= start, Post.created_at < start + timedelta(days=1))
+    ).all()
+
+
+def export_parquet(out_dir: str = ANALYTICS_PARQUET_DIR) -> Dict[str, int]:
+    """
+    Write posts as Parquet under out_dir/day=YYYY-MM-DD/<keyword hash>.parquet, skipping
+    (keyword, day) parts whose rollup totals match the last export. Days at or past the
+    retention horizon are left as exported (their raw posts are archived).
+    The totals and each part are read in their own short read session, so no snapshot
+    stays open while files are written. A part that changes after the totals were read
+    is exported with its newer rows and rewritten again on the next run.
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed")
+    os.makedirs(out_dir, exist_ok=True)
+    state_path = os.path.join(out_dir, _STATE_FILE)
+    state: Dict[str, List[float]] = {}
+    if os.path.exists(state_path):
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    horizon = retention_horizon()
+    horizon = horizon.replace(tzinfo=None) if horizon else None
+    written = skipped = 0
+    for key, sig in sync_read(_day_totals).items():
+        if state.get(key) == sig:
+            skipped += 1
+            continue
+        kw, day = key.split("\x1f")
+        start = datetime.strptime(day, "%Y-%m-%d")
+        if horizon is not None and start < horizon:
+            continue
+        rows = sync_read(_part_rows, kw, start)
+        path = _part_path(out_dir, day, kw)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        table = pa.table({c: [r[i] for r in rows] for i, c in enumerate(_EXPORT_COLS)})
+        pq.write_table(table, path + ".tmp", compression="zstd")
+        os.replace(path + ".tmp", path)  # readers never see a half-written part
+        state[key] = sig
+        written += 1
+    with open(state_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(state_path + ".tmp", state_path)
+    return {"written": written, "unchanged": skipped}
+
+
+if __name__ == "__main__":
+    import sys
+    from models import init_db
+    if sys.argv[1:] != ["export"]:
+        sys.exit("usage: python analytics.py export")
+    init_db()
+    print("[analytics][export]", export_parquet())
@@ -1,10 +1,14 @@
 # backend/app.py
-from datetime import datetime, timedelta, timezone
-from typing import List
+import base64
+import json
+import time
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
 
-from fastapi import FastAPI, Query, HTTPException
+from fastapi import FastAPI, Query, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import func
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
 # add near other imports
 from fastapi import Body
@@ -12,23 +16,66 @@ from gemini_chat import chat_reply
 from typing import Dict, Any
 
 
-from models import init_db, SessionLocal, Post
-from ingest import (
-    ingest_sample,
-    ingest_live,
-    iter_youtube_live,
-    iter_news_newsapi,
+import analytics
+import fulltext
+from db_async import dispose as dispose_async_db, run_read, sync_read
+from dedup import dedup_index
+from fetch_async import ASYNC_LIVE_FETCHERS, aclose as aclose_http
+from heuristics import window_insights
+from llm_gateway import gateway as llm_gateway
+from metrics import MetricsMiddleware, registry, timed
+from models import init_db
+from queries import (
+    POST_FIELDS,
+    cutoff_for,
+    recent_posts_stmt,
+    search_page_stmt,
+    window_count_stmt,
+    window_version_stmt,
+)
+from rollups import geo_from_rollups, geo_from_rollups_many, timeseries, timeseries_many
+from ingest import ingest_chunk, ingest_sample, parse_sources
+from response_cache import ResponseCache
+from retention import retention_job
+from retrieval import retrieval_index
+from scheduler import scheduler
+from sentiment_cache import sentiment_cache
+from upstream import UpstreamBusy, upstream
+from watermarks import load_all as load_watermarks, save as save_watermarks
+from settings import (
+    COMPARE_MAX_KEYWORDS,
+    INGEST_PERIODIC_REFRESH,
+    INSIGHTS_CACHE_MAX_ITEMS,
+    INSIGHTS_CACHE_PERSIST,
+    INSIGHTS_CACHE_TTL_SEC,
+    INSIGHTS_FALLBACK_TTL_SEC,
+    METRICS_ENABLED,
+    SEARCH_DEFAULT_LIMIT,
+    SEARCH_MAX_LIMIT,
+    STREAM_BATCH_SIZE,
 )
 # Optional insights (Gemini summarization)
 try:
-    from gemini_helper import summarize_posts
+    from gemini_helper import HEURISTIC, insights_model, summarize_posts
     _HAS_INSIGHTS = True
 except Exception:
     _HAS_INSIGHTS = False
 
 # --- init ---
 init_db()
-app = FastAPI(title="GlobalInsights API")
+insights_cache = ResponseCache("insights", INSIGHTS_CACHE_TTL_SEC, INSIGHTS_CACHE_MAX_ITEMS,
+                               persist=INSIGHTS_CACHE_PERSIST)
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse that books its encoding time under the "serialize" stage."""
+
+    def render(self, content: Any) -> bytes:
+        with timed("serialize"):
+            return super().render(content)
+
+
+app = FastAPI(title="GlobalInsights API", default_response_class=TimedJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -36,120 +83,443 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+
+def _cache_metrics():
+    """Scrape-time collector: cache and LLM gateway counters as Prometheus families."""
+    events, sizes = [], []
+    for name, st in (("insights", insights_cache.stats()), ("sentiment", sentiment_cache.stats())):
+        for k, v in st.items():
+            if k in ("mem_items", "inflight"):
+                sizes.append(({"cache": name, "kind": k}, v))
+            elif k not in ("hit_ratio", "saved_sec"):
+                events.append(({"cache": name, "event": k}, v))
+    dd = dedup_index.stats()
+    events += [({"cache": "dedup", "event": k}, dd[k]) for k in ("checked", "dropped")]
+    sizes.append(({"cache": "dedup", "kind": "signatures"}, dd["signatures"]))
+    yield ("gi_cache_events_total", "counter", "Cache lookups and outcomes since start", events)
+    yield ("gi_cache_items", "gauge", "Entries held in memory per cache", sizes)
+
+    llm = llm_gateway.stats()["models"]
+    yield ("gi_llm_events_total", "counter", "LLM gateway events per model (requests, retries, rejections, ...)",
+           [({"model": m, "event": k}, v) for m, st in llm.items() for k, v in st.items()
+            if isinstance(v, (int, float)) and not k.endswith(("_sec", "_ms")) and k not in ("in_flight", "breaker_trips")])
+    yield ("gi_llm_breaker_trips_total", "counter", "Times the model's circuit breaker opened",
+           [({"model": m}, st["breaker_trips"]) for m, st in llm.items()])
+    yield ("gi_llm_in_flight", "gauge", "LLM calls currently running per model",
+           [({"model": m}, st["in_flight"]) for m, st in llm.items()])
+    yield ("gi_llm_breaker_open", "gauge", "1 while the model's circuit breaker rejects calls",
+           [({"model": m}, 1 if st["breaker"] == "open" else 0) for m, st in llm.items()])
+
+
+registry.add_collector(_cache_metrics)
+
+@app.on_event("startup")
+def _start_scheduler():
+    scheduler.start(periodic=INGEST_PERIODIC_REFRESH)
+    retention_job.start()
+
+@app.on_event("shutdown")
+async def _stop_scheduler():
+    scheduler.stop()
+    retention_job.stop()
+    upstream.shutdown()
+    await aclose_http()
+    await dispose_async_db()
 
 def normalize_keyword(q: str) -> str:
     return (q or "").strip().lower()
 
+def _parse_fields(fields: Optional[str]) -> List[str]:
+    if not fields:
+        return list(POST_FIELDS)
+    cols = [f.strip() for f in fields.split(",") if f.strip()]
+    bad = [c for c in cols if c not in POST_FIELDS]
+    if bad:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(bad)}")
+    return cols
+
+def _encode_cursor(created_at: datetime, post_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), post_id])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        ts, post_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(ts), str(post_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _encode_offset_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"offset": offset}).encode("utf-8")).decode("ascii")
+
+def _decode_offset_cursor(cursor: str) -> int:
+    try:
+        offset = int(json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))["offset"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return offset
+
+async def _upstream(fn, *args, **kwargs):
+    """Run slow blocking work (ingest, LLM calls) on the bounded upstream pool."""
+    try:
+        return await upstream.run(fn, *args, **kwargs)
+    except UpstreamBusy:
+        raise HTTPException(status_code=503, detail="Server busy with upstream work; retry shortly")
+
+def _recent_post_dicts(sess, kw: str, cutoff: datetime) -> List[dict]:
+    """Newest 120 posts of the window as plain dicts (Gemini insights context)."""
+    rows = sess.execute(recent_posts_stmt(kw, cutoff, limit=120)).scalars().all()
+    return [{
+        "text": r.text,
+        "sentiment_label": r.sentiment_label,
+        "sentiment_score": r.sentiment_score,
+        "created_at": r.created_at.isoformat(),
+        "source": r.source,
+        "country_code": r.country_code,
+    } for r in rows]
+
 # --- routes ---
 
+async def _fulltext_search(q: str, hours: int, limit: int, cursor: Optional[str], cols: List[str]) -> dict:
+    """Ranked matches over every stored post (any keyword); never triggers an upstream fetch."""
+    clauses = fulltext.parse_query(q)
+    if not clauses:
+        raise HTTPException(status_code=400, detail="Query has no searchable terms")
+    offset = _decode_offset_cursor(cursor) if cursor else 0
+    cutoff = cutoff_for(hours)
+
+    def read(sess):
+        conn = sess.connection()
+        if not fulltext.index_available(conn):
+            return None
+        dialect = conn.dialect.name
+        rows = sess.execute(fulltext.search_stmt(dialect, clauses, cutoff, limit + 1, offset, fields=cols)).all()
+        total = sess.execute(fulltext.count_stmt(dialect, clauses, cutoff)).scalar() if cursor is None else None
+        return rows, total
+
+    found = await run_read(read)
+    if found is None:
+        raise HTTPException(status_code=503, detail="Full-text index is not available on this database")
+    rows, total = found
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "keyword": normalize_keyword(q),
+        "mode": "fulltext",
+        "count": len(rows),
+        "total": total,
+        "next_cursor": _encode_offset_cursor(offset + limit) if has_more else None,
+        "posts": [
+            {
+                **{c: (r.created_at.isoformat() if c == "created_at" else getattr(r, c)) for c in cols},
+                "keyword": r.keyword,
+                "score": round(float(r.score or 0), 6),
+            }
+            for r in rows
+        ],
+    }
+
 @app.get("/api/search")
-def search(
-    q: str = Query(..., description="Search keyword"),
+async def search(
+    q: str = Query(..., description="Search keyword (mode=fulltext: terms, \"phrases\", prefix*)"),
     hours: int = 24,
     use_sample: bool = False,
     sources: str = "youtube,news",
     engine: str = Query("auto", description="Sentiment engine: gemini|vader|auto"),
+    refresh: bool = Query(False, description="Enqueue a background refresh for this keyword"),
+    limit: int = Query(SEARCH_DEFAULT_LIMIT, ge=1, le=SEARCH_MAX_LIMIT, description="Posts per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated post fields to return (default: all)"),
+    mode: str = Query("keyword", description="keyword | fulltext"),
 ):
     """
-    Ingest (sample or live) + return recent posts for keyword.
+    Return recent posts for keyword straight from the DB.
+    - mode=fulltext -> ranked full-text matches over all stored posts, whatever keyword
+      they were ingested under (see fulltext.py for the query syntax); no upstream fetch,
+      use_sample/sources/engine/refresh are ignored
     - use_sample=true -> loads backend/sample_data.json (kept in DB for reuse)
-    - live: pulls from YouTube comments and/or NewsAPI articles, then stores in DB
+    - live: the keyword is tracked by the background scheduler, which queues refresh jobs
+      (YouTube comments and/or NewsAPI articles) on an interval; API threads or worker.py run them
+    - refresh=true -> enqueue a refresh job now (first search of a keyword does this too);
+      the response carries job_id and returns without waiting for it
     - hours: time window for what to return from DB
     - engine: 'gemini' | 'vader' | 'auto' (auto uses env default w/ fallback)
+    - limit/cursor: keyset pages ordered newest first; pass next_cursor back for the next page
+      (total is only computed for the first page)
+    - fields: e.g. fields=id,text,sentiment_label to skip columns the client doesn't render
     """
+    if mode not in ("keyword", "fulltext"):
+        raise HTTPException(status_code=400, detail="mode must be keyword or fulltext")
+    cols = _parse_fields(fields)
+    if mode == "fulltext":
+        return await _fulltext_search(q, hours, limit, cursor, cols)
     kw = normalize_keyword(q)
-    sess = SessionLocal()
+    after = _decode_cursor(cursor) if cursor else None
+    job = None
 
     if use_sample:
-        ingest_sample(kw, engine_choice=engine)
+        await _upstream(ingest_sample, kw, engine_choice=engine)
     else:
-        srcs = [s.strip().lower() for s in (sources or "").split(",") if s.strip()]
-        items = []
-        if "youtube" in srcs:
-            items.extend(iter_youtube_live(kw))
-        if "news" in srcs:
-            items.extend(iter_news_newsapi(kw, page_size=30))
-        if items:
-            ingest_live(kw, items, engine_choice=engine)
-
-    cutoff = datetime.now(timezone.utc) - timedelta(hours=hours)
-    rows: List[Post] = (
-        sess.query(Post)
-        .filter(Post.keyword == kw, Post.created_at >= cutoff)
-        .order_by(Post.created_at.desc())
-        .all()
-    )
-    sess.close()
+        srcs = parse_sources(sources)
+        is_new = scheduler.track(kw, srcs, engine)
+        if srcs and (refresh or is_new):
+            job = await run_in_threadpool(scheduler.enqueue, kw, srcs, engine)
+
+    cutoff = cutoff_for(hours)
+
+    def read(sess):
+        rows = sess.execute(search_page_stmt(kw, cutoff, limit + 1, after=after, fields=cols)).all()
+        total = sess.execute(window_count_stmt(kw, cutoff)).scalar() if cursor is None else None
+        return rows, total
 
+    rows, total = await run_read(read)
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    refreshed_at = scheduler.freshness(kw)
     return {
         "keyword": kw,
+        "mode": "keyword",
         "engine_used": engine,
+        "job_id": job["id"] if job else None,
+        "job_status": job["status"] if job else None,
+        "refreshed_at": refreshed_at.isoformat() if refreshed_at else None,
         "count": len(rows),
+        "total": total,
+        "next_cursor": _encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None,
         "posts": [
             {
-                "id": r.id,
-                "source": r.source,
-                "author": r.author,
-                "text": r.text,
-                "created_at": r.created_at.isoformat(),
-                "sentiment_score": r.sentiment_score,
-                "sentiment_label": r.sentiment_label,
-                "country_code": r.country_code,
+                c: (r.created_at.isoformat() if c == "created_at" else getattr(r, c))
+                for c in cols
             }
             for r in rows
         ],
     }
 
+async def _achunks(items: AsyncIterator[dict], size: int) -> AsyncIterator[List[dict]]:
+    chunk: List[dict] = []
+    async for it in items:
+        chunk.append(it)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+async def _stream_events(kw: str, srcs: List[str], engine: str) -> AsyncIterator[dict]:
+    """
+    Fetch (async) -> score + store (upstream pool) chunk by chunk, yielding each post once committed.
+    Each source fetches only what is new since its watermark, which advances once the source is done.
+    """
+    started = time.perf_counter()
+    totals = {"stored": 0, "inserted": 0, "updated": 0}
+    yield {"type": "start", "keyword": kw, "sources": srcs, "engine": engine}
+    for src in srcs:
+        fetch = ASYNC_LIVE_FETCHERS.get(src)
+        if fetch is None:
+            yield {"type": "progress", "source": src, "status": "skipped", "reason": "unknown source"}
+            continue
+        yield {"type": "progress", "source": src, "status": "started"}
+        stored, status, error = 0, "done", None
+        try:
+            wm = (await upstream.run(load_watermarks, kw, [src]))[src]
+            async for chunk in _achunks(fetch(kw, wm), STREAM_BATCH_SIZE):
+                rows, ins, upd = await upstream.run(ingest_chunk, kw, chunk, engine)
+                stored += len(rows)
+                totals["inserted"] += ins
+                totals["updated"] += upd
+                for r in rows:
+                    yield {"type": "post", "post": {**r, "created_at": r["created_at"].isoformat()}}
+                yield {"type": "progress", "source": src, "status": "running", "stored": stored}
+            await upstream.run(save_watermarks, wm)
+        except Exception as e:
+            print("[stream][source-error]", src, repr(e))
+            status, error = "error", repr(e)
+        totals["stored"] += stored
+        yield {"type": "progress", "source": src, "status": status, "stored": stored,
+               **({"error": error} if error else {})}
+    yield {
+        "type": "summary",
+        "keyword": kw,
+        **totals,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000),
+    }
+
+@app.get("/api/search/stream")
+async def search_stream(
+    q: str = Query(..., description="Search keyword"),
+    sources: str = "youtube,news",
+    engine: str = Query("auto", description="Sentiment engine: gemini|vader|auto"),
+    format: str = Query("ndjson", description="ndjson | sse"),
+):
+    """
+    Live ingest that streams results while it runs instead of returning at the end.
+    Events (one JSON object each): start, progress (per source), post, summary.
+    - format=ndjson -> application/x-ndjson, one event per line
+    - format=sse    -> text/event-stream, `event: <type>` + `data: <json>`
+    """
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be ndjson or sse")
+    kw = normalize_keyword(q)
+    srcs = parse_sources(sources)
+    scheduler.track(kw, srcs, engine)  # keep it fresh afterwards too
+
+    async def body():
+        async for ev in _stream_events(kw, srcs, engine):
+            data = json.dumps(ev, ensure_ascii=False)
+            yield f"event: {ev['type']}\ndata: {data}\n\n" if format == "sse" else data + "\n"
+
+    media = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media, headers={"Cache-Control": "no-cache"})
+
 @app.get("/api/geo")
-def geo(q: str, hours: int = 24):
+async def geo(q: str, hours: int = 24):
     """
-    Aggregate by country for the keyword within the time window.
+    Aggregate by country for the keyword within the time window (served from post_rollups).
     Returns: [{ cc: ISO2, n: count, avg: avg_compound_score }, ...]
     """
     kw = normalize_keyword(q)
-    cutoff = datetime.now(timezone.utc) - timedelta(hours=hours)
-    sess = SessionLocal()
-
-    agg = (
-        sess.query(
-            Post.country_code.label("cc"),
-            func.count(Post.id).label("n"),
-            func.avg(Post.sentiment_score).label("avg"),
-        )
-        .filter(
-            Post.keyword == kw,
-            Post.created_at >= cutoff,
-            Post.country_code.isnot(None),
-        )
-        .group_by(Post.country_code)
-        .all()
-    )
-    sess.close()
+    countries = await run_read(geo_from_rollups, kw, cutoff_for(hours))
 
     return {
         "keyword": kw,
         "hours": hours,
-        "countries": [
-            {"cc": row.cc, "n": int(row.n), "avg": float(row.avg)} for row in agg
-        ],
+        "countries": countries,
     }
 
+@app.get("/api/timeseries")
+async def timeseries_api(q: str, hours: int = 24, bucket: str = "hour", cc: Optional[str] = None):
+    """
+    Sentiment over time from the hourly rollups.
+    - bucket: 'hour' | 'day' (UTC)
+    - cc: optional ISO2 country filter
+    Returns: { points: [{ t, n, avg, std, pos, neu, neg }, ...] }
+    """
+    if bucket not in ("hour", "day"):
+        raise HTTPException(status_code=400, detail="bucket must be hour or day")
+    kw = normalize_keyword(q)
+    points = await run_read(timeseries, kw, cutoff_for(hours), bucket=bucket, cc=(cc or "").upper() or None)
+    return {"keyword": kw, "hours": hours, "bucket": bucket, "cc": cc, "points": points}
+
+def _series_totals(points: List[dict]) -> dict:
+    n = sum(p["n"] for p in points)
+    return {
+        "n": n,
+        "avg": sum(p["avg"] * p["n"] for p in points) / n if n else None,
+        **{k: sum(p[k] for p in points) for k in ("pos", "neu", "neg")},
+    }
+
+@app.get("/api/compare")
+async def compare(
+    q: str = Query(..., description="Comma-separated keywords"),
+    hours: int = 24,
+    bucket: str = "hour",
+    sources: str = "youtube,news",
+    engine: str = Query("auto", description="Sentiment engine for refresh jobs: gemini|vader|auto"),
+    refresh: bool = False,
+):
+    """
+    Side-by-side geo + time series for several keywords in one round trip: one grouped
+    rollup query per metric for all of them (WHERE keyword IN (...) GROUP BY keyword, ...).
+    Keywords are tracked like /api/search; new ones (all with refresh=true) get a refresh
+    job each, which the ingest workers run concurrently. The response doesn't wait for them.
+    Returns: { keywords, jobs: {kw: {id, status}}, results: [{ keyword, refreshed_at,
+    totals: {n, avg, pos, neu, neg}, countries: [...], points: [...] }, ...] }
+    """
+    if bucket not in ("hour", "day"):
+        raise HTTPException(status_code=400, detail="bucket must be hour or day")
+    kws = list(dict.fromkeys(k for k in map(normalize_keyword, (q or "").split(",")) if k))
+    if not kws:
+        raise HTTPException(status_code=400, detail="q needs at least one keyword")
+    if len(kws) > COMPARE_MAX_KEYWORDS:
+        raise HTTPException(status_code=400, detail=f"at most {COMPARE_MAX_KEYWORDS} keywords")
+    srcs = parse_sources(sources)
+    due = [kw for kw in kws if scheduler.track(kw, srcs, engine) or refresh]
+    jobs = {}
+    if srcs and due:
+        enqueued = await run_in_threadpool(lambda: [scheduler.enqueue(kw, srcs, engine) for kw in due])
+        jobs = {j["keyword"]: {"id": j["id"], "status": j["status"]} for j in enqueued}
+
+    cutoff = cutoff_for(hours)
+
+    def read(sess):
+        return geo_from_rollups_many(sess, kws, cutoff), timeseries_many(sess, kws, cutoff, bucket=bucket)
+
+    geo_by_kw, series_by_kw = await run_read(read)
+    results = []
+    for kw in kws:
+        refreshed_at = scheduler.freshness(kw)
+        results.append({
+            "keyword": kw,
+            "refreshed_at": refreshed_at.isoformat() if refreshed_at else None,
+            "totals": _series_totals(series_by_kw[kw]),
+            "countries": geo_by_kw[kw],
+            "points": series_by_kw[kw],
+        })
+    return {"keywords": kws, "hours": hours, "bucket": bucket, "jobs": jobs, "results": results}
+
+@app.get("/api/analytics")
+async def analytics_api(
+    q: Optional[str] = Query(None, description="Comma-separated keywords (default: all)"),
+    hours: int = 24 * 30,
+    group_by: Optional[str] = Query(None, description="Comma-separated: keyword,source,country,label"),
+    metrics: Optional[str] = Query(None, description="Comma-separated: n,avg,std,pos,neu,neg,pos_share,neg_share"),
+    bucket: str = Query("none", description="none | hour | day | week | month (UTC)"),
+    source: str = Query("auto", description="auto | rollups | posts"),
+    engine: str = Query("sql", description="sql | duckdb (reads the Parquet export)"),
+):
+    """
+    Grouped sentiment aggregates for ad-hoc slicing.
+    Returns: { rows: [{ <group keys>, bucket?, <metrics> }, ...], source, engine, elapsed_ms }
+    """
+    try:
+        spec = analytics.parse_query(q, hours, group_by, metrics, bucket, source)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if engine not in analytics.ENGINES:
+        raise HTTPException(status_code=400, detail="engine must be sql or duckdb")
+    started = time.perf_counter()
+    if engine == "duckdb":
+        try:
+            rows = await _upstream(analytics.run_duckdb, spec)
+        except RuntimeError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        src = "parquet"
+    else:
+        rows = await run_read(analytics.run_sql, spec)
+        src = spec.source
+    return {
+        "keywords": spec.keywords,
+        "hours": spec.hours,
+        "group_by": spec.group_by,
+        "bucket": spec.bucket,
+        "metrics": spec.metrics,
+        "source": src,
+        "engine": engine,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        "rows": rows,
+    }
+
+@app.post("/api/analytics/export")
+async def analytics_export():
+    """Bring the Parquet copy used by engine=duckdb up to date (incremental)."""
+    try:
+        return await _upstream(analytics.export_parquet)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
 @app.get("/api/insights")
-def insights(q: str, hours: int = 24):
+async def insights(q: str, response: Response, hours: int = 24):
     kw = (q or "").strip().lower()
-    cutoff = datetime.now(timezone.utc) - timedelta(hours=hours)
-
-    sess = SessionLocal()
-    rows = (
-        sess.query(Post)
-        .filter(Post.keyword == kw, Post.created_at >= cutoff)
-        .order_by(Post.created_at.desc())
-        .limit(120)
-        .all()
-    )
-    sess.close()
-
-    if not rows:
+    cutoff = cutoff_for(hours)
+    latest, n = await run_read(lambda sess: tuple(sess.execute(window_version_stmt(kw, cutoff)).one()))
+
+    if not n:
         # Return 200 + empty insights (frontend can still render a friendly message)
         return {
             "summary": "No recent posts to summarize for this window.",
@@ -158,18 +528,30 @@ def insights(q: str, hours: int = 24):
             "quotes": []
         }
 
-    posts = [{
-        "text": r.text,
-        "sentiment_label": r.sentiment_label,
-        "sentiment_score": r.sentiment_score,
-        "created_at": r.created_at.isoformat(),
-        "source": r.source,
-        "country_code": r.country_code,
-    } for r in rows]
+    model = insights_model()
+
+    def compute():
+        # heuristics cover the whole window; Gemini gets the newest 120 as context. Each read
+        # has its own short session: none stays open across the LLM call
+        fallback = lambda: sync_read(window_insights, kw, cutoff)
+        if model == HEURISTIC:
+            return fallback(), HEURISTIC
+        posts = sync_read(_recent_post_dicts, kw, cutoff)
+        return summarize_posts(kw, posts, fallback=fallback)
 
     try:
-        result = summarize_posts(kw, posts)
+        # same keyword/window/model and unchanged posts -> same answer; skip the LLM call.
+        # A heuristic stand-in for a failed Gemini call is only kept briefly
+        key = (kw, hours, model, latest.isoformat(), n)
+        (result, answered_by), status = await insights_cache.get_or_compute(
+            key, compute, run=_upstream,
+            ttl_of=lambda v: INSIGHTS_CACHE_TTL_SEC if v[1] == model else INSIGHTS_FALLBACK_TTL_SEC,
+        )
+        response.headers["X-Cache"] = status
+        response.headers["X-Insights-Model"] = answered_by
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         print("[insights][route-error]", repr(e))
         return {
@@ -180,7 +562,7 @@ def insights(q: str, hours: int = 24):
         }
 
 @app.post("/api/chat")
-def chat_api(
+async def chat_api(
     q: str,
     hours: int = 168,
     payload: Dict[str, Any] = Body(default={}),
@@ -194,30 +576,38 @@ def chat_api(
     msg = (payload or {}).get("message") or ""
     history = (payload or {}).get("history") or []
 
-    cutoff = datetime.now(timezone.utc) - timedelta(hours=hours)
-    sess = SessionLocal()
-    rows = (
-        sess.query(Post)
-        .filter(Post.keyword == keyword, Post.created_at >= cutoff)
-        .order_by(Post.created_at.desc())
-        .limit(120)
-        .all()
-    )
-    sess.close()
-
-    posts = [{
-        "text": r.text,
-        "sentiment_label": r.sentiment_label,
-        "sentiment_score": r.sentiment_score,
-        "created_at": r.created_at.isoformat(),
-        "source": r.source,
-        "country_code": r.country_code,
-    } for r in rows]
-
-    reply = chat_reply(keyword, posts, history, msg)
+    # BM25 over the whole window picks the evidence for this question (not just the newest posts)
+    ctx = await run_read(retrieval_index.select_context, keyword, cutoff_for(hours), msg, history)
+    reply = await _upstream(chat_reply, keyword, ctx["posts"], history, msg, ctx["stats"])
     return {"reply": reply}
 
 
+@app.get("/api/jobs/{job_id}")
+async def job_status(job_id: str):
+    """Poll a background refresh job enqueued by /api/search?refresh=true."""
+    job = await run_in_threadpool(scheduler.job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Unknown job id")
+    return {
+        **job,
+        **{k: job[k].isoformat() for k in ("enqueued_at", "started_at", "finished_at") if job[k]},
+    }
+
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    return {"insights": insights_cache.stats(), "sentiment": sentiment_cache.stats(), "dedup": dedup_index.stats()}
+
+@app.get("/api/llm/stats")
+async def llm_stats():
+    """Per-model gateway counters: requests, retries, rate limiting, breaker state, latency."""
+    return llm_gateway.stats()
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition: request/stage/DB/upstream/LLM latency histograms and counters."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/api/health")
-def health():
+async def health():
     return {"ok": True}
@@ -0,0 +1,13 @@
+# backend/bench/__init__.py
+"""
+Reproducible benchmarks: a synthetic corpus generator (corpus.py), local stand-ins
+for YouTube, NewsAPI and Gemini (fakes.py) and the scenarios that drive the real
+code against them (scenarios.py). Run from backend/:
+
+    python -m bench run --size 10000 --out bench.json
+    python -m bench compare baseline.json bench.json
+    python -m bench fakes                 # stand-ins only, for a dev server
+    python -m bench corpus --size 1000    # JSONL posts on stdout
+
+See `python -m bench run --help` for scenarios and knobs.
+"""
@@ -0,0 +1,238 @@
+# backend/bench/__main__.py
+"""
+python -m bench run       scenarios against a scratch database and the local fakes -> JSON
+python -m bench compare   flag regressions between two result files (exit 1 if any)
+python -m bench fakes     serve the YouTube / NewsAPI / Gemini stand-ins until Ctrl-C
+python -m bench corpus    print synthetic posts as JSONL
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, Iterator, List, Tuple
+
+from bench.corpus import DEFAULT_COUNTRIES, DEFAULT_LANGS, CorpusSpec, generate
+from bench.fakes import FakeConfig, FakeUpstreams
+
+ALL_SCENARIOS = ["cpu", "ingest", "refresh", "db_growth", "endpoints"]
+
+
+def _csv(s: str) -> List[str]:
+    return [p.strip() for p in (s or "").split(",") if p.strip()]
+
+
+def _fake_config(args) -> FakeConfig:
+    return FakeConfig(latency_ms=args.upstream_latency_ms, error_rate=args.upstream_error_rate,
+                      llm_latency_ms=args.llm_latency_ms, llm_error_rate=args.llm_error_rate, seed=args.seed)
+
+
+def _configure_env(args, fakes: FakeUpstreams, workdir: str):
+    """Point settings at the scratch DB and the fakes; must run before any backend import."""
+    os.environ.update(fakes.env())
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["INGEST_PERIODIC_REFRESH"] = "false"
+    os.environ["RETENTION_INTERVAL_SEC"] = "0"
+    os.environ["RETENTION_DAYS"] = "0"
+    os.environ["INSIGHTS_CACHE_PERSIST"] = "false"
+    try:
+        import google.genai  # noqa: F401  (the real client, talking to the Gemini fake)
+        os.environ.setdefault("LLM_BACKEND", "gemini")
+    except ImportError:
+        os.environ.setdefault("LLM_BACKEND", "fake")
+        os.environ.setdefault("LLM_FAKE_LATENCY_MS", str(args.llm_latency_ms))
+        os.environ.setdefault("LLM_FAKE_ERROR_RATE", str(args.llm_error_rate))
+    # measure the code, not the production request budgets (export them to override)
+    for name in ("YT_MAX_RPS", "NEWSAPI_MAX_RPS", "LLM_RPM", "LLM_TPM"):
+        os.environ.setdefault(name, "0")
+
+
+def run(args) -> int:
+    scenarios = _csv(args.scenarios) or ALL_SCENARIOS
+    unknown = set(scenarios) - set(ALL_SCENARIOS)
+    if unknown:
+        print(f"[bench] unknown scenarios: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+    fakes = FakeUpstreams(_fake_config(args)).start()
+    workdir = tempfile.mkdtemp(prefix="gi-bench-")
+    _configure_env(args, fakes, workdir)
+
+    from bench import scenarios as sc  # imports settings: only now
+    from models import init_db
+    init_db()
+    args.engines = _csv(args.engines)
+    args.concurrency = [int(c) for c in _csv(args.concurrency)]
+    args.endpoints = _csv(args.endpoints)
+    args.run_id = args.run_id or time.strftime("%Y%m%d%H%M%S")
+
+    results: Dict[str, Any] = {
+        "meta": sc.environment(),
+        "config": {k: v for k, v in vars(args).items() if k != "func"},
+        "results": {},
+    }
+    results["config"]["database_url"] = os.environ["DATABASE_URL"]
+    results["config"]["llm_backend"] = os.environ["LLM_BACKEND"]
+    try:
+        for name in scenarios:
+            print(f"[bench] {name} ...", flush=True)
+            t0 = time.perf_counter()
+            results["results"][name] = sc.SCENARIOS[name](args)
+            print(f"[bench] {name} done in {time.perf_counter() - t0:.1f}s", flush=True)
+    finally:
+        results["fakes"] = fakes.stats()
+        fakes.stop()
+        text = json.dumps(results, indent=2, default=str)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+            print(f"[bench] wrote {args.out}")
+        else:
+            print(text)
+        if not args.keep_db and not args.database_url:
+            import shutil
+            shutil.rmtree(workdir, ignore_errors=True)
+        else:
+            print(f"[bench] database kept in {workdir}")
+    return 0
+
+
+# ---------------------------
+# compare
+# ---------------------------
+def _flatten(d: Any, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    if isinstance(d, dict):
+        for k, v in d.items():
+            yield from _flatten(v, f"{prefix}.{k}" if prefix else str(k))
+    elif isinstance(d, (int, float)) and not isinstance(d, bool):
+        yield prefix, float(d)
+
+
+def _direction(key: str) -> int:
+    """+1 higher is better, -1 lower is better, 0 not a performance number."""
+    leaf = key.rsplit(".", 1)[-1]
+    if leaf.endswith("_per_sec") or leaf == "rps":
+        return 1
+    if leaf.endswith(("_ms", "_us", "_sec")) or leaf in ("us_per_post", "bytes_per_post"):
+        return -1
+    return 0
+
+
+def compare(args) -> int:
+    with open(args.baseline, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        cur = json.load(f)
+    knobs = [k for k in ("size", "seed", "countries", "langs", "concurrency", "upstream_latency_ms", "llm_latency_ms")
+             if base.get("config", {}).get(k) != cur.get("config", {}).get(k)]
+    if knobs:
+        print(f"[bench] warning: runs differ in {', '.join(knobs)}; totals are not comparable")
+    old = dict(_flatten(base.get("results", {})))
+    new = dict(_flatten(cur.get("results", {})))
+    regressions, improvements = [], []
+    for key in sorted(old.keys() & new.keys()):
+        sign = _direction(key)
+        a, b = old[key], new[key]
+        if not sign or a <= 0 or (sign < 0 and key.endswith("_ms") and max(a, b) < args.min_ms):
+            continue
+        change = (b - a) / a * sign  # > 0 better, < 0 worse
+        if change < -args.tolerance:
+            regressions.append((key, a, b, change))
+        elif change > args.tolerance:
+            improvements.append((key, a, b, change))
+    for title, rows in (("regressions", regressions), ("improvements", improvements)):
+        print(f"[bench] {len(rows)} {title} beyond {args.tolerance:.0%}")
+        for key, a, b, change in sorted(rows, key=lambda r: r[3]):
+            print(f"    {key:<70} {a:>12g} -> {b:<12g} ({change:+.1%})")
+    return 1 if regressions else 0
+
+
+# ---------------------------
+# fakes / corpus
+# ---------------------------
+def fakes(args) -> int:
+    f = FakeUpstreams(_fake_config(args)).start(args.host, args.port)
+    print("[bench] fakes listening; start the API with:")
+    for k, v in f.env().items():
+        print(f"    export {k}={v}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        f.stop()
+    return 0
+
+
+def corpus(args) -> int:
+    spec = CorpusSpec(size=args.size, seed=args.seed, keyword=args.keyword, countries=args.countries,
+                      langs=args.langs, dup_rate=args.dup_rate)
+    for post in generate(spec):
+        sys.stdout.write(json.dumps(post, ensure_ascii=False) + "\n")
+    return 0
+
+
+def _common(p: argparse.ArgumentParser):
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--countries", default=DEFAULT_COUNTRIES, help="ISO2=weight,...; * = any other, none = no place")
+    p.add_argument("--langs", default=DEFAULT_LANGS, help="lang=weight,... (en es de fr pt hi)")
+    p.add_argument("--dup-rate", type=float, default=0.02, help="share of posts that near-duplicate a recent one")
+
+
+def _fake_knobs(p: argparse.ArgumentParser):
+    p.add_argument("--upstream-latency-ms", type=float, default=80.0)
+    p.add_argument("--upstream-error-rate", type=float, default=0.0)
+    p.add_argument("--llm-latency-ms", type=float, default=400.0)
+    p.add_argument("--llm-error-rate", type=float, default=0.0)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m bench", description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("run", help="run scenarios and write JSON results")
+    p.add_argument("--scenarios", default=",".join(ALL_SCENARIOS))
+    p.add_argument("--size", type=int, default=10000, help="corpus size for ingest / db_growth (1k .. 10M)")
+    p.add_argument("--engines", default="vader,gemini", help="sentiment engines for the ingest scenario")
+    p.add_argument("--llm-sample", type=int, default=2000, help="posts ingested with the gemini engine")
+    p.add_argument("--cpu-sample", type=int, default=20000, help="posts for the per-post CPU scenario")
+    p.add_argument("--refreshes", type=int, default=3, help="keywords refreshed through the fakes")
+    p.add_argument("--api-posts", type=int, default=5000, help="posts behind the endpoint scenario's keyword")
+    p.add_argument("--api-port", type=int, default=8799)
+    p.add_argument("--endpoints", default="", help="subset of endpoints (default: all)")
+    p.add_argument("--concurrency", default="1,16", help="concurrent clients per endpoint, per level")
+    p.add_argument("--seconds", type=float, default=3.0, help="duration per endpoint and level")
+    p.add_argument("--database-url", default="", help="default: a scratch SQLite file, deleted afterwards")
+    p.add_argument("--keep-db", action="store_true")
+    p.add_argument("--run-id", default="", help="suffix for benchmark keywords (default: timestamp)")
+    p.add_argument("--out", help="write results here (default: stdout)")
+    _common(p)
+    _fake_knobs(p)
+    p.set_defaults(func=run)
+
+    p = sub.add_parser("compare", help="compare two result files")
+    p.add_argument("baseline")
+    p.add_argument("current")
+    p.add_argument("--tolerance", type=float, default=0.15, help="relative change that counts (0.15 = 15%%)")
+    p.add_argument("--min-ms", type=float, default=1.0, help="ignore latencies below this in both runs")
+    p.set_defaults(func=compare)
+
+    p = sub.add_parser("fakes", help="serve the upstream stand-ins")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--seed", type=int, default=0)
+    _fake_knobs(p)
+    p.set_defaults(func=fakes)
+
+    p = sub.add_parser("corpus", help="print synthetic posts as JSONL")
+    p.add_argument("--size", type=int, default=1000)
+    p.add_argument("--keyword", default="bench")
+    _common(p)
+    p.set_defaults(func=corpus)
+
+    args = ap.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+# backend/bench/corpus.py
+"""
+Synthetic posts for benchmarks. Every post is a pure function of (spec, index), so
+a corpus of any size streams in constant memory, two runs with the same seed see
+the same posts, and the upstream fakes can serve page N without generating 0..N-1.
+
+Posts mix languages (weights in spec.langs), mention a place from the gazetteer for
+the country picked from spec.countries ("*" = any other country, "none" = no place),
+carry the keyword so search finds them, and dup_rate of them are light edits of a
+recent post so the near-duplicate filter has something to do.
+"""
+import random
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Tuple
+
+DEFAULT_COUNTRIES = "US=0.25,IN=0.15,GB=0.08,DE=0.06,BR=0.06,FR=0.05,*=0.15,none=0.20"
+DEFAULT_LANGS = "en=0.70,es=0.10,de=0.05,fr=0.05,pt=0.05,hi=0.05"
+_DUP_WINDOW = 256  # duplicates copy one of the previous this-many posts
+
+# per language: openers, positive / neutral / negative takes on "{kw}", place phrases, filler vocabulary
+_LANG: Dict[str, Dict[str, List[str]]] = {
+    "en": {
+        "open": ["Honestly,", "Just tried it:", "Update:", "Hot take:", "Not gonna lie,", "So far", "Week two and"],
+        "pos": ["{kw} is fantastic and works great", "really love the new {kw}", "{kw} exceeded my expectations",
+                "best {kw} I have used, great value"],
+        "neu": ["{kw} is okay I guess", "not sure what to think about {kw}", "{kw} arrived on tuesday",
+                "comparing {kw} with the older model"],
+        "neg": ["{kw} is terrible and keeps failing", "really disappointed with {kw}", "{kw} broke after a week",
+                "awful support for {kw}, total waste of money"],
+        "place": ["here in {place}", "shipping to {place} took ages", "prices in {place} are different",
+                  "everyone in {place} is talking about it"],
+        "words": "battery price delivery screen update app charger design warranty store review friend family "
+                 "morning weekend commute office kids weather traffic coffee battery life build quality speed "
+                 "software bug refund manual colour size weight noise range signal camera".split(),
+    },
+    "es": {
+        "open": ["La verdad,", "Acabo de probarlo:", "Actualización:", "Sinceramente,"],
+        "pos": ["{kw} es excelente y funciona genial", "me encanta el nuevo {kw}", "{kw} vale cada peso"],
+        "neu": ["{kw} está bien supongo", "no sé qué pensar de {kw}", "{kw} llegó el martes"],
+        "neg": ["{kw} es horrible y falla siempre", "muy decepcionado con {kw}", "{kw} se rompió en una semana"],
+        "place": ["aquí en {place}", "el envío a {place} tardó mucho", "en {place} todos hablan de esto"],
+        "words": "batería precio entrega pantalla tienda amigos familia oficina tráfico café garantía diseño "
+                 "cargador velocidad ruido tamaño cámara".split(),
+    },
+    "de": {
+        "open": ["Ehrlich gesagt,", "Gerade getestet:", "Kurzes Update:"],
+        "pos": ["{kw} ist super und funktioniert toll", "ich liebe das neue {kw}"],
+        "neu": ["{kw} ist ganz okay", "{kw} kam am Dienstag an"],
+        "neg": ["{kw} ist schrecklich und fällt ständig aus", "sehr enttäuscht von {kw}"],
+        "place": ["hier in {place}", "Versand nach {place} dauerte ewig"],
+        "words": "Akku Preis Lieferung Bildschirm Laden Familie Büro Verkehr Kaffee Garantie Ladegerät "
+                 "Geschwindigkeit Gewicht Kamera".split(),
+    },
+    "fr": {
+        "open": ["Franchement,", "Je viens de tester:", "Mise à jour:"],
+        "pos": ["{kw} est génial et marche très bien", "j'adore le nouveau {kw}"],
+        "neu": ["{kw} est correct", "{kw} est arrivé mardi"],
+        "neg": ["{kw} est nul et plante tout le temps", "très déçu par {kw}"],
+        "place": ["ici à {place}", "la livraison vers {place} a pris des semaines"],
+        "words": "batterie prix livraison écran magasin famille bureau trafic café garantie chargeur "
+                 "vitesse poids caméra".split(),
+    },
+    "pt": {
+        "open": ["Sinceramente,", "Acabei de testar:", "Atualização:"],
+        "pos": ["{kw} é ótimo e funciona muito bem", "adorei o novo {kw}"],
+        "neu": ["{kw} é razoável", "{kw} chegou na terça"],
+        "neg": ["{kw} é péssimo e trava sempre", "muito decepcionado com {kw}"],
+        "place": ["aqui em {place}", "a entrega para {place} demorou"],
+        "words": "bateria preço entrega tela loja família escritório trânsito café garantia carregador "
+                 "velocidade peso câmera".split(),
+    },
+    "hi": {
+        "open": ["सच कहूँ तो,", "अभी आज़माया:", "अपडेट:"],
+        "pos": ["{kw} बहुत बढ़िया है", "नया {kw} मुझे बहुत पसंद है"],
+        "neu": ["{kw} ठीक है", "{kw} मंगलवार को आया"],
+        "neg": ["{kw} बहुत खराब है", "{kw} से बहुत निराश हूँ"],
+        "place": ["यहाँ {place} में", "{place} में डिलीवरी में बहुत समय लगा"],
+        "words": "बैटरी कीमत डिलीवरी स्क्रीन दुकान परिवार दफ्तर ट्रैफिक चाय वारंटी चार्जर".split(),
+    },
+}
+_LABEL_WEIGHTS = (("pos", 0.4), ("neu", 0.3), ("neg", 0.3))
+
+
+def parse_mix(spec: str) -> List[Tuple[str, float]]:
+    """'US=0.3,IN=0.2,*=0.5' -> [('US', 0.3), ('IN', 0.2), ('*', 0.5)] (weights need not sum to 1)."""
+    out = []
+    for part in (spec or "").split(","):
+        if not part.strip():
+            continue
+        key, _, w = part.partition("=")
+        weight = float(w) if w.strip() else 1.0
+        if weight < 0:
+            raise ValueError(f"negative weight in {spec!r}")
+        out.append((key.strip(), weight))
+    if not out or sum(w for _, w in out) <= 0:
+        raise ValueError(f"empty mix {spec!r}")
+    return out
+
+
+@lru_cache(maxsize=1)
+def _places() -> Dict[str, List[str]]:
+    """ISO2 -> gazetteer phrases (title-cased), so inferred countries are known in advance."""
+    from country_map import GAZETTEER  # lazy: importing it reads settings
+    out: Dict[str, List[str]] = {}
+    for phrase, cc in sorted(GAZETTEER.items()):
+        if len(phrase) > 3:  # skip ambiguous short codes ("uk", "usa") to keep the mix honest
+            out.setdefault(cc, []).append(phrase.title())
+    return out
+
+
+def _pick(rng: random.Random, mix: List[Tuple[str, float]]) -> str:
+    return rng.choices([k for k, _ in mix], weights=[w for _, w in mix])[0]
+
+
+@dataclass(frozen=True)
+class CorpusSpec:
+    size: int
+    seed: int = 0
+    keyword: str = "bench"
+    countries: str = DEFAULT_COUNTRIES
+    langs: str = DEFAULT_LANGS
+    dup_rate: float = 0.02
+    span_hours: float = 168.0  # created_at spread over this many hours before `now`
+    source: str = "bench"
+    now: float = 0.0  # unix seconds; 0 = time of the first call
+
+    def _rng(self, i: int, salt: str = "") -> random.Random:
+        return random.Random(zlib.crc32(f"{self.seed}:{self.keyword}:{salt}:{i}".encode("utf-8")))
+
+
+@lru_cache(maxsize=64)
+def _mixes(countries: str, langs: str):
+    cmix = parse_mix(countries)
+    others = sorted(set(_places()) - {c for c, _ in cmix})  # what "*" draws from
+    return cmix, parse_mix(langs), others
+
+
+def _base(spec: CorpusSpec, i: int) -> Tuple[str, str]:
+    """(text, expected ISO2 or '') for post i, before duplication."""
+    rng = spec._rng(i)
+    cmix, lmix, others = _mixes(spec.countries, spec.langs)
+    lang = _LANG.get(_pick(rng, lmix), _LANG["en"])
+    label = _pick(rng, list(_LABEL_WEIGHTS))
+    parts = [rng.choice(lang["open"]), rng.choice(lang[label]).format(kw=spec.keyword)]
+    cc = _pick(rng, cmix)
+    places = _places()
+    if cc == "*":
+        cc = rng.choice(others)
+    if cc != "none" and places.get(cc):
+        parts.append(rng.choice(lang["place"]).format(place=rng.choice(places[cc])))
+    else:
+        cc = ""
+    parts.append(" ".join(rng.choices(lang["words"], k=rng.randint(4, 9))))
+    return " ".join(parts) + rng.choice([".", "!", "...", " :)", ""]), cc
+
+
+def make_post(spec: CorpusSpec, i: int) -> Dict[str, Any]:
+    """Post i of the corpus as an ingest item (id, source, author, text, created_at)."""
+    rng = spec._rng(i, "meta")
+    if i and rng.random() < spec.dup_rate:
+        text, _ = _base(spec, rng.randrange(max(0, i - _DUP_WINDOW), i))
+        text += rng.choice([" +1", " same here", "!!", " (edited)"])
+    else:
+        text, _ = _base(spec, i)
+    now = spec.now or _now()
+    created = datetime.fromtimestamp(now - rng.random() * spec.span_hours * 3600, timezone.utc)
+    return {
+        "id": f"{spec.source}_{spec.seed}_{zlib.crc32(spec.keyword.encode('utf-8')):08x}_{i}",
+        "source": spec.source,
+        "author": f"user{rng.randrange(max(1, spec.size // 5 + 1))}",
+        "text": text,
+        "created_at": created.isoformat().replace("+00:00", "Z"),
+    }
+
+
+_started = 0.0
+
+
+def _now() -> float:
+    global _started
+    if not _started:
+        _started = datetime.now(timezone.utc).timestamp()
+    return _started
+
+
+def generate(spec: CorpusSpec, start: int = 0, stop: int = -1) -> Iterator[Dict[str, Any]]:
+    """Posts start..stop-1 (stop=-1: to spec.size), lazily."""
+    for i in range(start, spec.size if stop < 0 else min(stop, spec.size)):
+        yield make_post(spec, i)
+
+
+def labelled(spec: CorpusSpec, n: int) -> List[Tuple[str, str]]:
+    """(text, country it was written to mention or '') for the first n posts, duplicates left out."""
+    return [_base(spec, i) for i in range(min(n, spec.size))]
@@ -0,0 +1,265 @@
+# backend/bench/fakes.py
+"""
+Local stand-ins for the YouTube Data API, NewsAPI and Gemini on one HTTP port, with
+configurable latency and error rate. Content comes from the synthetic corpus, so a
+refresh through the fakes stores the same posts on every run.
+
+    YOUTUBE_API_BASE = <root>/youtube/v3   (search, commentThreads)
+    NEWSAPI_BASE     = <root>/newsapi/v2   (everything)
+    GEMINI_BASE_URL  = <root>/gemini       (models/<model>:generateContent)
+
+Only the request/response fields ingest.py, fetch_async.py and the genai client use
+are implemented, including the incremental ones: lists come newest first, search
+honours publishedAfter, NewsAPI honours `from`, and every GET answers with an ETag
+(304 on a matching If-None-Match). Standalone: `python -m bench fakes --port 8765`,
+then start the API with the three variables above pointing at it.
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from bench.corpus import CorpusSpec, _now, make_post
+
+
+@dataclass
+class FakeConfig:
+    latency_ms: float = 80.0  # YouTube / NewsAPI, +-25% jitter
+    error_rate: float = 0.0  # share of upstream calls answered with a 503
+    llm_latency_ms: float = 400.0
+    llm_error_rate: float = 0.0
+    videos_per_query: int = 50
+    comments_per_video: int = 100
+    articles_per_query: int = 100
+    seed: int = 0
+
+
+class FakeUpstreams:
+    def __init__(self, config: Optional[FakeConfig] = None):
+        self.config = config or FakeConfig()
+        self.counts: Dict[str, int] = defaultdict(int)
+        self._videos: Dict[str, str] = {}  # video id -> keyword it was found for
+        self._lists: Dict[Tuple[str, str], List[Tuple[int, Dict[str, Any]]]] = {}  # newest-first corpora
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._rng = random.Random(self.config.seed)
+
+    # ---- lifecycle ----
+    @property
+    def root(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self) -> Dict[str, str]:
+        """Settings that point the backend at these fakes."""
+        return {
+            "YOUTUBE_API_BASE": f"{self.root}/youtube/v3",
+            "NEWSAPI_BASE": f"{self.root}/newsapi/v2",
+            "GEMINI_BASE_URL": f"{self.root}/gemini",
+            "YOUTUBE_API_KEY": "bench",
+            "NEWSAPI_KEY": "bench",
+            "GOOGLE_API_KEY": "bench",
+        }
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> "FakeUpstreams":
+        fakes = self
+
+        class Handler(_Handler):
+            upstreams = fakes
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="bench-fakes", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+    # ---- behaviour ----
+    def _delay_and_fail(self, name: str, latency_ms: float, error_rate: float) -> bool:
+        """Sleep the configured latency; True when this call should fail."""
+        with self._lock:
+            self.counts[f"{name}_requests"] += 1
+            jitter = self._rng.uniform(0.75, 1.25)
+            fail = self._rng.random() < error_rate
+            if fail:
+                self.counts[f"{name}_errors"] += 1
+        time.sleep(max(0.0, latency_ms) * jitter / 1000)
+        return fail
+
+    def _spec(self, keyword: str, size: int, source: str) -> CorpusSpec:
+        return CorpusSpec(size=size, seed=self.config.seed, keyword=keyword, source=source)
+
+    def _sorted(self, kind: str, key: str, spec: CorpusSpec, indices: range) -> List[Tuple[int, Dict[str, Any]]]:
+        """(index, post) for the given corpus indices, newest first; built once per list."""
+        with self._lock:
+            cached = self._lists.get((kind, key))
+        if cached is None:
+            cached = sorted(((i, make_post(spec, i)) for i in indices),
+                            key=lambda ip: ip[1]["created_at"], reverse=True)
+            with self._lock:
+                self._lists[(kind, key)] = cached
+        return cached
+
+    def yt_search(self, q: Dict[str, str]) -> Tuple[int, Dict[str, Any]]:
+        if self._delay_and_fail("youtube", self.config.latency_ms, self.config.error_rate):
+            return 503, {"error": {"code": 503, "message": "backendError (fake)"}}
+        kw = q.get("q", "")
+        # video i was published i hours before the fakes' clock started: index order is newest first
+        start_time = datetime.fromtimestamp(_now(), timezone.utc)
+        published = [_iso(start_time - timedelta(hours=i)) for i in range(self.config.videos_per_query)]
+        after = q.get("publishedAfter")
+        total = sum(1 for p in published if not after or p > after)
+        start = int(q.get("pageToken") or 0)
+        n = min(int(q.get("maxResults") or 5), 50, max(0, total - start))
+        ids = [(f"{zlib.crc32(kw.encode('utf-8')):08x}{i:05d}", published[i]) for i in range(start, start + n)]
+        with self._lock:
+            self._videos.update((vid, kw) for vid, _ in ids)
+        out: Dict[str, Any] = {"items": [{"id": {"kind": "youtube#video", "videoId": v},
+                                          "snippet": {"publishedAt": p}} for v, p in ids]}
+        if start + n < total:
+            out["nextPageToken"] = str(start + n)
+        return 200, out
+
+    def yt_comments(self, q: Dict[str, str]) -> Tuple[int, Dict[str, Any]]:
+        if self._delay_and_fail("youtube", self.config.latency_ms, self.config.error_rate):
+            return 503, {"error": {"code": 503, "message": "backendError (fake)"}}
+        vid = q.get("videoId", "")
+        with self._lock:
+            kw = self._videos.get(vid)
+        if kw is None:
+            return 404, {"error": {"code": 404, "message": "videoNotFound"}}
+        per = self.config.comments_per_video
+        base = int(vid[8:]) * per
+        spec = self._spec(kw, base + per, "youtube")
+        ordered = self._sorted("comments", vid, spec, range(base, base + per))  # order=time
+        start = int(q.get("pageToken") or 0)
+        n = min(int(q.get("maxResults") or 20), 100, max(0, per - start))
+        items = []
+        for i, p in ordered[start:start + n]:
+            j = i - base
+            items.append({
+                "id": f"{vid}.{j}",
+                "snippet": {"topLevelComment": {"snippet": {
+                    "authorDisplayName": p["author"],
+                    "textDisplay": p["text"],
+                    "publishedAt": p["created_at"],
+                }}},
+            })
+        out: Dict[str, Any] = {"items": items}
+        if start + n < per:
+            out["nextPageToken"] = str(start + n)
+        return 200, out
+
+    def news(self, q: Dict[str, str]) -> Tuple[int, Dict[str, Any]]:
+        if self._delay_and_fail("news", self.config.latency_ms, self.config.error_rate):
+            return 503, {"status": "error", "code": "unexpectedError", "message": "fake"}
+        kw = q.get("q", "")
+        size = min(int(q.get("pageSize") or 20), 100)
+        page = max(1, int(q.get("page") or 1))
+        spec = self._spec(kw, self.config.articles_per_query, "news")
+        ordered = self._sorted("news", kw, spec, range(self.config.articles_per_query))  # sortBy=publishedAt
+        since = q.get("from")
+        ordered = [ip for ip in ordered if not since or ip[1]["created_at"][:19] >= since[:19]]
+        total = len(ordered)
+        articles = []
+        for i, p in ordered[(page - 1) * size:page * size]:
+            title, _, desc = p["text"].partition(" ")
+            articles.append({
+                "source": {"id": None, "name": f"Bench Daily {i % 7}"},
+                "author": p["author"],
+                "title": title,
+                "description": desc,
+                "url": f"https://bench.invalid/{zlib.crc32(kw.encode('utf-8')):08x}/{i}",
+                "publishedAt": p["created_at"],
+            })
+        return 200, {"status": "ok", "totalResults": total, "articles": articles}
+
+    def gemini(self, path: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        if self._delay_and_fail("gemini", self.config.llm_latency_ms, self.config.llm_error_rate):
+            return 503, {"error": {"code": 503, "message": "The model is overloaded (fake).", "status": "UNAVAILABLE"}}
+        from llm_gateway import fake_responder  # same canned answers as LLM_BACKEND=fake
+
+        model = path.rsplit("/", 1)[-1].split(":", 1)[0]
+        contents = body.get("contents") or []
+        texts = [" ".join(p.get("text", "") for p in c.get("parts", [])) for c in contents]
+        history = [{"role": "assistant" if c.get("role") == "model" else "user", "content": t}
+                   for c, t in zip(contents[:-1], texts[:-1])]
+        system = " ".join(p.get("text", "") for p in (body.get("systemInstruction") or {}).get("parts", [])) or None
+        json_mode = (body.get("generationConfig") or {}).get("responseMimeType") == "application/json"
+        prompt = texts[-1] if texts else ""
+        text = fake_responder(model, prompt, system, history, json_mode)
+        n_in, n_out = sum(len(t) for t in texts) // 4, len(text) // 4
+        return 200, {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP", "index": 0}],
+            "usageMetadata": {"promptTokenCount": n_in, "candidatesTokenCount": n_out, "totalTokenCount": n_in + n_out},
+            "modelVersion": model,
+        }
+
+
+def _iso(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    upstreams: FakeUpstreams
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, payload: Dict[str, Any], etag: bool = False):
+        data = json.dumps(payload).encode("utf-8")
+        tag = '"' + hashlib.md5(data).hexdigest() + '"' if etag and status == 200 else None
+        if tag is not None and self.headers.get("If-None-Match") == tag:
+            status, data = 304, b""
+        self.send_response(status)
+        if tag is not None:
+            self.send_header("ETag", tag)
+        if status != 304:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        q = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        routes = {
+            "/youtube/v3/search": self.upstreams.yt_search,
+            "/youtube/v3/commentThreads": self.upstreams.yt_comments,
+            "/newsapi/v2/everything": self.upstreams.news,
+        }
+        if url.path == "/_stats":
+            return self._reply(200, self.upstreams.stats())
+        handler = routes.get(url.path.rstrip("/"))
+        if handler is None:
+            return self._reply(404, {"error": {"code": 404, "message": f"no fake for {url.path}"}})
+        self._reply(*handler(q), etag=True)
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if not (url.path.startswith("/gemini/") and url.path.endswith(":generateContent")):
+            return self._reply(404, {"error": {"code": 404, "message": f"no fake for {url.path}"}})
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            return self._reply(400, {"error": {"code": 400, "message": "invalid JSON"}})
+        self._reply(*self.upstreams.gemini(url.path, payload))
@@ -0,0 +1,353 @@
+# backend/bench/scenarios.py
+"""
+Benchmark scenarios. Each takes the parsed `run` options and returns a JSON-ready
+dict; names ending in _ms / _us are lower-is-better and _per_sec / rps higher-is-better,
+which is what `python -m bench compare` keys on.
+
+Imports backend modules, so settings must already point at the bench database and
+the fakes (bench/__main__.py does that before importing this module).
+"""
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import func, select, text
+
+from bench.corpus import CorpusSpec, generate, labelled
+from country_matcher import infer_countries
+from fetch_async import ASYNC_LIVE_FETCHERS, aclose as aclose_http
+from heuristics import lexicon as aspect_lexicon
+from ingest import ingest_live, refresh_keyword
+from metrics import collect_timings
+from models import Post, PostRollup, PostSignature, ReadSessionLocal, SentimentCacheEntry, engine as db_engine
+from queries import cutoff_for, recent_posts_stmt, window_count_stmt
+from rollups import geo_from_rollups, timeseries
+from sentiment import _vader_chunk
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def summary(samples_ms: List[float]) -> Dict[str, Any]:
+    if not samples_ms:
+        return {"n": 0}
+    s = sorted(samples_ms)
+    pick = lambda q: round(s[min(len(s) - 1, int(len(s) * q))], 3)
+    return {
+        "n": len(s),
+        "mean_ms": round(statistics.fmean(s), 3),
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+        "max_ms": round(s[-1], 3),
+    }
+
+
+def _best_of(fn: Callable[[], Any], repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _spec(opts, keyword: str, size: Optional[int] = None, source: str = "bench") -> CorpusSpec:
+    return CorpusSpec(size=size or opts.size, seed=opts.seed, keyword=keyword, countries=opts.countries,
+                      langs=opts.langs, dup_rate=opts.dup_rate, source=source)
+
+
+def _stages(timings: Dict[str, float]) -> Dict[str, float]:
+    return {f"{k}_ms": round(v * 1000, 1) for k, v in sorted(timings.items())}
+
+
+# ---------------------------
+# Per-post CPU cost
+# ---------------------------
+def cpu(opts) -> Dict[str, Any]:
+    """Per-post cost of country inference, VADER and aspect masks on the same texts (best of 3)."""
+    sample = labelled(_spec(opts, "battery"), min(opts.size, opts.cpu_sample))
+    texts = [t for t, _ in sample]
+    n = len(texts)
+    out: Dict[str, Any] = {"posts": n}
+
+    def per_post(secs: float) -> Dict[str, float]:
+        return {"us_per_post": round(secs / n * 1e6, 2), "posts_per_sec": round(n / secs, 1)}
+
+    found = infer_countries(texts)
+    out["infer_country"] = {
+        **per_post(_best_of(lambda: infer_countries(texts))),
+        "hit_rate": round(sum(1 for (_, cc), got in zip(sample, found) if cc and got == cc)
+                          / max(1, sum(1 for _, cc in sample if cc)), 4),
+        "false_positive_rate": round(sum(1 for (_, cc), got in zip(sample, found) if not cc and got)
+                                     / max(1, sum(1 for _, cc in sample if not cc)), 4),
+    }
+    out["vader"] = per_post(_best_of(lambda: _vader_chunk(texts)))
+    out["aspect_masks"] = per_post(_best_of(lambda: aspect_lexicon.masks(texts)))
+    return out
+
+
+# ---------------------------
+# ingest_live throughput
+# ---------------------------
+def ingest(opts) -> Dict[str, Any]:
+    """ingest_live over a fresh corpus per engine: score, dedup, infer country, upsert, roll up."""
+    out: Dict[str, Any] = {}
+    for engine in opts.engines:
+        kw = f"bench-ingest-{engine}-{opts.run_id}"
+        size = opts.size if engine == "vader" else min(opts.size, opts.llm_sample)
+        with collect_timings() as timings:
+            t0 = time.perf_counter()
+            res = ingest_live(kw, generate(_spec(opts, kw, size)), engine_choice=engine)
+            secs = time.perf_counter() - t0
+        stored = res["inserted"] + res["updated"]
+        out[engine] = {
+            "posts": size,
+            **res,
+            "dropped": size - stored,
+            "elapsed_sec": round(secs, 3),
+            "posts_per_sec": round(size / secs, 1),
+            "stages": _stages(timings),
+        }
+    return out
+
+
+# ---------------------------
+# Live refresh through the upstream fakes
+# ---------------------------
+async def _afetch(keywords: List[str]) -> List[Tuple[float, int]]:
+    """(ms, items) per keyword; one event loop, since the shared httpx client is bound to it."""
+    out = []
+    try:
+        for kw in keywords:
+            t0, n = time.perf_counter(), 0
+            for fetch in ASYNC_LIVE_FETCHERS.values():
+                async for _ in fetch(kw):
+                    n += 1
+            out.append(((time.perf_counter() - t0) * 1000, n))
+    finally:
+        await aclose_http()
+    return out
+
+
+def _refresh_pass(keywords: List[str]) -> Dict[str, Any]:
+    runs, fetched, stages = [], 0, {}
+    for kw in keywords:
+        with collect_timings() as timings:
+            t0 = time.perf_counter()
+            fetched += refresh_keyword(kw, engine_choice="vader")
+            runs.append((time.perf_counter() - t0) * 1000)
+        for k, v in timings.items():
+            stages[k] = stages.get(k, 0.0) + v
+    return {**summary(runs), "items": fetched,
+            "items_per_sec": round(fetched / max(1e-9, sum(runs) / 1000), 1),
+            "stages": _stages(stages)}
+
+
+def refresh(opts) -> Dict[str, Any]:
+    """
+    refresh_keyword (sync fetch + ingest) for new keywords, then again for the same ones
+    (steady state: only what is newer than the watermarks), and the async fetchers alone.
+    """
+    keywords = [f"bench-refresh-{opts.run_id}-{i}" for i in range(opts.refreshes)]
+    first = _refresh_pass(keywords)
+    steady = _refresh_pass(keywords)
+    timed_fetches = asyncio.run(_afetch([f"bench-afetch-{opts.run_id}-{i}" for i in range(opts.refreshes)]))
+    afetch = [ms for ms, _ in timed_fetches]
+    afetched = sum(n for _, n in timed_fetches)
+    return {
+        "refresh_keyword": first,
+        "refresh_keyword_steady": steady,
+        "async_fetch_only": {**summary(afetch), "items": afetched,
+                             "items_per_sec": round(afetched / max(1e-9, sum(afetch) / 1000), 1)},
+    }
+
+
+# ---------------------------
+# DB growth
+# ---------------------------
+def _db_bytes(sess) -> Optional[int]:
+    url = db_engine.url
+    if url.get_backend_name() == "sqlite":
+        path = url.database or ""
+        return sum(os.path.getsize(p) for p in (path, path + "-wal") if p and os.path.exists(p))
+    if url.get_backend_name() == "postgresql":
+        return sess.execute(text("SELECT pg_database_size(current_database())")).scalar()
+    return None
+
+
+def _row_counts(sess) -> Dict[str, int]:
+    return {
+        t.__tablename__: sess.execute(select(func.count()).select_from(t)).scalar()
+        for t in (Post, PostRollup, PostSignature, SentimentCacheEntry)
+    }
+
+
+def _query_ms(sess, kw: str) -> Dict[str, Any]:
+    cutoff = cutoff_for(24 * 7)
+    queries = {
+        "window_count": lambda: sess.execute(window_count_stmt(kw, cutoff)).scalar(),
+        "first_page": lambda: sess.execute(recent_posts_stmt(kw, cutoff, limit=50)).all(),
+        "geo": lambda: geo_from_rollups(sess, kw, cutoff),
+        "timeseries": lambda: timeseries(sess, kw, cutoff),
+    }
+    return {name: round(_best_of(fn, 5) * 1000, 3) for name, fn in queries.items()}
+
+
+def db_growth(opts) -> Dict[str, Any]:
+    """Ingest one keyword in steps (1k, 10k, ... up to --size); size, rows and query latency at each."""
+    kw = f"bench-growth-{opts.run_id}"
+    steps, n = [], 1000
+    while n < opts.size:
+        steps.append(n)
+        n *= 10
+    steps.append(opts.size)
+    spec = _spec(opts, kw)
+    out, done = [], 0
+    sess = ReadSessionLocal()
+    try:
+        before = _db_bytes(sess)
+        sess.rollback()
+        for step in steps:
+            t0 = time.perf_counter()
+            ingest_live(kw, generate(spec, done, step), engine_choice="vader")
+            secs = time.perf_counter() - t0
+            size = _db_bytes(sess)
+            point = {
+                "posts": step,
+                "posts_per_sec": round((step - done) / secs, 1),
+                "db_bytes": size,
+                "bytes_per_post": round((size - before) / step, 1) if size is not None and before is not None else None,
+                "rows": _row_counts(sess),
+                "query_ms": _query_ms(sess, kw),
+            }
+            sess.rollback()  # next step reads a fresh snapshot
+            out.append(point)
+            done = step
+    finally:
+        sess.close()
+    return {"dialect": db_engine.dialect.name, "steps": out}
+
+
+# ---------------------------
+# Endpoint latency under concurrent load
+# ---------------------------
+def _endpoints(kw: str) -> Dict[str, Tuple[str, str, Dict[str, Any], Optional[Dict[str, Any]]]]:
+    return {
+        "health": ("GET", "/api/health", {}, None),
+        "search": ("GET", "/api/search", {"q": kw, "hours": 168, "limit": 50}, None),
+        "search_fulltext": ("GET", "/api/search", {"q": "battery", "mode": "fulltext", "hours": 168, "limit": 50}, None),
+        "search_stream": ("GET", "/api/search/stream", {"q": kw, "hours": 168, "engine": "vader"}, None),
+        "geo": ("GET", "/api/geo", {"q": kw, "hours": 168}, None),
+        "timeseries": ("GET", "/api/timeseries", {"q": kw, "hours": 168}, None),
+        # sources="" keeps it a pure read (no refresh jobs for the other keywords)
+        "compare": ("GET", "/api/compare", {"q": f"{kw},{kw}-b,{kw}-c", "hours": 168, "sources": ""}, None),
+        "analytics": ("GET", "/api/analytics", {"q": kw, "group_by": "country,label", "hours": 168}, None),
+        "insights": ("GET", "/api/insights", {"q": kw, "hours": 168}, None),
+        "chat": ("POST", "/api/chat", {"q": kw, "hours": 168}, {"message": "How do people in Germany feel about the battery?"}),
+        "cache_stats": ("GET", "/api/cache/stats", {}, None),
+        "llm_stats": ("GET", "/api/llm/stats", {}, None),
+        "metrics": ("GET", "/api/metrics", {}, None),
+    }
+
+
+async def _hammer(base: str, req, clients: int, seconds: float) -> Dict[str, Any]:
+    method, path, params, body = req
+    samples: List[float] = []
+    statuses: Dict[str, int] = {}
+
+    async def client(c: httpx.AsyncClient, stop: float):
+        while time.perf_counter() < stop:
+            t0 = time.perf_counter()
+            try:
+                r = await c.request(method, path, params=params, json=body)
+                key = str(r.status_code)
+            except httpx.HTTPError as e:
+                key = type(e).__name__
+            samples.append((time.perf_counter() - t0) * 1000)
+            statuses[key] = statuses.get(key, 0) + 1
+
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base, timeout=120, limits=limits) as c:
+        started = time.perf_counter()
+        stop = started + seconds
+        await asyncio.gather(*[client(c, stop) for _ in range(clients)])
+        wall = time.perf_counter() - started
+    return {**summary(samples), "rps": round(len(samples) / wall, 1), "status": statuses}
+
+
+def _start_api(port: int) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=os.environ.copy(),
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"API server exited with {proc.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/health", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("API server did not come up within 60s")
+
+
+def endpoints(opts) -> Dict[str, Any]:
+    """Every read endpoint against a uvicorn server (own process), at each --concurrency level."""
+    kw = f"bench-api-{opts.run_id}"
+    ingest_live(kw, generate(_spec(opts, kw, min(opts.size, opts.api_posts))), engine_choice="vader")
+    proc = _start_api(opts.api_port)
+    out: Dict[str, Any] = {"posts": min(opts.size, opts.api_posts)}
+    try:
+        base = f"http://127.0.0.1:{opts.api_port}"
+        for name, req in _endpoints(kw).items():
+            if opts.endpoints and name not in opts.endpoints:
+                continue
+            out[name] = {
+                f"c{c}": asyncio.run(_hammer(base, req, c, opts.seconds)) for c in opts.concurrency
+            }
+            print(f"[bench][endpoints] {name}", {k: (v.get("p50_ms"), v.get("rps")) for k, v in out[name].items()})
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    return out
+
+
+SCENARIOS: Dict[str, Callable[[Any], Dict[str, Any]]] = {
+    "cpu": cpu,
+    "ingest": ingest,
+    "refresh": refresh,
+    "db_growth": db_growth,
+    "endpoints": endpoints,
+}
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        commit = None
+    import platform
+    from llm_gateway import gateway
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "database": db_engine.dialect.name,
+        "llm_backend": gateway.backend.name,
+    }
@@ -0,0 +1,169 @@
+# backend/build_gazetteer.py
+"""
+Build a full gazetteer (tens of thousands of phrases) from GeoNames for the
+country matcher. The shipped data/gazetteer.tsv is the hand-curated core; this
+writes a superset next to it, which GAZETTEER_PATH can point at:
+
+    python build_gazetteer.py                          # cities15000 (~26k places)
+    python build_gazetteer.py --cities cities500       # ~200k places, lower precision
+    GAZETTEER_PATH=data/gazetteer_full.tsv uvicorn app:app
+
+GeoNames dumps (CC BY 4.0) are downloaded to --cache-dir unless already there.
+Curated phrases are copied first and always win. Added from GeoNames:
+- admin1 regions (states / provinces), when the name is unique to one country;
+- cities above --min-population. A name used in several countries goes to the
+  most populous one if it has at least AMBIGUITY_RATIO times the population of
+  the next country's place, and is skipped otherwise.
+Names that are common English words are skipped, like the curated file does.
+"""
+import argparse
+import io
+import os
+import sys
+import zipfile
+from collections import defaultdict
+from typing import Dict, Iterable, List, Set, Tuple
+
+import requests
+
+from country_map import load_gazetteer
+from country_matcher import tokenize
+
+GEONAMES_URL = "https://download.geonames.org/export/dump/"
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+AMBIGUITY_RATIO = 2.0
+MIN_SINGLE_TOKEN_LEN = 4  # shorter one-word names ("ho", "ede") match too much by accident
+
+# Place names that are everyday words; nltk's English word list (its lowercase, i.e. not
+# proper-noun, entries) extends this when installed.
+_COMMON_WORDS = {
+    "bath", "best", "bonus", "buy", "camp", "cape", "central", "colon", "commerce", "date",
+    "deal", "eagle", "energy", "enterprise", "eve", "fort", "globe", "goes", "grace", "harmony",
+    "hope", "independence", "liberty", "love", "male", "mobile", "moody", "nice", "normal",
+    "opportunity", "orange", "page", "paradise", "phone", "pride", "progress", "reading",
+    "split", "sale", "story", "sun", "surprise", "temple", "trade", "union", "unity", "university",
+    "victoria", "view", "why", "win", "wonder",
+}
+
+
+def _english_words() -> Set[str]:
+    words = set(_COMMON_WORDS)
+    try:
+        from nltk.corpus import words as nltk_words
+        words.update(w for w in nltk_words.words() if w.islower())
+    except Exception:
+        print("[gazetteer] nltk 'words' corpus not available; using the built-in stoplist only")
+    return words
+
+
+def _fetch(name: str, cache_dir: str) -> str:
+    """Local path of a GeoNames dump file, downloading (and unzipping) it on first use."""
+    path = os.path.join(cache_dir, name + ".txt")
+    if os.path.exists(path):
+        return path
+    os.makedirs(cache_dir, exist_ok=True)
+    zipped = name.startswith("cities")
+    url = GEONAMES_URL + name + (".zip" if zipped else ".txt")
+    print("[gazetteer] downloading", url)
+    resp = requests.get(url, timeout=120)
+    resp.raise_for_status()
+    data = zipfile.ZipFile(io.BytesIO(resp.content)).read(name + ".txt") if zipped else resp.content
+    with open(path + ".tmp", "wb") as f:
+        f.write(data)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def _rows(path: str) -> Iterable[List[str]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip() and not line.startswith("#"):
+                yield line.rstrip("\n").split("\t")
+
+
+def _phrase(name: str) -> str:
+    return " ".join(tokenize(name))
+
+
+def _usable(phrase: str, common: Set[str]) -> bool:
+    toks = phrase.split()
+    if not toks or any(t.isdigit() for t in toks):
+        return False
+    if len(toks) == 1 and (len(phrase) < MIN_SINGLE_TOKEN_LEN or phrase in common):
+        return False
+    return True
+
+
+def admin1_phrases(path: str, country_names: Dict[str, str], common: Set[str]) -> Dict[str, str]:
+    """
+    admin1CodesASCII.txt (code, name, ascii name, geonameid) -> {phrase: ISO2}, names unique to
+    one country only (a region named like another country, e.g. georgia, is skipped).
+    """
+    countries = set(country_names.values())
+    seen: Dict[str, Set[str]] = defaultdict(set)
+    for phrase, cc in country_names.items():
+        seen[phrase].add(cc)
+    for row in _rows(path):
+        cc = row[0].split(".")[0]
+        if cc not in countries:
+            continue
+        for name in {row[1], row[2]}:
+            phrase = _phrase(name)
+            if _usable(phrase, common):
+                seen[phrase].add(cc)
+    return {p: ccs.pop() for p, ccs in seen.items() if len(ccs) == 1 and p not in country_names}
+
+
+def city_phrases(path: str, countries: Set[str], common: Set[str], min_population: int) -> Dict[str, str]:
+    """cities*.txt (GeoNames main table) -> {phrase: ISO2}; ambiguous names go to a clearly larger place."""
+    best: Dict[str, Dict[str, int]] = defaultdict(dict)  # phrase -> country -> largest population
+    for row in _rows(path):
+        cc, population = row[8], int(row[14] or 0)
+        if cc not in countries or population < min_population:
+            continue
+        for name in {row[1], row[2]}:
+            phrase = _phrase(name)
+            if _usable(phrase, common):
+                best[phrase][cc] = max(population, best[phrase].get(cc, 0))
+    out = {}
+    for phrase, by_cc in best.items():
+        ranked: List[Tuple[int, str]] = sorted(((pop, cc) for cc, pop in by_cc.items()), reverse=True)
+        if len(ranked) == 1 or ranked[0][0] >= AMBIGUITY_RATIO * ranked[1][0]:
+            out[phrase] = ranked[0][1]
+    return out
+
+
+def build(base: str, out_path: str, cities: str, min_population: int, cache_dir: str) -> Dict[str, int]:
+    curated = load_gazetteer(base)
+    # countryInfo.txt: ISO2, ISO3, numeric, FIPS, country name, capital, ...
+    country_names = {_phrase(row[4]): row[0] for row in _rows(_fetch("countryInfo", cache_dir))}
+    common = _english_words()
+    regions = admin1_phrases(_fetch("admin1CodesASCII", cache_dir), country_names, common)
+    places = city_phrases(_fetch(cities, cache_dir), set(country_names.values()), common, min_population)
+    added = {p: cc for p, cc in {**places, **regions, **country_names}.items() if p not in curated}
+    with open(out_path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(f"# generated by build_gazetteer.py from {os.path.basename(base)} + GeoNames {cities}, "
+                "admin1CodesASCII (CC BY 4.0)\n# phrase<TAB>ISO 3166-1 alpha-2; curated entries first\n")
+        for phrase, cc in curated.items():
+            f.write(f"{phrase}\t{cc}\n")
+        for phrase in sorted(added):
+            f.write(f"{phrase}\t{added[phrase]}\n")
+    os.replace(out_path + ".tmp", out_path)
+    return {"curated": len(curated), "regions": len(regions), "cities": len(places), "total": len(curated) + len(added)}
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Build a full gazetteer from GeoNames.")
+    ap.add_argument("--base", default=os.path.join(DATA_DIR, "gazetteer.tsv"), help="curated phrases (they win)")
+    ap.add_argument("--out", default=os.path.join(DATA_DIR, "gazetteer_full.tsv"))
+    ap.add_argument("--cities", default="cities15000", choices=("cities500", "cities1000", "cities5000", "cities15000"))
+    ap.add_argument("--min-population", type=int, default=0)
+    ap.add_argument("--cache-dir", default=os.path.join(DATA_DIR, "geonames"))
+    args = ap.parse_args(argv)
+    counts = build(args.base, args.out, args.cities, args.min_population, args.cache_dir)
+    print("[gazetteer]", args.out, counts)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
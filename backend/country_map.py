@@ -1,4 +1,19 @@
 # backend/country_map.py
+"""
+Phrase -> ISO2 table for country inference (country_matcher.py).
+
+The shipped data/gazetteer.tsv is hand-curated: about 1.4k phrases (country names,
+short names, demonyms, capitals, major cities, large regions). Texts that only name
+a smaller city or a state/province get no country with it: recall is lower than with
+a full gazetteer, precision is not affected. build_gazetteer.py writes a GeoNames-based
+superset (tens of thousands of phrases; curated entries still win) to point
+GAZETTEER_PATH at. Matching cost does not grow with the table (token trie).
+"""
+from typing import Dict
+
+from settings import GAZETTEER_PATH
+
+# Hand-picked aliases; these win over the gazetteer file on conflicts.
 COUNTRY_KEYWORDS = {
     # USA
     "united states": "US", "usa": "US", "america": "US", "new york": "US",
@@ -31,3 +46,21 @@ COUNTRY_KEYWORDS = {
     # Mexico
     "mexico": "MX", "mexico city": "MX", "guadalajara": "MX"
 }
+
+
+def load_gazetteer(path: str = GAZETTEER_PATH) -> Dict[str, str]:
+    """Read `phrase<TAB>ISO2` lines (# comments and blanks skipped) into {phrase: ISO2}."""
+    out: Dict[str, str] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            phrase, _, iso = line.partition("\t")
+            if phrase and iso:
+                out[phrase.strip().lower()] = iso.strip().upper()
+    return out
+
+
+# Everything the country matcher knows: gazetteer file + the aliases above.
+GAZETTEER: Dict[str, str] = {**load_gazetteer(), **COUNTRY_KEYWORDS}
@@ -0,0 +1,94 @@
+# backend/country_matcher.py
+"""
+Country inference over a token trie built once at import. Each text is
+tokenized in a single pass; matching walks the trie from every token, so the
+per-post cost depends on text length and the longest phrase, not on how many
+gazetteer entries there are. Semantics: whole-token matches, leftmost match
+wins, and among matches starting at the same token the longest wins
+("mexico city" over "mexico").
+"""
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from country_map import GAZETTEER
+
+URL_RE = re.compile(r"https?://\S+")
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+_END = ""  # trie key for "a phrase ends here"; never a real token
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase, drop URLs, fold accents (são -> sao), split into [a-z0-9]+ tokens."""
+    t = (text or "").lower()
+    if "http" in t:
+        t = URL_RE.sub(" ", t)
+    if not t.isascii():
+        t = "".join(c for c in unicodedata.normalize("NFKD", t) if not unicodedata.combining(c))
+    return TOKEN_RE.findall(t)
+
+
+class CountryMatcher:
+    def __init__(self, phrases: Dict[str, str]):
+        self._root: Dict[str, dict] = {}
+        self.size = 0
+        for phrase, iso in phrases.items():
+            toks = tokenize(phrase)
+            if not toks:
+                continue
+            node = self._root
+            for tok in toks:
+                node = node.setdefault(tok, {})
+            node[_END] = iso
+            self.size += 1
+
+    def _longest_at(self, toks: List[str], i: int) -> Optional[Tuple[int, str]]:
+        node, best = self._root, None
+        for j in range(i, len(toks)):
+            node = node.get(toks[j])
+            if node is None:
+                break
+            iso = node.get(_END)
+            if iso is not None:
+                best = (j + 1, iso)
+        return best
+
+    def find_all(self, text: Optional[str]) -> List[Tuple[str, str]]:
+        """Non-overlapping leftmost-longest matches as [(phrase, ISO2)]."""
+        toks = tokenize(text)
+        out, i = [], 0
+        while i < len(toks):
+            hit = self._longest_at(toks, i) if toks[i] in self._root else None
+            if hit:
+                end, iso = hit
+                out.append((" ".join(toks[i:end]), iso))
+                i = end
+            else:
+                i += 1
+        return out
+
+    def first(self, text: Optional[str]) -> Optional[str]:
+        toks = tokenize(text)
+        root = self._root
+        for i, tok in enumerate(toks):
+            if tok in root:
+                hit = self._longest_at(toks, i)
+                if hit:
+                    return hit[1]
+        return None
+
+    def first_many(self, texts: Iterable[Optional[str]]) -> List[Optional[str]]:
+        return [self.first(t) for t in texts]
+
+
+matcher = CountryMatcher(GAZETTEER)
+
+
+def infer_country(text: Optional[str]) -> Optional[str]:
+    return matcher.first(text)
+
+
+def infer_countries(texts: Iterable[Optional[str]]) -> List[Optional[str]]:
+    """Batch form of infer_country for a chunk of posts."""
+    return matcher.first_many(texts)
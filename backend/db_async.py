@@ -0,0 +1,64 @@
+# backend/db_async.py
+"""
+Read path for async routes. With ASYNC_DB on (and aiosqlite/greenlet installed)
+reads run on an AsyncEngine; otherwise they fall back to a worker thread with the
+regular sync session. Either way callers pass a plain fn(session, ...) so the
+statement builders in queries.py / rollups.py are shared with the sync code.
+"""
+from typing import Any, Callable, TypeVar
+
+from sqlalchemy import event
+from starlette.concurrency import run_in_threadpool
+
+from metrics import instrument_engine
+from models import DATABASE_URL, ReadSessionLocal, apply_sqlite_pragmas, engine_kwargs
+from settings import ASYNC_DB
+
+T = TypeVar("T")
+
+_ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def async_url(url: str) -> str:
+    scheme, rest = url.split("://", 1)
+    if scheme == "postgresql+psycopg":  # psycopg 3 does both
+        return url
+    return f"{_ASYNC_DRIVERS.get(scheme.split('+')[0], scheme)}://{rest}"
+
+
+async_engine = None
+AsyncSessionLocal = None
+if ASYNC_DB:
+    try:
+        import greenlet  # noqa: F401  (needed by AsyncSession.run_sync)
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        _url = async_url(DATABASE_URL)
+        async_engine = create_async_engine(_url, **engine_kwargs(_url))
+        if async_engine.dialect.name == "sqlite":
+            event.listen(async_engine.sync_engine, "connect", lambda conn, _rec: apply_sqlite_pragmas(conn))
+        instrument_engine(async_engine.sync_engine)
+        AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+    except Exception as e:
+        print("[db] async engine unavailable, reads use worker threads:", repr(e))
+
+
+def sync_read(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """fn(session, ...) in a short-lived read-only sync session, closed before returning (blocking)."""
+    sess = ReadSessionLocal()
+    try:
+        return fn(sess, *args, **kwargs)
+    finally:
+        sess.close()
+
+
+async def run_read(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Await fn(session, *args, **kwargs) without blocking the event loop."""
+    if AsyncSessionLocal is None:
+        return await run_in_threadpool(sync_read, fn, *args, **kwargs)
+    async with AsyncSessionLocal() as sess:
+        return await sess.run_sync(fn, *args, **kwargs)
+
+
+async def dispose():
+    if async_engine is not None:
+        await async_engine.dispose()
@@ -0,0 +1,215 @@
+# backend/dedup.py
+"""
+Near-duplicate detection for ingest. Each text gets a 64-bit SimHash over word
+3-shingles; two texts are duplicates when their hashes differ in at most
+DEDUP_MAX_DISTANCE bits. The hash is cut into DEDUP_MAX_DISTANCE + 1 bands,
+so (pigeonhole) any such pair agrees exactly on at least one band: lookups are
+one dict probe per band plus a popcount per candidate, O(1) amortized.
+
+Signatures persist in post_signatures. Each process keeps a per-keyword band
+index in memory, loaded on first use, and catches up on rows other processes
+wrote (by seq) before every check. check() does not touch that index: ingest
+adds a batch's verdicts with add_verdicts() once they are committed, so a
+rolled-back batch leaves no phantom canonicals. Dropped duplicates keep a row that points at
+their canonical post, so re-fetching the same id is dropped by id alone.
+"""
+import hashlib
+import threading
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from country_matcher import tokenize
+from models import PostSignature, ReadSessionLocal
+from settings import (
+    DEDUP_ENABLED,
+    DEDUP_MAX_DISTANCE,
+    DEDUP_MAX_PER_KEYWORD,
+    DEDUP_MIN_TOKENS,
+    DEDUP_WINDOW_DAYS,
+)
+from storage import upsert_rows
+
+_BITS = 64
+_SHINGLE = 3
+
+# (signature or None when the text is too short to compare, canonical post id if it is a duplicate)
+Verdict = Tuple[Optional[int], Optional[str]]
+
+
+def simhash(text: Optional[str]) -> Optional[int]:
+    """64-bit SimHash of word 3-shingles; None for texts under DEDUP_MIN_TOKENS tokens."""
+    tokens = tokenize(text)
+    if len(tokens) < max(1, DEDUP_MIN_TOKENS):
+        return None
+    shingles = {" ".join(tokens[i:i + _SHINGLE]) for i in range(max(1, len(tokens) - _SHINGLE + 1))}
+    digests = b"".join(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest() for s in shingles)
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8)).reshape(-1, _BITS)
+    # each bit of the result: set if most shingle hashes have it set
+    votes = bits.sum(axis=0, dtype=np.int32) * 2 > len(shingles)
+    return int.from_bytes(np.packbits(votes).tobytes(), "big")
+
+
+def _to_signed(sig: int) -> int:
+    return sig - (1 << _BITS) if sig >= 1 << (_BITS - 1) else sig
+
+
+def _to_unsigned(sig: int) -> int:
+    return sig + (1 << _BITS) if sig < 0 else sig
+
+
+def _hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class _KeywordIndex:
+    """
+    Band tables over the canonical signatures of one keyword, plus every known id
+    (duplicates too). Both go through one FIFO: the oldest are evicted first.
+    """
+
+    def __init__(self, bands: Sequence[Tuple[int, int]], max_items: int):
+        self.bands = bands
+        self.max_items = max_items
+        self.tables: List[Dict[int, List[str]]] = [{} for _ in bands]
+        self.by_id: Dict[str, Tuple[int, Optional[str]]] = {}  # post id -> (signature, canonical id)
+        self.order: Deque[str] = deque()  # every id in by_id, oldest first
+        self.last_seq = 0
+
+    def _keys(self, sig: int) -> List[int]:
+        return [(sig >> shift) & mask for shift, mask in self.bands]
+
+    def find(self, sig: int, max_distance: int) -> Optional[str]:
+        for table, key in zip(self.tables, self._keys(sig)):
+            for pid in table.get(key, ()):
+                if _hamming(sig, self.by_id[pid][0]) <= max_distance:
+                    return pid
+        return None
+
+    def add(self, pid: str, sig: int, canonical: Optional[str] = None):
+        if pid in self.by_id:
+            return
+        self.by_id[pid] = (sig, canonical)
+        if canonical is None:  # only canonical posts go into the band tables
+            for table, key in zip(self.tables, self._keys(sig)):
+                table.setdefault(key, []).append(pid)
+        self.order.append(pid)
+        while len(self.order) > self.max_items:
+            self._evict(self.order.popleft())
+
+    def _evict(self, pid: str):
+        sig, canonical = self.by_id.pop(pid)
+        if canonical is not None:
+            return
+        for table, key in zip(self.tables, self._keys(sig)):
+            bucket = table.get(key)
+            if bucket:
+                bucket.remove(pid)
+                if not bucket:
+                    del table[key]
+
+
+class DedupIndex:
+    def __init__(self, enabled: bool = DEDUP_ENABLED, max_distance: int = DEDUP_MAX_DISTANCE,
+                 max_per_keyword: int = DEDUP_MAX_PER_KEYWORD, window_days: int = DEDUP_WINDOW_DAYS):
+        self.enabled = enabled
+        self.max_distance = max(0, min(_BITS // 4, int(max_distance)))
+        n_bands = self.max_distance + 1
+        width = _BITS // n_bands
+        self.bands = [
+            (i * width, (1 << (width if i < n_bands - 1 else _BITS - i * width)) - 1)
+            for i in range(n_bands)
+        ]
+        self.max_per_keyword = max(1, int(max_per_keyword))
+        self.window_days = int(window_days)
+        self._kw: Dict[str, _KeywordIndex] = {}
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.dropped = 0
+
+    def _sync(self, sess: Session, keyword: str) -> _KeywordIndex:
+        """Load signatures written since the last look (all of them on first use). Caller holds the lock."""
+        idx = self._kw.get(keyword)
+        if idx is None:
+            idx = self._kw[keyword] = _KeywordIndex(self.bands, self.max_per_keyword)
+        since = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=self.window_days)
+        rows = sess.execute(
+            select(PostSignature.seq, PostSignature.post_id, PostSignature.simhash,
+                   PostSignature.canonical_id, PostSignature.created_at)
+            .where(PostSignature.keyword == keyword, PostSignature.seq > idx.last_seq)
+            .order_by(PostSignature.seq)
+        ).all()
+        for seq, pid, sig, canonical, created_at in rows:
+            if self.window_days <= 0 or created_at is None or created_at >= since:
+                idx.add(pid, _to_unsigned(sig), canonical)
+            idx.last_seq = seq
+        return idx
+
+    def check(self, keyword: str, ids: Sequence[Optional[str]], texts: Sequence[str]) -> List[Verdict]:
+        """
+        One verdict per text: (signature, canonical id of the post it duplicates or None).
+        Kept texts are staged in a batch-local index, so duplicates inside the same batch
+        are caught too. record() persists the verdicts with the posts; add_verdicts()
+        indexes them after the commit.
+        """
+        if not self.enabled:
+            return [(None, None)] * len(texts)
+        sigs = [simhash(t) if pid else None for pid, t in zip(ids, texts)]
+        out: List[Verdict] = []
+        sess = ReadSessionLocal()
+        try:
+            with self._lock:
+                idx = self._sync(sess, keyword)
+                staged = _KeywordIndex(self.bands, max(1, len(ids)))
+                for pid, sig in zip(ids, sigs):
+                    if sig is None:
+                        out.append((None, None))
+                        continue
+                    known = idx.by_id.get(pid) or staged.by_id.get(pid)
+                    if known is not None:
+                        out.append((sig, known[1]))  # seen before: a re-fetch (or update) of itself
+                        continue
+                    canonical = idx.find(sig, self.max_distance) or staged.find(sig, self.max_distance)
+                    staged.add(pid, sig, canonical)
+                    out.append((sig, canonical))
+                self.checked += len(texts)
+                self.dropped += sum(1 for _, c in out if c is not None)
+        finally:
+            sess.close()
+        return out
+
+    def record(self, sess: Session, keyword: str, ids: Sequence[Optional[str]], verdicts: Sequence[Verdict]):
+        """Persist signatures in the caller's transaction (the one writing the posts)."""
+        now = datetime.now(timezone.utc)
+        rows = [
+            {"post_id": pid, "keyword": keyword, "simhash": _to_signed(sig), "canonical_id": canonical, "created_at": now}
+            for pid, (sig, canonical) in zip(ids, verdicts)
+            if pid and sig is not None
+        ]
+        upsert_rows(sess, PostSignature.__table__, rows, ["post_id"], update_cols=["simhash"])
+
+    def add_verdicts(self, keyword: str, ids: Sequence[Optional[str]], verdicts: Sequence[Verdict]):
+        """Ingest hook: index verdicts whose record() was committed (keywords not loaded yet sync later)."""
+        with self._lock:
+            idx = self._kw.get(keyword)
+            if idx is None:
+                return
+            for pid, (sig, canonical) in zip(ids, verdicts):
+                if pid and sig is not None:
+                    idx.add(pid, sig, canonical)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "checked": self.checked,
+                "dropped": self.dropped,
+                "keywords": len(self._kw),
+                "signatures": sum(len(i.order) for i in self._kw.values()),
+            }
+
+
+dedup_index = DedupIndex()
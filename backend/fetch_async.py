@@ -0,0 +1,130 @@
+# backend/fetch_async.py
+"""
+httpx.AsyncClient versions of the YouTube / NewsAPI fetchers for async routes.
+They drive the same fetch plans as ingest.py (so watermarks work the same way),
+and the per-source TokenBuckets are the same objects, so both paths share one
+request budget.
+"""
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+
+from ingest import Plan, _rate, news_plan, yt_comments_plan, yt_search_due, yt_search_plan
+from metrics import observe_upstream
+from settings import (
+    HTTP_TIMEOUT_SEC,
+    NEWSAPI_KEY,
+    YOUTUBE_API_KEY,
+    YT_COMMENTS_PER_VIDEO,
+    YT_MAX_CONCURRENCY,
+    YT_MAX_VIDEOS,
+)
+from watermarks import Watermark
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT_SEC,
+            limits=httpx.Limits(max_connections=max(4, YT_MAX_CONCURRENCY)),
+        )
+    return _client
+
+
+async def aclose():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def aget_json_cond(source: str, url: str, params: Dict[str, Any],
+                         etag: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    GET through the shared async client, waiting (without blocking) for the source's rate budget.
+    With etag, sends If-None-Match; returns (None, etag) on 304, else (json, response ETag).
+    """
+    while True:
+        wait = _rate[source].try_acquire()
+        if wait <= 0:
+            break
+        await asyncio.sleep(wait)
+    started, status = time.perf_counter(), "error"
+    try:
+        r = await _get_client().get(url, params=params, headers={"If-None-Match": etag} if etag else None)
+        status = str(r.status_code)
+        if r.status_code == 304:
+            return None, etag
+        r.raise_for_status()
+        return r.json(), r.headers.get("ETag")
+    finally:
+        observe_upstream(source, status, time.perf_counter() - started)
+
+
+async def aget_json(source: str, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    return (await aget_json_cond(source, url, params))[0]
+
+
+async def arun_plan(source: str, plan: Plan) -> Any:
+    """Async driver for ingest's fetch plans."""
+    try:
+        req = next(plan)
+        while True:
+            req = plan.send(await aget_json_cond(source, *req))
+    except StopIteration as done:
+        return done.value
+
+
+async def ayoutube_live(keyword: str, max_videos: int = YT_MAX_VIDEOS,
+                        comments_per_video: int = YT_COMMENTS_PER_VIDEO,
+                        wm: Optional[Watermark] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Async iter_youtube_live: comment pages fetched concurrently, yielded as each video completes."""
+    if not YOUTUBE_API_KEY:
+        return
+    wm = wm or Watermark(keyword, "youtube")
+    if yt_search_due(wm):
+        try:
+            await arun_plan("youtube", yt_search_plan(keyword, wm, max_videos))
+        except Exception:
+            pass  # poll the videos already watched
+    sem = asyncio.Semaphore(max(1, YT_MAX_CONCURRENCY))
+
+    async def comments(vid: str) -> List[Dict[str, Any]]:
+        async with sem:
+            try:
+                return await arun_plan("youtube", yt_comments_plan(vid, wm, comments_per_video))
+            except Exception:
+                return []
+
+    tasks = [asyncio.ensure_future(comments(v)) for v in wm.watched()]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            for item in await fut:
+                yield item
+    finally:
+        for t in tasks:
+            t.cancel()  # consumer stopped early
+
+
+async def anews_newsapi(keyword: str, page_size: int = 30,
+                        wm: Optional[Watermark] = None) -> AsyncIterator[Dict[str, Any]]:
+    if not NEWSAPI_KEY:
+        return
+    try:
+        items = await arun_plan("news", news_plan(keyword, wm or Watermark(keyword, "news"), page_size))
+    except Exception:
+        return
+    for item in items:
+        yield item
+
+
+# async counterparts of ingest.LIVE_FETCHERS
+ASYNC_LIVE_FETCHERS = {
+    "youtube": lambda kw, wm=None: ayoutube_live(kw, wm=wm),
+    "news": lambda kw, wm=None: anews_newsapi(kw, page_size=30, wm=wm),
+}
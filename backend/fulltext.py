@@ -0,0 +1,168 @@
+# backend/fulltext.py
+"""
+Full-text search over every stored post, whatever keyword it was ingested under
+(/api/search?mode=fulltext). SQLite uses an external-content FTS5 table kept in
+sync by triggers on posts; Postgres uses a GIN index on to_tsvector('english', text).
+Both stem English words, so "electric vehicles" also finds "electric vehicle".
+
+Query syntax (all terms must match, results ranked by relevance):
+    electric cars        both words anywhere in the text
+    "battery range"      phrase
+    charg*               prefix (charger, charging, ...)
+
+The FTS5 table is keyed by posts.rowid; VACUUM can renumber those, so run
+`python fulltext.py rebuild` after a VACUUM.
+"""
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Sequence
+
+from sqlalchemy import column, func, literal_column, select, table, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import Select
+
+from country_matcher import tokenize
+from models import Post
+
+FTS_TABLE = "posts_fts"
+_PG_CONFIG = "'english'"
+_CLAUSE_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+
+@dataclass
+class Clause:
+    tokens: List[str]
+    prefix: bool = False  # last token matches as a prefix
+
+
+def parse_query(q: str) -> List[Clause]:
+    """Split a query into phrase / prefix / plain-term clauses (tokens are [a-z0-9]+ only)."""
+    clauses = []
+    for phrase, word in _CLAUSE_RE.findall(q or ""):
+        if phrase:
+            toks = tokenize(phrase)
+            if toks:
+                clauses.append(Clause(toks))
+            continue
+        toks = tokenize(word)
+        if not toks:
+            continue
+        if word.endswith("*"):
+            # "e-bike*" -> phrase "e bike" with a prefix on the last token
+            clauses.append(Clause(toks, prefix=True))
+        else:
+            clauses.extend(Clause([t]) for t in toks)
+    return clauses
+
+
+def fts5_match(clauses: Sequence[Clause]) -> str:
+    # tokens are alphanumeric, so quoting them is all the escaping FTS5 needs
+    return " AND ".join(
+        '"' + " ".join(c.tokens) + '"' + ("*" if c.prefix else "") for c in clauses
+    )
+
+
+def pg_tsquery(clauses: Sequence[Clause]) -> str:
+    parts = []
+    for c in clauses:
+        toks = list(c.tokens)
+        if c.prefix:
+            toks[-1] += ":*"
+        parts.append("(" + " <-> ".join(toks) + ")")
+    return " & ".join(parts)
+
+
+# must match the expression of ix_posts_text_fts for the planner to use the index
+_PG_DOCUMENT = f"to_tsvector({_PG_CONFIG}, coalesce(text, ''))"
+
+
+def _pg_document():
+    return func.to_tsvector(literal_column(_PG_CONFIG), func.coalesce(Post.text, literal_column("''")))
+
+
+def search_stmt(dialect: str, clauses: Sequence[Clause], cutoff: datetime, limit: Optional[int],
+                offset: int = 0, fields: Sequence[str] = ()) -> Select:
+    """
+    Ranked page of posts matching every clause within the window. Selects id, keyword,
+    created_at, the requested fields and `score` (higher is more relevant).
+    limit=None returns every match (wrap it to count them).
+    """
+    names = list(dict.fromkeys(["id", "keyword", "created_at", *fields]))
+    cols = [getattr(Post, n) for n in names]
+    if dialect == "sqlite":
+        fts = table(FTS_TABLE, column("rowid"), column("rank"))
+        stmt = (
+            select(*cols, (-fts.c.rank).label("score"))
+            .select_from(fts.join(Post.__table__, literal_column("posts.rowid") == fts.c.rowid))
+            .where(literal_column(FTS_TABLE).op("MATCH")(fts5_match(clauses)))
+            .order_by(fts.c.rank)  # FTS5 returns rows in bm25 order itself, no sort step
+        )
+    else:
+        query = func.to_tsquery(literal_column(_PG_CONFIG), pg_tsquery(clauses))
+        rank = func.ts_rank_cd(_pg_document(), query)
+        stmt = (
+            select(*cols, rank.label("score"))
+            .where(_pg_document().op("@@")(query))
+            .order_by(rank.desc(), Post.id)
+        )
+    return stmt.where(Post.created_at >= cutoff).limit(limit).offset(offset or None)
+
+
+def count_stmt(dialect: str, clauses: Sequence[Clause], cutoff: datetime) -> Select:
+    return select(func.count()).select_from(search_stmt(dialect, clauses, cutoff, None).order_by(None).subquery())
+
+
+def ensure_index(conn: Connection) -> bool:
+    """Create the index (and its triggers) and fill it from posts. False when unsupported."""
+    if conn.dialect.name == "sqlite":
+        if not conn.execute(text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")).scalar():
+            print("[fulltext] this SQLite build has no FTS5; mode=fulltext is unavailable")
+            return False
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "text, content='posts', content_rowid='rowid', tokenize='porter unicode61 remove_diacritics 2')"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS posts_fts_ai AFTER INSERT ON posts BEGIN "
+            f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.rowid, new.text); END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS posts_fts_ad AFTER DELETE ON posts BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.rowid, old.text); END"
+        ))
+        # upserts rewrite every column; only re-index when the text really changed
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS posts_fts_au AFTER UPDATE OF text ON posts "
+            f"WHEN old.text IS NOT new.text BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.rowid, old.text); "
+            f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.rowid, new.text); END"
+        ))
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        return True
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_posts_text_fts ON posts USING GIN ({_PG_DOCUMENT})"
+        ))
+        return True
+    print(f"[fulltext] no full-text index for dialect {conn.dialect.name}")
+    return False
+
+
+def index_available(conn: Connection) -> bool:
+    if conn.dialect.name == "sqlite":
+        return conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = :n"), {"n": FTS_TABLE}
+        ).first() is not None
+    return conn.dialect.name == "postgresql"
+
+
+if __name__ == "__main__":
+    import sys
+    from models import init_db, write_engine
+    init_db()
+    if sys.argv[1:] == ["rebuild"]:
+        with write_engine.begin() as conn:
+            print("[fulltext] rebuilt" if ensure_index(conn) else "[fulltext] not available")
+    else:
+        print("usage: python fulltext.py rebuild")
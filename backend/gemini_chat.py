@@ -1,13 +1,7 @@
 # backend/gemini_chat.py
-from typing import List, Dict, Any
-import json
-from settings import GOOGLE_API_KEY, GEMINI_SENTIMENT_MODEL
-
-try:
-    import google.generativeai as genai
-    genai.configure(api_key=GOOGLE_API_KEY or "")
-except Exception:
-    genai = None
+from typing import List, Dict, Any, Optional
+from llm_gateway import LLMUnavailable, gateway
+from settings import GEMINI_SENTIMENT_MODEL, CHAT_CONTEXT_MAX_POSTS, CHAT_SNIPPET_CHARS
 
 SYSTEM_PROMPT = (
     "You are a helpful analyst. Answer concisely using the provided context. "
@@ -15,34 +9,56 @@ SYSTEM_PROMPT = (
     "Prefer grounded, practical insights. Avoid making up sources."
 )
 
-def build_context(keyword: str, posts: List[Dict[str, Any]]) -> str:
-    """Compact context string from recent posts."""
-    lines = [f"TOPIC: {keyword}", f"ITEMS ({len(posts)}):"]
-    for p in posts[:40]:
+def build_context(keyword: str, posts: List[Dict[str, Any]], stats: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Compact context string from the selected posts (retrieval.py picks them).
+    stats: window totals, so the model sees the whole window's shape, not just the sample.
+    """
+    lines = [f"TOPIC: {keyword}"]
+    if stats:
+        top = ", ".join(f"{cc} {n}" for cc, n in stats.get("top_countries", []))
+        lines.append(
+            f"WINDOW: {stats['n']} posts ({stats['positive']} positive, {stats['negative']} negative, "
+            f"{stats['neutral']} neutral)" + (f"; top countries: {top}" if top else "")
+        )
+    lines.append(f"ITEMS ({min(len(posts), CHAT_CONTEXT_MAX_POSTS)}, most relevant to the question first):")
+    for p in posts[:CHAT_CONTEXT_MAX_POSTS]:
         cc = p.get("country_code") or ""
         lab = p.get("sentiment_label") or "neutral"
-        t  = (p.get("text") or "").replace("\n", " ")[:220]
+        t  = (p.get("text") or "").replace("\n", " ")[:CHAT_SNIPPET_CHARS]
         lines.append(f"- [{cc}][{lab}] {t}")
     return "\n".join(lines)
 
+def _fallback_reply(keyword: str, posts: List[Dict[str, Any]], stats: Optional[Dict[str, Any]]) -> str:
+    """Answer without the model: window totals plus the most relevant posts."""
+    lines = ["The language model is unavailable right now, so here is the raw evidence instead."]
+    if stats:
+        lines.append(f"'{keyword}': {stats['n']} posts in this window ({stats['positive']} positive, "
+                     f"{stats['negative']} negative, {stats['neutral']} neutral).")
+    for p in posts[:3]:
+        lines.append(f"- [{p.get('country_code') or '?'}][{p.get('sentiment_label') or 'neutral'}] "
+                     f"{(p.get('text') or '')[:160]}")
+    return "\n".join(lines)
+
 def chat_reply(keyword: str, posts: List[Dict[str, Any]],
-               history: List[Dict[str, str]], user_msg: str) -> str:
+               history: List[Dict[str, str]], user_msg: str, stats: Optional[Dict[str, Any]] = None) -> str:
     """
     history: [{role:'user'|'assistant', content:'...'}]
     returns: assistant reply string
     """
-    if genai is None or not GOOGLE_API_KEY:
+    if not gateway.available():
         return "Gemini is not configured on the server. Ask the organizer to set GOOGLE_API_KEY."
 
-    model = genai.GenerativeModel(GEMINI_SENTIMENT_MODEL)
-    # Start a chat with a short system preamble and a compact context block
-    ctx = build_context(keyword, posts)
-    chat = model.start_chat(history=[
-        {"role": "user", "parts": SYSTEM_PROMPT},
-        {"role": "user", "parts": f"Context for analysis:\n{ctx}"},
-        *[{"role": m["role"], "parts": m["content"]} for m in (history or [])],
-    ])
-
-    response = chat.send_message(user_msg)
-    # Classic SDK: prefer response.text
-    return getattr(response, "text", "") or "Sorry, I couldn't generate a response."
+    # system preamble + compact context block, then the conversation so far
+    ctx = build_context(keyword, posts, stats)
+    try:
+        reply = gateway.generate(
+            GEMINI_SENTIMENT_MODEL,
+            user_msg,
+            system=f"{SYSTEM_PROMPT}\n\nContext for analysis:\n{ctx}",
+            history=[m for m in (history or []) if m.get("content")],
+        )
+    except LLMUnavailable as e:
+        print("[chat][llm-unavailable]", e)
+        return _fallback_reply(keyword, posts, stats)
+    return reply or "Sorry, I couldn't generate a response."
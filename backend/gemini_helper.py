@@ -1,25 +1,15 @@
 # backend/gemini_helper.py
 import json
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from settings import GOOGLE_API_KEY, GEMINI_SENTIMENT_MODEL
+from heuristics import insights_from_posts
+from llm_gateway import LLMUnavailable, gateway
+from settings import GEMINI_SENTIMENT_MODEL
 
 _DEBUG = True
 def _dbg(*a):
     if _DEBUG: print("[insights]", *a)
 
-# ---- Classic SDK only ----
-try:
-    import google.generativeai as genai
-    if GOOGLE_API_KEY:
-        genai.configure(api_key=GOOGLE_API_KEY)
-        _dbg("google-generativeai loaded:", getattr(genai, "__version__", "?"))
-    else:
-        _dbg("GOOGLE_API_KEY missing")
-except Exception as e:
-    genai = None
-    _dbg("failed to import google.generativeai:", repr(e))
-
 def _safe_json_loads(s: str) -> Dict[str, Any]:
     try:
         return json.loads(s)
@@ -32,52 +22,28 @@ def _safe_json_loads(s: str) -> Dict[str, Any]:
         return {}
 
 def _heuristic_insights(keyword: str, posts: List[Dict[str, Any]]) -> Dict[str, Any]:
-    if not posts:
-        return {
-            "summary": "No recent posts to summarize for this window.",
-            "themes": [],
-            "aspects": {"price": 0, "quality": 0, "service": 0},
-            "quotes": []
-        }
-    pos = sum(1 for p in posts if str(p.get("sentiment_label","")).startswith("pos"))
-    neg = sum(1 for p in posts if str(p.get("sentiment_label","")).startswith("neg"))
-    neu = len(posts) - pos - neg
-    avg = 0.0; n=0
-    for p in posts:
-        try: avg += float(p.get("sentiment_score") or 0); n += 1
-        except: pass
-    avg = (avg/n) if n else 0.0
+    return insights_from_posts(keyword, posts)
 
-    def _aspect(words):
-        score = 0
-        for p in posts:
-            t = (p.get("text") or "").lower()
-            hit = any(w in t for w in words)
-            if hit:
-                lab = p.get("sentiment_label","neutral")
-                score += 1 if lab=="positive" else -1 if lab=="negative" else 0
-        return max(-1.0, min(1.0, score / max(1,len(posts))))
+HEURISTIC = "heuristic"
 
-    aspects = {
-        "price": _aspect(["price","cost","expensive","cheap","afford"]),
-        "quality": _aspect(["quality","reliable","buggy","performance","battery","range"]),
-        "service": _aspect(["support","service","warranty","customer","shipping"]),
-    }
-    quotes = [{"text": (p.get("text") or "")[:140], "sentiment": p.get("sentiment_label","neutral")}
-              for p in posts[:5]]
-    summary = (f"For '{keyword}', we analyzed {len(posts)} items: "
-               f"{pos} positive, {neg} negative, {neu} neutral. "
-               f"Average sentiment ≈ {avg:.2f}.")
-    return {"summary": summary, "themes": ["adoption","experience","policy"], "aspects": aspects, "quotes": quotes}
+def insights_model() -> str:
+    """What summarize_posts will answer with right now (part of the insights cache key)."""
+    return GEMINI_SENTIMENT_MODEL if gateway.ready(GEMINI_SENTIMENT_MODEL) else HEURISTIC
 
-def summarize_posts(keyword: str, posts: List[Dict[str, Any]]) -> Dict[str, Any]:
+def summarize_posts(keyword: str, posts: List[Dict[str, Any]],
+                    fallback: Optional[Callable[[], Dict[str, Any]]] = None) -> Tuple[Dict[str, Any], str]:
+    """
+    Gemini summary of posts as (insights, model that answered). Whenever Gemini can't
+    answer, returns (fallback(), HEURISTIC): fallback is e.g. heuristics over the whole
+    window, else heuristics over `posts`.
+    """
+    heuristic = lambda: ((fallback or (lambda: _heuristic_insights(keyword, posts)))(), HEURISTIC)
     if not posts:
-        return _heuristic_insights(keyword, posts)
+        return heuristic()
 
-    # If classic SDK not available or no key → heuristic
-    if genai is None or not GOOGLE_API_KEY:
-        _dbg("Classic SDK not available or no key → heuristic")
-        return _heuristic_insights(keyword, posts)
+    # not configured, or the breaker is open → heuristic without waiting on the upstream
+    if not gateway.ready(GEMINI_SENTIMENT_MODEL):
+        return heuristic()
 
     items = [{
         "text": (p.get("text") or "")[:400],
@@ -101,20 +67,7 @@ def summarize_posts(keyword: str, posts: List[Dict[str, Any]]) -> Dict[str, Any]
     )
 
     try:
-        model = genai.GenerativeModel(GEMINI_SENTIMENT_MODEL)
-        resp = model.generate_content(
-            prompt,
-            generation_config={
-                "temperature": 0.2,
-                "response_mime_type": "application/json",
-            },
-        )
-        text = getattr(resp, "text", "") or ""
-        if not text and getattr(resp, "candidates", None):
-            parts = resp.candidates[0].content.parts
-            if parts and getattr(parts[0], "text", None):
-                text = parts[0].text
-
+        text = gateway.generate(GEMINI_SENTIMENT_MODEL, prompt, json_mode=True, temperature=0.2)
         _dbg("model:", GEMINI_SENTIMENT_MODEL, "chars:", len(text or ""))
         data = _safe_json_loads((text or "").strip())
 
@@ -132,9 +85,10 @@ def summarize_posts(keyword: str, posts: List[Dict[str, Any]]) -> Dict[str, Any]
                 "service": max(-1.0, min(1.0, _num(aspects.get("service", 0)))),
             },
             "quotes": data.get("quotes", []),
-        }
+        }, GEMINI_SENTIMENT_MODEL
+    except LLMUnavailable as e:
+        _dbg("unavailable:", e)
+        return heuristic()
     except Exception as e:
         _dbg("ERROR:", repr(e))
-        try: _dbg("raw_response:", resp)
-        except: pass
-        return _heuristic_insights(keyword, posts)
+        return heuristic()
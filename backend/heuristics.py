@@ -0,0 +1,185 @@
+# backend/heuristics.py
+"""
+Heuristic insights (the fallback when Gemini is unavailable), computed over
+NumPy arrays for the whole window instead of looping over post dicts.
+
+Aspect mentions are matched once per text at ingest: AspectLexicon compiles all
+aspect prefixes into one regex (one capture group per aspect), and the result
+is stored as a bitmask in posts.aspect_mask. At request time only three columns
+are read (label, score, mask); counts, the average and every aspect score are
+array operations.
+"""
+import hashlib
+import json
+import re
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import bindparam, case, func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from models import AppMeta, Post
+from queries import recent_posts_stmt
+from settings import ASPECTS_PATH
+
+# word-start prefixes: "afford" matches "affordable", "range" no longer matches "arrange"
+DEFAULT_ASPECTS: Dict[str, List[str]] = {
+    "price": ["price", "cost", "expensive", "cheap", "afford"],
+    "quality": ["quality", "reliable", "buggy", "performance", "battery", "range"],
+    "service": ["support", "service", "warranty", "customer", "shipping"],
+}
+_DEFAULT_THEMES = ["adoption", "experience", "policy"]
+_META_KEY = "aspect_lexicon"
+_REINDEX_CHUNK = 5000
+
+
+class AspectLexicon:
+    """Aspect name -> word prefixes, compiled into a single case-insensitive regex."""
+
+    def __init__(self, aspects: Dict[str, Sequence[str]]):
+        if not 0 < len(aspects) <= 62:
+            raise ValueError("aspect lexicon needs 1..62 aspects (one bit each)")
+        # longest first so the regex prefers it; ties by name keep the fingerprint stable
+        self.aspects = {name: sorted({t.lower() for t in terms}, key=lambda t: (-len(t), t))
+                        for name, terms in aspects.items()}
+        self.names = list(self.aspects)
+        groups = "|".join(
+            "(" + "|".join(re.escape(t) for t in terms) + ")" for terms in self.aspects.values()
+        )
+        self._re = re.compile(r"\b(?:" + groups + ")", re.IGNORECASE)
+        self.fingerprint = hashlib.sha1(json.dumps(self.aspects, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def mask(self, text: Optional[str]) -> int:
+        m = 0
+        for hit in self._re.finditer(text or ""):
+            m |= 1 << (hit.lastindex - 1)
+        return m
+
+    def masks(self, texts: Sequence[str]) -> List[int]:
+        return [self.mask(t) for t in texts]
+
+
+def load_lexicon(path: Optional[str] = ASPECTS_PATH) -> AspectLexicon:
+    if not path:
+        return AspectLexicon(DEFAULT_ASPECTS)
+    with open(path, "r", encoding="utf-8") as f:
+        return AspectLexicon(json.load(f))
+
+
+lexicon = load_lexicon()
+
+
+def ensure_aspect_masks(engine: Engine, lex: AspectLexicon = lexicon) -> int:
+    """
+    (Re)compute posts.aspect_mask when the lexicon differs from the one that built
+    the stored masks (first run, or ASPECTS_PATH changed). Returns rows updated.
+    """
+    with Session(engine) as sess:
+        stored = sess.get(AppMeta, _META_KEY)
+        if stored is not None and stored.value == lex.fingerprint:
+            return 0
+    table = Post.__table__
+    stmt = table.update().where(table.c.id == bindparam("pid")).values(aspect_mask=bindparam("mask"))
+    updated, last_id = 0, ""
+    while True:
+        with Session(engine) as sess:
+            rows = sess.execute(
+                select(Post.id, Post.text).where(Post.id > last_id).order_by(Post.id).limit(_REINDEX_CHUNK)
+            ).all()
+            if not rows:
+                sess.merge(AppMeta(key=_META_KEY, value=lex.fingerprint))
+                sess.commit()
+                break
+            sess.execute(stmt, [{"pid": pid, "mask": lex.mask(text)} for pid, text in rows])
+            sess.commit()
+        updated += len(rows)
+        last_id = rows[-1][0]
+    if updated:
+        print(f"[heuristics] aspect masks rebuilt for {updated} posts ({', '.join(lex.names)})")
+    return updated
+
+
+# ---------------------------
+# Insights over arrays
+# ---------------------------
+def summarize_arrays(keyword: str, labels: np.ndarray, masks: np.ndarray, counts: np.ndarray,
+                     score_sums: np.ndarray, quotes: List[Dict[str, Any]],
+                     lex: AspectLexicon = lexicon) -> Dict[str, Any]:
+    """
+    Rows are groups of posts sharing a label (+1 positive, 0 neutral, -1 negative) and an
+    aspect bitmask, with their post count and score sum (one row per post works too:
+    counts of 1). Same output shape as summarize_posts.
+    """
+    n = int(counts.sum())
+    if n == 0:
+        return {
+            "summary": "No recent posts to summarize for this window.",
+            "themes": [],
+            "aspects": {name: 0 for name in lex.names},
+            "quotes": [],
+        }
+    pos = int(counts[labels == 1].sum())
+    neg = int(counts[labels == -1].sum())
+    neu = n - pos - neg
+    avg = float(score_sums.sum()) / n
+    # (rows, aspects) 0/1 matrix; each post counts +1/-1 toward every aspect it mentions
+    hits = (masks[:, None] >> np.arange(len(lex.names), dtype=np.int64)) & 1
+    aspect_scores = np.clip((labels.astype(np.int64) * counts) @ hits / n, -1.0, 1.0)
+    mentions = counts @ hits
+    themes = [lex.names[i] for i in np.argsort(-mentions, kind="stable") if mentions[i] > 0]
+    summary = (f"For '{keyword}', we analyzed {n} items: "
+               f"{pos} positive, {neg} negative, {neu} neutral. "
+               f"Average sentiment ≈ {avg:.2f}.")
+    return {
+        "summary": summary,
+        "themes": themes or list(_DEFAULT_THEMES),
+        "aspects": {name: float(v) for name, v in zip(lex.names, aspect_scores)},
+        "quotes": quotes,
+    }
+
+
+def _label_codes(labels: Sequence[Optional[str]]) -> np.ndarray:
+    return np.fromiter(
+        (1 if l == "positive" else -1 if l == "negative" else 0 for l in labels),
+        dtype=np.int8, count=len(labels),
+    )
+
+
+def insights_from_posts(keyword: str, posts: List[Dict[str, Any]], lex: AspectLexicon = lexicon) -> Dict[str, Any]:
+    """Heuristic insights for an in-memory post list (dicts as built for summarize_posts)."""
+    scores = np.fromiter((_num(p.get("sentiment_score")) for p in posts), dtype=np.float64, count=len(posts))
+    masks = np.fromiter(
+        (p["aspect_mask"] if p.get("aspect_mask") is not None else lex.mask(p.get("text")) for p in posts),
+        dtype=np.int64, count=len(posts),
+    )
+    quotes = [{"text": (p.get("text") or "")[:140], "sentiment": p.get("sentiment_label", "neutral")}
+              for p in posts[:5]]
+    labels = _label_codes([p.get("sentiment_label") for p in posts])
+    return summarize_arrays(keyword, labels, masks, np.ones(len(posts), dtype=np.int64), scores, quotes, lex)
+
+
+def _num(x: Any) -> float:
+    try:
+        return float(x or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def window_insights(sess: Session, keyword: str, cutoff, lex: AspectLexicon = lexicon) -> Dict[str, Any]:
+    """
+    Heuristic insights over every post of the window. The database groups posts by
+    (label, aspect mask), so only a few dozen rows come back however large the window.
+    """
+    label = case((Post.sentiment_label == "positive", 1), (Post.sentiment_label == "negative", -1), else_=0)
+    mask = func.coalesce(Post.aspect_mask, 0)
+    rows = sess.execute(
+        select(label, mask, func.count(), func.coalesce(func.sum(Post.sentiment_score), 0.0))
+        .where(Post.keyword == keyword, Post.created_at >= cutoff)
+        .group_by(label, mask)
+    ).all()
+    labels, masks, counts, sums = zip(*rows) if rows else ((), (), (), ())
+    quotes = [{"text": (p.text or "")[:140], "sentiment": p.sentiment_label or "neutral"}
+              for p in sess.execute(recent_posts_stmt(keyword, cutoff, limit=5)).scalars()]
+    return summarize_arrays(keyword, np.array(labels, dtype=np.int8), np.array(masks, dtype=np.int64),
+                            np.array(counts, dtype=np.int64), np.array(sums, dtype=np.float64), quotes, lex)
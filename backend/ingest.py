@@ -1,188 +1,284 @@
 # backend/ingest.py
 import hashlib
 import json
-import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
-from typing import Iterable, Dict, Any, List, Optional
+from typing import Generator, Iterable, Iterator, Dict, Any, List, Optional, Tuple
 
 import requests
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
+from requests.adapters import HTTPAdapter
 
-from country_map import COUNTRY_KEYWORDS
-from models import Post, SessionLocal
+from country_matcher import infer_countries
+from dedup import Verdict, dedup_index
+from heuristics import lexicon as aspect_lexicon
+from metrics import ingest_items, observe_upstream
+from models import Post, ReadSessionLocal, SessionLocal
+from ratelimit import TokenBucket
+from retention import retention_horizon
+from retrieval import retrieval_index
+from sentiment import get_engine
+from sqlalchemy import select
+from storage import chunked, upsert_posts
+from watermarks import Watermark, load_all as load_watermarks, rfc3339, save as save_watermarks
 from settings import (
     YOUTUBE_API_KEY,
     NEWSAPI_KEY,
-    GOOGLE_API_KEY,
-    USE_GEMINI_SENTIMENT,
-    GEMINI_SENTIMENT_MODEL,
-    GEMINI_SENTIMENT_MAX_ITEMS,
+    INGEST_BATCH_SIZE,
+    HTTP_TIMEOUT_SEC,
+    YT_MAX_VIDEOS,
+    YT_COMMENTS_PER_VIDEO,
+    YT_SEARCH_MIN_INTERVAL_SEC,
+    YT_MAX_CONCURRENCY,
+    YT_MAX_RPS,
+    NEWSAPI_MAX_RPS,
+    YOUTUBE_API_BASE,
+    NEWSAPI_BASE,
 )
 
-# Try to initialize Gemini client if key present (optional)
-try:
-    from google import genai
-    from google.genai import types as genai_types
-    _gemini_client = genai.Client(api_key=GOOGLE_API_KEY) if GOOGLE_API_KEY else None
-except Exception:
-    _gemini_client = None
-
 # ---------------------------
-# Helpers (text + sentiment)
+# Helpers (text)
 # ---------------------------
-analyzer = SentimentIntensityAnalyzer()
-
-URL_RE = re.compile(r"https?://\S+")
-NON_ALNUM_RE = re.compile(r"[^a-z0-9\s]+")
-
 def clean_text(txt: Optional[str]) -> str:
     """Basic cleaner used before sentiment; keeps punctuation minimal."""
     return " ".join((txt or "").split())
 
-def _normalize_for_match(txt: Optional[str]) -> str:
-    """Normalize for matching country keywords (lowercase, strip URLs/punct, collapse spaces)."""
-    t = (txt or "").lower().replace("’", "'")
-    t = URL_RE.sub(" ", t)
-    t = NON_ALNUM_RE.sub(" ", t)
-    t = re.sub(r"\s+", " ", t).strip()
-    return f" {t} "
-
-def infer_country(text: Optional[str]) -> Optional[str]:
-    t = _normalize_for_match(text)
-    for k, iso in COUNTRY_KEYWORDS.items():  # keys lowercase in country_map.py
-        if f" {k} " in t:
-            return iso
-    return None
-
-# ---- Sentiment engines ----
-def analyze_sentiment_vader(text: str) -> tuple[float, str]:
-    scores = analyzer.polarity_scores(text or "")
-    comp = scores["compound"]
-    if comp >= 0.05:
-        label = "positive"
-    elif comp <= -0.05:
-        label = "negative"
-    else:
-        label = "neutral"
-    return comp, label
+def _parse_iso(dt: Optional[str]) -> datetime:
+    """Parse ISO timestamps into UTC (naive input is taken as UTC); fallback to now (UTC)."""
+    if not dt:
+        return datetime.now(timezone.utc)
+    try:
+        parsed = datetime.fromisoformat(dt.replace("Z", "+00:00"))
+    except Exception:
+        return datetime.now(timezone.utc)
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)  # stored columns are naive UTC
 
-_gemini_calls = 0  # simple per-process cap
+# ---------------------------
+# Shared HTTP session (keep-alive) + per-source request budget
+# ---------------------------
+_http = requests.Session()
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(4, YT_MAX_CONCURRENCY))
+_http.mount("https://", _adapter)
+_http.mount("http://", _adapter)  # local stand-ins (YOUTUBE_API_BASE / NEWSAPI_BASE)
+_rate = {
+    "youtube": TokenBucket(YT_MAX_RPS),
+    "news": TokenBucket(NEWSAPI_MAX_RPS),
+}
 
-def analyze_sentiment_gemini(text: str) -> tuple[float, str]:
+def _get_json_cond(source: str, url: str, params: Dict[str, Any],
+                   etag: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
     """
-    Ask Gemini to classify sentiment and give a score in [-1,1].
-    Falls back to VADER on any error or when over the per-process cap.
+    GET through the pooled session, waiting for the source's rate budget first.
+    With etag, sends If-None-Match; returns (None, etag) on 304, else (json, response ETag).
     """
-    global _gemini_calls
-    if not (_gemini_client and GOOGLE_API_KEY):
-        return analyze_sentiment_vader(text)
-    if _gemini_calls >= max(0, int(GEMINI_SENTIMENT_MAX_ITEMS or 0)):
-        return analyze_sentiment_vader(text)
-
-    prompt = (
-        "Classify the sentiment of the text as one of: positive, neutral, negative. "
-        "Also provide a real-valued score in [-1,1] (negative numbers = negative). "
-        'Return STRICT JSON: {"label":"positive|neutral|negative","score": <number>}.\n'
-        f"Text: {text!r}"
-    )
+    _rate[source].acquire()
+    started, status = time.perf_counter(), "error"
     try:
-        resp = _gemini_client.models.generate_content(
-            model=GEMINI_SENTIMENT_MODEL,
-            contents=[genai_types.Content(role="user", parts=[genai_types.Part.from_text(prompt)])],
-            config=genai_types.GenerateContentConfig(
-                response_mime_type="application/json",
-                temperature=0.0,
-            ),
-        )
-        _gemini_calls += 1
-        data = json.loads((resp.text or "{}").strip())
-        score = float(data.get("score", 0.0))
-        label = str(data.get("label", "neutral")).lower()
-        if label not in ("positive", "neutral", "negative"):
-            return analyze_sentiment_vader(text)
-        score = max(-1.0, min(1.0, score))  # clamp
-        return score, label
-    except Exception:
-        return analyze_sentiment_vader(text)
+        r = _http.get(url, params=params, timeout=HTTP_TIMEOUT_SEC,
+                      headers={"If-None-Match": etag} if etag else None)
+        status = str(r.status_code)
+        if r.status_code == 304:
+            return None, etag
+        r.raise_for_status()
+        return r.json(), r.headers.get("ETag")
+    finally:
+        observe_upstream(source, status, time.perf_counter() - started)
 
-def analyze_sentiment_auto(text: str) -> tuple[float, str]:
-    """Router: use Gemini if enabled+available; otherwise VADER."""
-    if USE_GEMINI_SENTIMENT and _gemini_client:
-        return analyze_sentiment_gemini(text)
-    return analyze_sentiment_vader(text)
+def _get_json(source: str, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    return _get_json_cond(source, url, params)[0]
 
-def _parse_iso(dt: Optional[str]) -> datetime:
-    """Parse ISO timestamps; fallback to now (UTC)."""
-    if not dt:
-        return datetime.now(timezone.utc)
+# A fetch plan is a generator that yields (url, params, etag) for each upstream call and is
+# sent back (json or None on 304, response etag); its return value is the result. The sync
+# and async fetchers drive the same plans, so incremental logic lives in one place.
+Plan = Generator[Tuple[str, Dict[str, Any], Optional[str]], Tuple[Optional[Dict[str, Any]], Optional[str]], Any]
+
+def run_plan(source: str, plan: Plan) -> Any:
     try:
-        return datetime.fromisoformat(dt.replace("Z", "+00:00"))
-    except Exception:
-        return datetime.now(timezone.utc)
+        req = next(plan)
+        while True:
+            req = plan.send(_get_json_cond(source, *req))
+    except StopIteration as done:
+        return done.value
 
 # ---------------------------
 # YouTube (Data API v3)
+# Request params + response parsing are shared with the async fetchers (fetch_async.py).
 # ---------------------------
-def _yt_search_video_ids(keyword: str, max_results: int = 5) -> List[str]:
-    if not YOUTUBE_API_KEY:
-        return []
-    url = "https://www.googleapis.com/youtube/v3/search"
+YT_SEARCH_URL = f"{YOUTUBE_API_BASE}/search"
+YT_COMMENTS_URL = f"{YOUTUBE_API_BASE}/commentThreads"
+NEWSAPI_URL = f"{NEWSAPI_BASE}/everything"
+
+_yt_pool = ThreadPoolExecutor(max_workers=max(1, YT_MAX_CONCURRENCY), thread_name_prefix="yt-fetch")
+
+def yt_search_params(keyword: str, published_after: Optional[datetime] = None) -> Dict[str, Any]:
     params = {
         "key": YOUTUBE_API_KEY,
         "q": keyword,
         "type": "video",
-        "part": "id",
+        "part": "snippet",  # same quota as part=id, and carries publishedAt for the watermark
         "order": "date",
-        "maxResults": str(max_results),
     }
-    try:
-        r = requests.get(url, params=params, timeout=20)
-        r.raise_for_status()
-        return [it["id"]["videoId"] for it in r.json().get("items", [])]
-    except Exception:
-        return []
+    if published_after is not None:
+        params["publishedAfter"] = rfc3339(published_after)
+    return params
 
-def _yt_top_comments(video_id: str, max_results: int = 20) -> List[Dict[str, Any]]:
-    if not YOUTUBE_API_KEY:
-        return []
-    url = "https://www.googleapis.com/youtube/v3/commentThreads"
-    params = {
+def yt_comments_params(video_id: str) -> Dict[str, Any]:
+    return {
         "key": YOUTUBE_API_KEY,
         "part": "snippet",
         "videoId": video_id,
-        "maxResults": str(max_results),
-        "order": "relevance",
+        "order": "time",  # newest first: polling stops at the first comment already stored
         "textFormat": "plainText",
     }
+
+def yt_video_ids(data: Dict[str, Any]) -> List[str]:
+    return [it["id"]["videoId"] for it in data.get("items", [])]
+
+def yt_comment_items(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """One commentThreads page -> ingest items."""
+    out = []
+    for item in data.get("items", []):
+        s = item["snippet"]["topLevelComment"]["snippet"]
+        out.append({
+            "id": f"yt_{item['id']}",
+            "source": "youtube",
+            "author": s.get("authorDisplayName") or "anon",
+            "text": s.get("textDisplay") or "",
+            "created_at": s.get("publishedAt"),
+        })
+    return out
+
+def yt_search_due(wm: Watermark) -> bool:
+    if wm.searched_at is None or not wm.videos:
+        return True
+    age = datetime.now(timezone.utc).replace(tzinfo=None) - wm.searched_at
+    return age.total_seconds() >= YT_SEARCH_MIN_INTERVAL_SEC
+
+def yt_search_plan(keyword: str, wm: Watermark, max_results: int) -> Plan:
+    """New videos since the watermark (newest first, up to max_results) join wm's watched set."""
+    params = yt_search_params(keyword, wm.published_at)
+    found: List[Tuple[str, Optional[str]]] = []
+    etag: Optional[str] = None
+    first = True
+    while len(found) < max_results:
+        params["maxResults"] = str(min(50, max_results - len(found)))
+        data, tag = yield YT_SEARCH_URL, params, (wm.etag if first else None)
+        if first:
+            etag, first = tag, False
+        if data is None:  # 304: same result as last time
+            break
+        found.extend((it["id"]["videoId"], (it.get("snippet") or {}).get("publishedAt"))
+                     for it in data.get("items", []))
+        token = data.get("nextPageToken")
+        if not token:
+            break
+        params["pageToken"] = token
+    # state changes only once every page arrived: a failed search leaves the watermark as it was
+    wm.searched_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    wm.etag = etag
+    for vid, published in found[:max_results]:
+        published_at = _parse_iso(published) if published else None
+        wm.watch(vid, published_at)
+        wm.advance(published_at)
+    return [vid for vid, _ in found[:max_results]]
+
+def yt_comments_plan(video_id: str, wm: Watermark, max_results: int) -> Plan:
+    """
+    Comments newer than the newest one stored for this video, newest first, up to max_results.
+    A 304 on the first page means nothing new. When the budget runs out before reaching the
+    stored ones, the page token is kept and later refreshes fill that gap with spare budget.
+    """
+    state = wm.videos.setdefault(video_id, {})
+    newest = state.get("newest")
+    out: List[Dict[str, Any]] = []
+    params = yt_comments_params(video_id)
+    etag, token, caught_up = state.get("etag"), None, False
+    first = True
+    while len(out) < max_results:
+        params["maxResults"] = str(min(100, max_results - len(out)))
+        data, tag = yield YT_COMMENTS_URL, params, (state.get("etag") if first else None)
+        if first:
+            etag, first = tag, False
+        if data is None:
+            caught_up = True
+            break
+        items = yt_comment_items(data)
+        fresh = [it for it in items if newest is None or (it["created_at"] or "") > newest]
+        out.extend(fresh)
+        token = data.get("nextPageToken")
+        if len(fresh) < len(items) or not token:
+            caught_up = True
+            break
+        params["pageToken"] = token
+    gap = wm.page_tokens.get(video_id)
+    if not caught_up and newest is not None:
+        gap = {"token": token, "until": newest}  # replaces an older gap: newer comments matter more
+    while gap is not None and caught_up and len(out) < max_results:
+        params = {**yt_comments_params(video_id), "pageToken": gap["token"],
+                  "maxResults": str(min(100, max_results - len(out)))}
+        data, _ = yield YT_COMMENTS_URL, params, None
+        items = yt_comment_items(data or {})
+        older = [it for it in items if (it["created_at"] or "") > gap["until"]]
+        out.extend(older)
+        nxt = (data or {}).get("nextPageToken")
+        gap = {**gap, "token": nxt} if nxt and len(older) == len(items) else None
+    if gap is None:
+        wm.page_tokens.pop(video_id, None)
+    else:
+        wm.page_tokens[video_id] = gap
+    stamps = [it["created_at"] for it in out if it["created_at"]]
+    if stamps:
+        state["newest"] = max(stamps + ([newest] if newest else []))
+    state["etag"] = etag
+    return out
+
+def _yt_search_video_ids(keyword: str, wm: Watermark, max_results: int = 5) -> List[str]:
+    """Search for new videos when it's due; returns the videos to poll for comments."""
+    if not YOUTUBE_API_KEY:
+        return []
+    if yt_search_due(wm):
+        try:
+            run_plan("youtube", yt_search_plan(keyword, wm, max_results))
+        except Exception:
+            pass  # poll the videos already watched
+    return wm.watched()
+
+def _yt_top_comments(video_id: str, wm: Watermark, max_results: int = 20) -> List[Dict[str, Any]]:
+    """New comments for a watched video; empty on errors (the watermark for it stays put)."""
+    if not YOUTUBE_API_KEY:
+        return []
     try:
-        r = requests.get(url, params=params, timeout=20)
-        r.raise_for_status()
-        out: List[Dict[str, Any]] = []
-        for item in r.json().get("items", []):
-            s = item["snippet"]["topLevelComment"]["snippet"]
-            out.append({
-                "id": f"yt_{item['id']}",
-                "source": "youtube",
-                "author": s.get("authorDisplayName") or "anon",
-                "text": s.get("textDisplay") or "",
-                "created_at": s.get("publishedAt"),
-            })
-        return out
+        return run_plan("youtube", yt_comments_plan(video_id, wm, max_results))
     except Exception:
         return []
 
-def iter_youtube_live(keyword: str) -> Iterable[Dict[str, Any]]:
-    for vid in _yt_search_video_ids(keyword, max_results=5):
-        for c in _yt_top_comments(vid, max_results=20):
-            yield c
+def iter_youtube_live(keyword: str, max_videos: int = YT_MAX_VIDEOS,
+                      comments_per_video: int = YT_COMMENTS_PER_VIDEO,
+                      wm: Optional[Watermark] = None) -> Iterable[Dict[str, Any]]:
+    """
+    Fan out commentThreads calls over the shared pool; yields comments as each video completes.
+    wm (advanced in place) limits the calls to what is new since the last refresh.
+    """
+    wm = wm or Watermark(keyword, "youtube")
+    futures = [
+        _yt_pool.submit(_yt_top_comments, vid, wm, comments_per_video)
+        for vid in _yt_search_video_ids(keyword, wm, max_results=max_videos)
+    ]
+    try:
+        for fut in as_completed(futures):
+            yield from fut.result()
+    finally:
+        for fut in futures:
+            fut.cancel()  # consumer stopped early: drop calls that have not started
 
 # ---------------------------
 # News (NewsAPI)
 # ---------------------------
-def iter_news_newsapi(keyword: str, page_size: int = 30) -> Iterable[Dict[str, Any]]:
-    if not NEWSAPI_KEY:
-        return []
-    url = "https://newsapi.org/v2/everything"
+_NEWS_MAX_PAGES = 5  # catching up after a gap: at most this many pages per refresh
+
+def news_params(keyword: str, page_size: int = 30, since: Optional[datetime] = None) -> Dict[str, Any]:
     params = {
         "q": keyword,
         "language": "en",
@@ -190,85 +286,208 @@ def iter_news_newsapi(keyword: str, page_size: int = 30) -> Iterable[Dict[str, A
         "pageSize": str(page_size),
         "apiKey": NEWSAPI_KEY,
     }
+    if since is not None:
+        params["from"] = rfc3339(since)  # inclusive; the article on the boundary is skipped by id
+    return params
+
+def news_items(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """NewsAPI /everything response -> ingest items (title + description as text)."""
+    out = []
+    for a in data.get("articles", []):
+        title = a.get("title") or ""
+        desc = a.get("description") or ""
+        content = f"{title}. {desc}".strip()
+        if not content:
+            continue
+        uid = "nw_" + hashlib.md5((a.get("url") or content).encode("utf-8")).hexdigest()
+        out.append({
+            "id": uid,
+            "source": "news",
+            "author": (a.get("source") or {}).get("name") or "news",
+            "text": content,
+            "created_at": a.get("publishedAt") or datetime.now(timezone.utc).isoformat(),
+        })
+    return out
+
+def news_plan(keyword: str, wm: Watermark, page_size: int = 30) -> Plan:
+    """
+    Articles published since the watermark, newest first. The first fetch of a keyword takes
+    one page; later ones page on (up to _NEWS_MAX_PAGES) until they reach the watermark.
+    """
+    params = news_params(keyword, page_size, wm.published_at)
+    items: List[Dict[str, Any]] = []
+    published: List[datetime] = []
+    etag: Optional[str] = None
+    for page in range(1, _NEWS_MAX_PAGES + 1):
+        if page > 1:
+            params["page"] = str(page)
+        data, tag = yield NEWSAPI_URL, params, (wm.etag if page == 1 else None)
+        if page == 1:
+            etag = tag
+        if data is None:
+            break
+        items.extend(news_items(data))
+        articles = data.get("articles") or []
+        published.extend(_parse_iso(a["publishedAt"]) for a in articles if a.get("publishedAt"))
+        if wm.published_at is None or len(articles) < page_size or page * page_size >= int(data.get("totalResults") or 0):
+            break
+    wm.etag = etag
+    for dt in published:
+        wm.advance(dt)
+    return items
+
+def iter_news_newsapi(keyword: str, page_size: int = 30, wm: Optional[Watermark] = None) -> Iterable[Dict[str, Any]]:
+    if not NEWSAPI_KEY:
+        return []
     try:
-        r = requests.get(url, params=params, timeout=20)
-        r.raise_for_status()
-        for a in r.json().get("articles", []):
-            title = a.get("title") or ""
-            desc = a.get("description") or ""
-            content = f"{title}. {desc}".strip()
-            if not content:
-                continue
-            uid = "nw_" + hashlib.md5((a.get("url") or content).encode("utf-8")).hexdigest()
-            yield {
-                "id": uid,
-                "source": "news",
-                "author": (a.get("source") or {}).get("name") or "news",
-                "text": content,
-                "created_at": a.get("publishedAt") or datetime.now(timezone.utc).isoformat(),
-            }
+        return run_plan("news", news_plan(keyword, wm or Watermark(keyword, "news"), page_size))
     except Exception:
         return []
 
 # ---------------------------
 # Ingest into DB (live + sample)
 # ---------------------------
-def _score_with_engine(text: str, engine_choice: str) -> tuple[float, str]:
-    if engine_choice == "gemini":
-        return analyze_sentiment_gemini(text)
-    if engine_choice == "vader":
-        return analyze_sentiment_vader(text)
-    return analyze_sentiment_auto(text)  # "auto" or anything else
-
-def ingest_live(keyword: str, items: Iterable[Dict[str, Any]], engine_choice: str = "auto"):
-    """Upsert a batch of items (any source) into the DB with sentiment + country."""
-    sess = SessionLocal()
+def _iter_chunks(items: Iterable[Dict[str, Any]], size: int) -> Iterable[List[Dict[str, Any]]]:
+    chunk: List[Dict[str, Any]] = []
+    for it in items:
+        chunk.append(it)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def stored_ids(ids: Iterable[Optional[str]]) -> set:
+    """The ids among `ids` that are already in posts (primary-key lookups, 500 per query)."""
+    wanted = list({i for i in ids if i})
+    if not wanted:
+        return set()
+    sess = ReadSessionLocal()
+    try:
+        found = set()
+        for part in chunked(wanted, 500):
+            found.update(sess.execute(select(Post.id).where(Post.id.in_(part))).scalars())
+        return found
+    finally:
+        sess.close()
+
+def _build_rows(keyword: str, items: List[Dict[str, Any]], engine_choice: str, default_source: str,
+                skip_existing: bool = True) -> Tuple[List[Dict[str, Any]], List[Optional[str]], List[Verdict]]:
+    """
+    Clean a chunk (skipping posts past retention and, with skip_existing, ids already stored),
+    drop near-duplicates, score the rest with one engine call, then attach country and aspect
+    mentions. Returns (rows, ids checked for duplicates, their dedup verdicts).
+    """
+    horizon = retention_horizon()
+    batch = []
     for it in items:
         text = clean_text(it.get("text", ""))
-        if not text:
-            continue
-        score, label = _score_with_engine(text, engine_choice)
-        cc = infer_country(text)
-        created_dt = _parse_iso(it.get("created_at"))
-
-        p = Post(
-            id=it.get("id"),
-            keyword=keyword,
-            source=it.get("source", "web"),
-            author=it.get("author", "anon"),
-            text=text,
-            created_at=created_dt,
-            sentiment_score=score,
-            sentiment_label=label,
-            country_code=cc,
-        )
-        sess.merge(p)  # upsert by primary key
-    sess.commit()
-    sess.close()
-
-def ingest_sample(keyword: str, path: str = "sample_data.json", engine_choice: str = "auto"):
-    """Load sample JSON, run sentiment + country, and upsert into DB."""
+        created_at = _parse_iso(it.get("created_at"))
+        # already past retention: archived posts must not come back (their rollups stayed)
+        if text and (horizon is None or created_at >= horizon):
+            batch.append((it, text, created_at))
+    ingest_items.inc("expired_or_empty", amount=len(items) - len(batch))
+    if skip_existing and batch:
+        known = stored_ids(it.get("id") for it, _, _ in batch)
+        if known:
+            kept = [b for b in batch if b[0].get("id") not in known]
+            ingest_items.inc("known", amount=len(batch) - len(kept))
+            batch = kept
+    ids = [it.get("id") for it, _, _ in batch]
+    verdicts = dedup_index.check(keyword, ids, [text for _, text, _ in batch])
+    batch = [b for b, (_, canonical) in zip(batch, verdicts) if canonical is None]
+    ingest_items.inc("duplicate", amount=len(ids) - len(batch))
+    ingest_items.inc("scored", amount=len(batch))
+    texts = [text for _, text, _ in batch]
+    scores = get_engine(engine_choice).score_batch(texts)
+    countries = infer_countries(texts)
+    masks = aspect_lexicon.masks(texts)
+    rows = [
+        {
+            "id": it.get("id"),
+            "keyword": keyword,
+            "source": it.get("source", default_source),
+            "author": it.get("author", "anon"),
+            "text": text,
+            "created_at": created_at,
+            "sentiment_score": score,
+            "sentiment_label": label,
+            "country_code": cc,
+            "aspect_mask": mask,
+        }
+        for (it, text, created_at), (score, label), cc, mask in zip(batch, scores, countries, masks)
+    ]
+    return rows, ids, verdicts
+
+def ingest_chunk(keyword: str, items: List[Dict[str, Any]], engine_choice: str = "auto",
+                 default_source: str = "web", skip_existing: bool = True) -> Tuple[List[Dict[str, Any]], int, int]:
+    """
+    Score + upsert one chunk and commit it. Returns (stored rows, inserted, updated).
+    skip_existing=False re-scores ids that are already stored (sample reloads).
+    """
     sess = SessionLocal()
+    try:
+        rows, ids, verdicts = _build_rows(keyword, items, engine_choice, default_source, skip_existing)
+        ins, upd = upsert_posts(sess, rows)
+        dedup_index.record(sess, keyword, ids, verdicts)
+        sess.commit()
+        dedup_index.add_verdicts(keyword, ids, verdicts)
+        retrieval_index.add_rows(keyword, rows)
+        return rows, ins, upd
+    finally:
+        sess.close()
+
+def iter_ingest_chunks(keyword: str, items: Iterable[Dict[str, Any]], engine_choice: str = "auto",
+                       default_source: str = "web", batch_size: int = INGEST_BATCH_SIZE,
+                       skip_existing: bool = True) -> Iterator[Tuple[List[Dict[str, Any]], int, int]]:
+    """
+    Lazily score + upsert items chunk by chunk, committing each chunk.
+    Yields (stored rows, inserted, updated) right after each commit.
+    """
+    for chunk in _iter_chunks(items, max(1, batch_size)):
+        yield ingest_chunk(keyword, chunk, engine_choice, default_source, skip_existing)
+
+def _ingest_items(keyword: str, items: Iterable[Dict[str, Any]], engine_choice: str,
+                  default_source: str, skip_existing: bool = True) -> Dict[str, int]:
+    inserted = updated = 0
+    for _, ins, upd in iter_ingest_chunks(keyword, items, engine_choice, default_source,
+                                          skip_existing=skip_existing):
+        inserted += ins
+        updated += upd
+    return {"inserted": inserted, "updated": updated}
+
+def ingest_live(keyword: str, items: Iterable[Dict[str, Any]], engine_choice: str = "auto") -> Dict[str, int]:
+    """Upsert a batch of items (any source) into the DB with sentiment + country."""
+    return _ingest_items(keyword, items, engine_choice, default_source="web")
+
+def ingest_sample(keyword: str, path: str = "sample_data.json", engine_choice: str = "auto") -> Dict[str, int]:
+    """Load sample JSON, run sentiment + country, and upsert into DB."""
     with open(path, "r", encoding="utf-8") as f:
         data = json.load(f)
-    for item in data:
-        text = clean_text(item.get("text", ""))
-        if not text:
-            continue
-        score, label = _score_with_engine(text, engine_choice)
-        cc = infer_country(text)
-        created_dt = _parse_iso(item.get("created_at"))
-        p = Post(
-            id=item.get("id"),
-            keyword=keyword,
-            source=item.get("source", "sample"),
-            author=item.get("author", "anon"),
-            text=text,
-            created_at=created_dt,
-            sentiment_score=score,
-            sentiment_label=label,
-            country_code=cc,
-        )
-        sess.merge(p)
-    sess.commit()
-    sess.close()
+    return _ingest_items(keyword, data, engine_choice, default_source="sample", skip_existing=False)
+
+def parse_sources(sources: Optional[str]) -> List[str]:
+    """'youtube,news' -> ['youtube', 'news'] (lowercased, blanks dropped)."""
+    return [s.strip().lower() for s in (sources or "").split(",") if s.strip()]
+
+# live fetchers by source name, in the order a refresh pulls them; wm = that source's watermark
+LIVE_FETCHERS = {
+    "youtube": lambda kw, wm=None: iter_youtube_live(kw, wm=wm),
+    "news": lambda kw, wm=None: iter_news_newsapi(kw, page_size=30, wm=wm),
+}
+
+def refresh_keyword(keyword: str, sources: Iterable[str] = ("youtube", "news"),
+                    engine_choice: str = "auto") -> int:
+    """
+    Fetch what is new for a keyword since its watermarks and ingest it; the watermarks
+    advance once the items are committed. Returns #items fetched.
+    """
+    srcs = [src for src in LIVE_FETCHERS if src in set(sources)]
+    marks = load_watermarks(keyword, srcs)
+    items: List[Dict[str, Any]] = []
+    for src in srcs:
+        items.extend(LIVE_FETCHERS[src](keyword, marks[src]))
+    if items:
+        ingest_live(keyword, items, engine_choice=engine_choice)
+    save_watermarks(*marks.values())
+    return len(items)
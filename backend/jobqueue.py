@@ -0,0 +1,285 @@
+# backend/jobqueue.py
+"""
+Durable refresh job queue in the database (table ingest_jobs), so queued keywords
+survive restarts and jobs can run in other processes (worker.py) than the API
+that enqueued them.
+
+- enqueue(): a keyword has at most one queued/running job (a partial unique index
+  backs this up when several processes enqueue at once)
+- claim(): lease the oldest due job; a running job whose lease ran out (its worker
+  died or hung) is claimed again, and counts as another attempt
+- renew(): the worker extends its lease while a long job runs
+- finish() / fail(): done, or queued again with exponential backoff until
+  max_attempts, then failed for good (the dead letter; retry_failed() requeues)
+
+Times are naive UTC like the other DB columns; dicts handed out carry aware datetimes.
+"""
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import IngestJob, ReadSessionLocal, SessionLocal
+from settings import (
+    INGEST_JOB_KEEP_SEC,
+    INGEST_JOB_LEASE_SEC,
+    INGEST_JOB_MAX_ATTEMPTS,
+    INGEST_JOB_RETRY_BASE_SEC,
+)
+
+PENDING = ("queued", "running")
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _aware(dt: Optional[datetime]) -> Optional[datetime]:
+    return dt.replace(tzinfo=timezone.utc) if dt is not None and dt.tzinfo is None else dt
+
+
+def _as_dict(job: IngestJob) -> Dict[str, Any]:
+    return {
+        "id": job.id,
+        "keyword": job.keyword,
+        "sources": [s for s in (job.sources or "").split(",") if s],
+        "engine": job.engine,
+        "status": job.status,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "enqueued_at": _aware(job.enqueued_at),
+        "started_at": _aware(job.started_at),
+        "finished_at": _aware(job.finished_at),
+        "fetched": job.fetched,
+        "error": job.error,
+    }
+
+
+def read_job(sess: Session, job_id: str) -> Optional[Dict[str, Any]]:
+    """One job as a dict (usable with db_async.run_read)."""
+    job = sess.get(IngestJob, job_id)
+    return _as_dict(job) if job else None
+
+
+class JobQueue:
+    def __init__(self, lease_sec: int = INGEST_JOB_LEASE_SEC, max_attempts: int = INGEST_JOB_MAX_ATTEMPTS,
+                 retry_base_sec: float = INGEST_JOB_RETRY_BASE_SEC):
+        self.lease_sec = max(1, int(lease_sec))
+        self.max_attempts = max(1, int(max_attempts))
+        self.retry_base_sec = max(0.0, float(retry_base_sec))
+        self._wakeup = threading.Event()  # set by enqueue(): in-process workers skip the poll wait
+
+    # --- producers ---
+    def enqueue(self, keyword: str, sources: Iterable[str], engine: str = "auto") -> Dict[str, Any]:
+        """Queue a refresh, or return the keyword's queued/running job if it has one."""
+        sess = SessionLocal()
+        try:
+            existing = self._pending_job(sess, keyword)
+            if existing is not None:
+                out = _as_dict(existing)
+                sess.commit()
+                return out
+            now = _now()
+            job = IngestJob(id=uuid.uuid4().hex, keyword=keyword, sources=",".join(sources), engine=engine,
+                            status="queued", attempts=0, max_attempts=self.max_attempts,
+                            available_at=now, enqueued_at=now)
+            sess.add(job)
+            out = _as_dict(job)
+            try:
+                sess.commit()
+            except IntegrityError:  # another process enqueued it between our read and insert
+                sess.rollback()
+                existing = self._pending_job(sess, keyword)
+                out = _as_dict(existing) if existing is not None else out
+                sess.commit()
+                return out
+        finally:
+            sess.close()
+        self._wakeup.set()
+        return out
+
+    @staticmethod
+    def _pending_job(sess: Session, keyword: str) -> Optional[IngestJob]:
+        return sess.execute(
+            select(IngestJob).where(IngestJob.keyword == keyword, IngestJob.status.in_(PENDING))
+        ).scalars().first()
+
+    # --- consumers ---
+    @staticmethod
+    def _next_due(sess: Session, now: datetime, lock: bool) -> Optional[IngestJob]:
+        """A running job whose lease ran out (its worker died) first, else the oldest due queued one."""
+        expired = (select(IngestJob).where(IngestJob.status == "running", IngestJob.lease_expires_at < now)
+                   .order_by(IngestJob.lease_expires_at).limit(1))
+        queued = (select(IngestJob).where(IngestJob.status == "queued", IngestJob.available_at <= now)
+                  .order_by(IngestJob.available_at).limit(1))
+        if lock:
+            # FOR UPDATE SKIP LOCKED on PostgreSQL; on SQLite the BEGIN IMMEDIATE write lock
+            # already serializes claimers
+            expired, queued = expired.with_for_update(skip_locked=True), queued.with_for_update(skip_locked=True)
+        return sess.execute(expired).scalars().first() or sess.execute(queued).scalars().first()
+
+    def claim(self, owner: str) -> Optional[Dict[str, Any]]:
+        """Lease the next due job to `owner` and mark it running; None when there is nothing to do."""
+        peek = ReadSessionLocal()  # idle polling stays off the write lock
+        try:
+            if self._next_due(peek, _now(), lock=False) is None:
+                return None
+        finally:
+            peek.close()
+        sess = SessionLocal()
+        try:
+            while True:
+                now = _now()
+                job = self._next_due(sess, now, lock=True)
+                if job is None:
+                    sess.commit()
+                    return None
+                if job.status == "running":
+                    print("[jobs][lease-expired]", job.keyword, job.id, job.lease_owner)
+                    if job.attempts >= job.max_attempts:
+                        job.status, job.finished_at = "failed", now
+                        job.lease_owner = job.lease_expires_at = None
+                        job.error = "lease expired (worker died or hung)"
+                        sess.commit()
+                        continue
+                job.status = "running"
+                job.attempts += 1
+                job.lease_owner = owner
+                job.lease_expires_at = now + timedelta(seconds=self.lease_sec)
+                job.started_at = now
+                out = _as_dict(job)
+                sess.commit()
+                return out
+        finally:
+            sess.close()
+
+    def _update_leased(self, job_id: str, owner: str, **values) -> bool:
+        """UPDATE a job only while `owner` still holds its lease."""
+        sess = SessionLocal()
+        try:
+            res = sess.execute(
+                update(IngestJob)
+                .where(IngestJob.id == job_id, IngestJob.lease_owner == owner, IngestJob.status == "running")
+                .values(**values)
+            )
+            sess.commit()
+            return res.rowcount > 0
+        finally:
+            sess.close()
+
+    def renew(self, job_id: str, owner: str) -> bool:
+        """Extend the lease; False when it was lost (the job may run elsewhere now)."""
+        return self._update_leased(job_id, owner, lease_expires_at=_now() + timedelta(seconds=self.lease_sec))
+
+    def finish(self, job_id: str, owner: str, fetched: Optional[int]) -> bool:
+        return self._update_leased(job_id, owner, status="done", finished_at=_now(), fetched=fetched,
+                                   error=None, lease_owner=None, lease_expires_at=None)
+
+    def fail(self, job_id: str, owner: str, error: str) -> bool:
+        """Queue the job again after a backoff, or fail it for good once its attempts are used up."""
+        sess = SessionLocal()
+        try:
+            job = sess.get(IngestJob, job_id)
+            if job is None or job.status != "running" or job.lease_owner != owner:
+                sess.commit()
+                return False
+            now = _now()
+            job.error, job.lease_owner, job.lease_expires_at = error, None, None
+            if job.attempts >= job.max_attempts:
+                job.status, job.finished_at = "failed", now
+                print("[jobs][dead-letter]", job.keyword, job.id, error)
+            else:
+                job.status = "queued"
+                job.available_at = now + timedelta(seconds=self.retry_base_sec * 2 ** (job.attempts - 1))
+            sess.commit()
+            return True
+        finally:
+            sess.close()
+
+    def wait(self, timeout: float):
+        """Sleep until the next enqueue() in this process or `timeout`, whichever comes first."""
+        if self._wakeup.wait(timeout):
+            self._wakeup.clear()
+
+    def wake(self):
+        self._wakeup.set()
+
+    # --- inspection / upkeep ---
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        sess = ReadSessionLocal()
+        try:
+            return read_job(sess, job_id)
+        finally:
+            sess.close()
+
+    def last_done(self, sess: Session, keywords: List[str]) -> Dict[str, datetime]:
+        """keyword -> when its latest successful refresh finished."""
+        if not keywords:
+            return {}
+        rows = sess.execute(
+            select(IngestJob.keyword, func.max(IngestJob.finished_at))
+            .where(IngestJob.keyword.in_(keywords), IngestJob.status == "done")
+            .group_by(IngestJob.keyword)
+        ).all()
+        return {kw: _aware(at) for kw, at in rows if at is not None}
+
+    def pending(self, sess: Session, keywords: List[str]) -> Set[str]:
+        if not keywords:
+            return set()
+        return set(sess.execute(
+            select(IngestJob.keyword).where(IngestJob.keyword.in_(keywords), IngestJob.status.in_(PENDING))
+        ).scalars())
+
+    def failed(self, limit: int = 100) -> List[Dict[str, Any]]:
+        sess = ReadSessionLocal()
+        try:
+            jobs = sess.execute(
+                select(IngestJob).where(IngestJob.status == "failed")
+                .order_by(IngestJob.finished_at.desc()).limit(limit)
+            ).scalars().all()
+            return [_as_dict(j) for j in jobs]
+        finally:
+            sess.close()
+
+    def retry_failed(self, job_ids: Optional[List[str]] = None) -> int:
+        """Queue failed jobs again with fresh attempts (newest per keyword; skipped if one is pending)."""
+        sess = SessionLocal()
+        try:
+            stmt = select(IngestJob).where(IngestJob.status == "failed").order_by(IngestJob.finished_at.desc())
+            if job_ids:
+                stmt = stmt.where(IngestJob.id.in_(job_ids))
+            jobs = sess.execute(stmt).scalars().all()
+            busy = self.pending(sess, sorted({j.keyword for j in jobs}))
+            now, n = _now(), 0
+            for job in jobs:
+                if job.keyword in busy:
+                    continue
+                busy.add(job.keyword)
+                job.status, job.attempts, job.available_at, job.finished_at = "queued", 0, now, None
+                n += 1
+            sess.commit()
+        finally:
+            sess.close()
+        if n:
+            self._wakeup.set()
+        return n
+
+    def prune(self, keep_sec: int = INGEST_JOB_KEEP_SEC) -> int:
+        """Delete done jobs older than keep_sec; failed ones stay until retried."""
+        sess = SessionLocal()
+        try:
+            res = sess.execute(
+                delete(IngestJob).where(IngestJob.status == "done",
+                                        IngestJob.finished_at < _now() - timedelta(seconds=keep_sec))
+            )
+            sess.commit()
+            return res.rowcount
+        finally:
+            sess.close()
+
+
+job_queue = JobQueue()
@@ -0,0 +1,354 @@
+# backend/llm_gateway.py
+"""
+One way to call the LLM for sentiment, insights and chat. Per model it keeps:
+  - token buckets for requests/min and tokens/min (tokens estimated at ~4 chars each)
+  - a concurrency limit (callers wait at most LLM_QUEUE_TIMEOUT_SEC for a slot)
+  - retries with full-jitter backoff on timeouts, 429s and 5xx
+  - a circuit breaker: after LLM_BREAKER_FAILURES failures in a row, calls fail
+    immediately for LLM_BREAKER_COOLDOWN_SEC, then one probe call decides whether it closes
+Anything that can't be answered raises LLMUnavailable right away (instead of waiting
+out the SDK timeout), and callers fall back to VADER / heuristics.
+
+Backends: one shared google.genai client (LLM_BACKEND=gemini), or an in-process fake
+with configurable latency and error rate (LLM_BACKEND=fake) for tests and benchmarks.
+"""
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from metrics import llm_seconds, record
+from ratelimit import TokenBucket
+from settings import (
+    GEMINI_BASE_URL,
+    GOOGLE_API_KEY,
+    LLM_BACKEND,
+    LLM_BACKOFF_BASE_SEC,
+    LLM_BACKOFF_MAX_SEC,
+    LLM_BREAKER_COOLDOWN_SEC,
+    LLM_BREAKER_FAILURES,
+    LLM_FAKE_ERROR_RATE,
+    LLM_FAKE_LATENCY_MS,
+    LLM_LIMITS,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_RATE_WAIT_SEC,
+    LLM_QUEUE_TIMEOUT_SEC,
+    LLM_RETRIES,
+    LLM_RPM,
+    LLM_TIMEOUT_SEC,
+    LLM_TPM,
+)
+
+try:
+    from google import genai
+    from google.genai import types as genai_types
+except Exception:
+    genai = genai_types = None
+
+Message = Dict[str, str]  # {"role": "user" | "assistant", "content": "..."}
+
+
+class LLMUnavailable(RuntimeError):
+    """The gateway can't answer right now (not configured, breaker open, saturated, or failed)."""
+
+
+def estimate_tokens(*texts: Optional[str]) -> int:
+    return sum(len(t or "") for t in texts) // 4 + 1
+
+
+def _retryable(exc: Exception) -> bool:
+    """Timeouts, connection errors, 429 and 5xx are worth another try; other 4xx are not."""
+    code = getattr(exc, "code", None) or getattr(exc, "status_code", None)
+    return not (isinstance(code, int) and 400 <= code < 500 and code != 429)
+
+
+# ---------------------------
+# Backends
+# ---------------------------
+class GenaiBackend:
+    """google.genai, with one client (and its HTTP connection pool) for the whole process."""
+    name = "gemini"
+
+    def __init__(self, api_key: Optional[str] = GOOGLE_API_KEY, timeout_sec: float = LLM_TIMEOUT_SEC,
+                 base_url: Optional[str] = GEMINI_BASE_URL):
+        self.api_key = api_key
+        self.timeout_sec = timeout_sec
+        self.base_url = base_url
+        self._client = None
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        return genai is not None and bool(self.api_key)
+
+    def _get_client(self):
+        with self._lock:
+            if self._client is None:
+                self._client = genai.Client(
+                    api_key=self.api_key,
+                    http_options=genai_types.HttpOptions(timeout=int(self.timeout_sec * 1000), base_url=self.base_url),
+                )
+            return self._client
+
+    def generate(self, model: str, prompt: str, system: Optional[str], history: List[Message],
+                 json_mode: bool, temperature: Optional[float]) -> str:
+        contents = [
+            genai_types.Content(role="model" if m.get("role") == "assistant" else "user",
+                                parts=[genai_types.Part.from_text(text=m.get("content") or "")])
+            for m in history
+        ]
+        contents.append(genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=prompt)]))
+        resp = self._get_client().models.generate_content(
+            model=model,
+            contents=contents,
+            config=genai_types.GenerateContentConfig(
+                system_instruction=system,
+                temperature=temperature,
+                response_mime_type="application/json" if json_mode else None,
+            ),
+        )
+        return resp.text or ""
+
+
+def fake_responder(model: str, prompt: str, system: Optional[str], history: List[Message],
+                   json_mode: bool) -> str:
+    """Plausible canned answers: neutral labels for sentiment prompts, a stub summary, an echo for chat."""
+    if json_mode and "Items: " in prompt:
+        try:
+            items = json.loads(prompt.rsplit("Items: ", 1)[1])
+            return json.dumps([{"i": it["i"], "label": "neutral", "score": 0.0} for it in items])
+        except Exception:
+            return "[]"
+    if json_mode:
+        return json.dumps({"summary": "Fake summary.", "themes": ["fake"], "aspects": {}, "quotes": []})
+    return f"(fake {model}) {prompt[:80]}"
+
+
+class FakeBackend:
+    """In-process stand-in for the LLM: sleeps latency_ms, fails error_rate of calls with a 503."""
+    name = "fake"
+
+    def __init__(self, latency_ms: float = LLM_FAKE_LATENCY_MS, error_rate: float = LLM_FAKE_ERROR_RATE,
+                 responder: Callable[..., str] = fake_responder):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.responder = responder
+        self.calls = 0
+
+    def available(self) -> bool:
+        return True
+
+    def generate(self, model: str, prompt: str, system: Optional[str], history: List[Message],
+                 json_mode: bool, temperature: Optional[float]) -> str:
+        self.calls += 1
+        time.sleep(self.latency_ms / 1000.0)
+        if random.random() < self.error_rate:
+            err = RuntimeError("fake upstream 503")
+            err.code = 503
+            raise err
+        return self.responder(model, prompt, system, history, json_mode)
+
+
+# ---------------------------
+# Per-model limits
+# ---------------------------
+class CircuitBreaker:
+    def __init__(self, failures: int = LLM_BREAKER_FAILURES, cooldown_sec: float = LLM_BREAKER_COOLDOWN_SEC):
+        self.threshold = max(1, int(failures))
+        self.cooldown_sec = float(cooldown_sec)
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.cooldown_sec:
+                    return False
+                self.state = "half_open"
+            if self.state == "half_open":
+                if self._probing:
+                    return False  # one probe at a time
+                self._probing = True
+            return True
+
+    def would_allow(self) -> bool:
+        with self._lock:
+            return self.state != "open" or time.monotonic() - self.opened_at >= self.cooldown_sec
+
+    def success(self):
+        with self._lock:
+            self.state, self.failures, self._probing = "closed", 0, False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.threshold:
+                if self.state != "open":
+                    self.trips += 1
+                self.state, self.opened_at, self._probing = "open", time.monotonic(), False
+
+    def release(self):
+        """The call ended without a verdict on upstream health (e.g. a 400)."""
+        with self._lock:
+            self._probing = False
+
+
+class _ModelLimits:
+    def __init__(self, rpm: float, tpm: float, concurrency: int):
+        # a full minute of budget can burst; rate <= 0 means unlimited
+        self.rpm = TokenBucket(rpm / 60.0, capacity=max(1.0, rpm))
+        self.tpm = TokenBucket(tpm / 60.0, capacity=max(1.0, tpm))
+        self.slots = threading.BoundedSemaphore(max(1, int(concurrency)))
+        self.breaker = CircuitBreaker()
+        self.metrics: Dict[str, float] = defaultdict(float)
+        self.in_flight = 0
+        self._lock = threading.Lock()  # metrics and in_flight are updated from many threads
+
+    def count(self, name: str, amount: float = 1):
+        with self._lock:
+            self.metrics[name] += amount
+
+    def snapshot(self) -> Tuple[Dict[str, float], int]:
+        with self._lock:
+            return dict(self.metrics), self.in_flight
+
+
+class LLMGateway:
+    def __init__(self, backend=None, retries: int = LLM_RETRIES, concurrency: int = LLM_MAX_CONCURRENCY,
+                 queue_timeout_sec: float = LLM_QUEUE_TIMEOUT_SEC, max_rate_wait_sec: float = LLM_MAX_RATE_WAIT_SEC):
+        self.backend = backend if backend is not None else (
+            FakeBackend() if LLM_BACKEND == "fake" else GenaiBackend()
+        )
+        self.retries = max(0, int(retries))
+        self.concurrency = concurrency
+        self.queue_timeout_sec = queue_timeout_sec
+        self.max_rate_wait_sec = max_rate_wait_sec
+        self._models: Dict[str, _ModelLimits] = {}
+        self._lock = threading.Lock()
+
+    def _limits(self, model: str) -> _ModelLimits:
+        with self._lock:
+            lim = self._models.get(model)
+            if lim is None:
+                conf = LLM_LIMITS.get(model, {})
+                lim = self._models[model] = _ModelLimits(
+                    float(conf.get("rpm", LLM_RPM)), float(conf.get("tpm", LLM_TPM)),
+                    int(conf.get("concurrency", self.concurrency)),
+                )
+            return lim
+
+    def available(self) -> bool:
+        """Configured at all (key / SDK present, or the fake)."""
+        return self.backend.available()
+
+    def ready(self, model: str) -> bool:
+        """Configured and the model's breaker isn't open: worth trying instead of the fallback."""
+        return self.available() and self._limits(model).breaker.would_allow()
+
+    def _throttle(self, lim: _ModelLimits, tokens: int):
+        """
+        Wait for RPM/TPM budget, or fail fast if that would take longer than max_rate_wait_sec.
+        A rejected call gives back what it already took, so it costs no budget.
+        """
+        taken: List[Tuple[TokenBucket, float]] = []
+        for bucket, need in ((lim.rpm, 1), (lim.tpm, min(tokens, lim.tpm.capacity))):
+            wait = bucket.try_acquire(need)
+            if wait > 0:
+                lim.count("rate_limited")
+                if wait > self.max_rate_wait_sec or not bucket.acquire(need, timeout=self.max_rate_wait_sec):
+                    for b, n in taken:
+                        b.refund(n)
+                    lim.count("rate_rejected")
+                    raise LLMUnavailable("LLM rate limit budget exhausted")
+                lim.count("rate_wait_sec", wait)
+            taken.append((bucket, need))
+
+    def generate(self, model: str, prompt: str, system: Optional[str] = None,
+                 history: Optional[List[Message]] = None, json_mode: bool = False,
+                 temperature: Optional[float] = None) -> str:
+        """Model text for prompt (after system + history). Raises LLMUnavailable instead of stalling."""
+        history = list(history or [])
+        lim = self._limits(model)
+        lim.count("requests")
+        if not self.available():
+            lim.count("unconfigured")
+            raise LLMUnavailable("LLM backend is not configured")
+        if not lim.breaker.allow():
+            lim.count("breaker_rejected")
+            raise LLMUnavailable(f"circuit open for {model}")
+        if not lim.slots.acquire(timeout=self.queue_timeout_sec):
+            lim.count("queue_rejected")
+            lim.breaker.release()
+            raise LLMUnavailable(f"too many concurrent calls to {model}")
+        verdict = None
+        try:
+            with lim._lock:
+                lim.in_flight += 1
+            tokens = estimate_tokens(prompt, system, *[m.get("content") for m in history])
+            last: Optional[Exception] = None
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    lim.count("retries")
+                    time.sleep(random.uniform(0, min(LLM_BACKOFF_MAX_SEC, LLM_BACKOFF_BASE_SEC * 2 ** attempt)))
+                self._throttle(lim, tokens)
+                started = time.perf_counter()
+                try:
+                    text = self.backend.generate(model, prompt, system, history, json_mode, temperature)
+                except Exception as e:
+                    elapsed = time.perf_counter() - started
+                    llm_seconds.observe(elapsed, model, "error")
+                    record("llm", elapsed)
+                    lim.count("errors")
+                    last = e
+                    print("[llm][error]", model, f"attempt {attempt + 1}:", repr(e))
+                    if not _retryable(e):
+                        break
+                    continue
+                elapsed = time.perf_counter() - started
+                llm_seconds.observe(elapsed, model, "ok")
+                record("llm", elapsed)
+                tokens_out = estimate_tokens(text)
+                with lim._lock:
+                    lim.metrics["ok"] += 1
+                    lim.metrics["latency_sec"] += elapsed
+                    lim.metrics["tokens_in"] += tokens
+                    lim.metrics["tokens_out"] += tokens_out
+                verdict = "ok"
+                return text
+            lim.count("failed")
+            verdict = "fail" if last is None or _retryable(last) else None
+            raise LLMUnavailable(f"{model} failed: {last!r}") from last
+        finally:
+            with lim._lock:
+                lim.in_flight -= 1
+            lim.slots.release()
+            if verdict == "ok":
+                lim.breaker.success()
+            elif verdict == "fail":
+                lim.breaker.failure()
+            else:
+                lim.breaker.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            models = dict(self._models)
+        out: Dict[str, Any] = {"backend": self.backend.name, "available": self.available(), "models": {}}
+        for name, lim in models.items():
+            m, in_flight = lim.snapshot()
+            ok = m.get("ok", 0)
+            out["models"][name] = {
+                **{k: (round(v, 3) if isinstance(v, float) and not v.is_integer() else int(v)) for k, v in m.items()},
+                "avg_latency_ms": round(m.get("latency_sec", 0) / ok * 1000, 1) if ok else None,
+                "in_flight": in_flight,
+                "breaker": lim.breaker.state,
+                "breaker_trips": lim.breaker.trips,
+            }
+        return out
+
+
+gateway = LLMGateway()
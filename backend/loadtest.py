@@ -0,0 +1,98 @@
+# backend/loadtest.py
+"""
+Latency of cheap endpoints (/api/health, /api/geo, /api/timeseries) while ingests
+run. Two phases against a running server: idle, then with --ingesters concurrent
+clients looping slow requests (sample ingest under fresh keywords + live streams).
+Usage (server on :8000):  python loadtest.py --base http://localhost:8000 --seconds 10
+Prints p50/p95/max per endpoint and phase; --json writes the same numbers to a file.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import statistics
+import time
+from typing import Dict, List
+
+import httpx
+
+CHEAP = {
+    "health": ("/api/health", {}),
+    "geo": ("/api/geo", {"q": "loadtest", "hours": 24}),
+    "timeseries": ("/api/timeseries", {"q": "loadtest", "hours": 24}),
+}
+
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {"n": 0}
+    s = sorted(samples)
+    return {
+        "n": len(s),
+        "p50_ms": round(statistics.median(s), 2),
+        "p95_ms": round(s[min(len(s) - 1, int(len(s) * 0.95))], 2),
+        "max_ms": round(s[-1], 2),
+    }
+
+
+async def _probe(client: httpx.AsyncClient, stop: float, out: Dict[str, List[float]]):
+    """One sequential client cycling through the cheap endpoints."""
+    for name in itertools.cycle(CHEAP):
+        if time.perf_counter() >= stop:
+            return
+        path, params = CHEAP[name]
+        t0 = time.perf_counter()
+        r = await client.get(path, params=params)
+        r.raise_for_status()
+        out[name].append((time.perf_counter() - t0) * 1000)
+
+
+async def _ingester(client: httpx.AsyncClient, stop: float, worker: int, counts: Dict[str, int]):
+    """Loops slow requests: sample ingest under a new keyword, then a live stream."""
+    for i in itertools.count():
+        if time.perf_counter() >= stop:
+            return
+        kw = f"loadtest-{worker}-{i}"
+        try:
+            r = await client.get("/api/search", params={"q": kw, "use_sample": "true", "engine": "vader"})
+            counts[f"search_{r.status_code}"] = counts.get(f"search_{r.status_code}", 0) + 1
+            async with client.stream("GET", "/api/search/stream", params={"q": kw, "engine": "vader"}) as s:
+                async for _ in s.aiter_lines():
+                    pass
+            counts["stream"] = counts.get("stream", 0) + 1
+        except httpx.HTTPError as e:
+            counts[type(e).__name__] = counts.get(type(e).__name__, 0) + 1
+
+
+async def _phase(base: str, seconds: float, probes: int, ingesters: int) -> Dict[str, object]:
+    out: Dict[str, List[float]] = {name: [] for name in CHEAP}
+    counts: Dict[str, int] = {}
+    async with httpx.AsyncClient(base_url=base, timeout=120) as client:
+        stop = time.perf_counter() + seconds
+        await asyncio.gather(
+            *[_probe(client, stop, out) for _ in range(probes)],
+            *[_ingester(client, stop, w, counts) for w in range(ingesters)],
+        )
+    return {"latency": {name: _summary(v) for name, v in out.items()}, "ingest_requests": counts}
+
+
+async def main(args):
+    results = {}
+    for phase, ingesters in (("idle", 0), ("loaded", args.ingesters)):
+        results[phase] = await _phase(args.base, args.seconds, args.probes, ingesters)
+        print(f"[loadtest] {phase} (ingesters={ingesters})", results[phase]["ingest_requests"] or "")
+        for name, s in results[phase]["latency"].items():
+            print(f"    {name:<11} {s}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--base", default="http://localhost:8000")
+    ap.add_argument("--seconds", type=float, default=10.0, help="duration of each phase")
+    ap.add_argument("--probes", type=int, default=4, help="concurrent clients on the cheap endpoints")
+    ap.add_argument("--ingesters", type=int, default=8, help="concurrent clients running ingests")
+    ap.add_argument("--json", help="write results to this file")
+    asyncio.run(main(ap.parse_args()))
@@ -0,0 +1,249 @@
+# backend/metrics.py
+"""
+In-process metrics in Prometheus text format (GET /api/metrics) plus per-request
+stage timings (Server-Timing header). No dependencies; an observation is a
+bisect and two additions under a lock, so it stays on in production.
+
+Stages are timed with `timed("name")` or `record("name", seconds)` from anywhere in
+a request: the request's totals live in a contextvar that follows the request into
+run_read() and the upstream pool. Everything is also aggregated process-wide in
+gi_stage_seconds{stage=...}. Pull-style numbers (cache and gateway counters) are
+added at scrape time by collectors registered with registry.add_collector().
+"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from settings import METRICS_ENABLED, METRICS_SERVER_TIMING
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# (metric name, type, help, [(labels, value)])
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [
+        f'{n}="' + str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for n, v in zip(names, values)
+    ]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_value(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        out += [f"{self.name}{_fmt_labels(self.labelnames, k)} {_fmt_value(v)}" for k, v in items]
+        return out
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, *labels: str):
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            v = self._values.get(labels)
+            if v is None:
+                v = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            v[0][i] += 1
+            v[1] += seconds
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1])) for k, v in self._values.items())
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for k, (counts, total) in items:
+            acc = 0
+            for le, n in zip([*map(_fmt_value, self.buckets), "+Inf"], counts):
+                acc += n
+                le_label = 'le="' + le + '"'
+                out.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, k, le_label)} {acc}")
+            out.append(f"{self.name}_sum{_fmt_labels(self.labelnames, k)} {_fmt_value(round(total, 6))}")
+            out.append(f"{self.name}_count{_fmt_labels(self.labelnames, k)} {acc}")
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List = []
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        m = Counter(name, help, labelnames)
+        self._metrics.append(m)
+        return m
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        m = Histogram(name, help, labelnames, buckets)
+        self._metrics.append(m)
+        return m
+
+    def add_collector(self, fn: Callable[[], Iterable[Family]]):
+        """fn() is called at scrape time and returns metric families (name, type, help, samples)."""
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for m in self._metrics:
+            lines += m.render()
+        for fn in self._collectors:
+            try:
+                families = list(fn())
+            except Exception as e:
+                print("[metrics][collector-error]", repr(e))
+                continue
+            for name, kind, help, samples in families:
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                for labels, value in samples:
+                    if value is None:
+                        continue
+                    lines.append(f"{name}{_fmt_labels(list(labels), list(labels.values()))} {_fmt_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_seconds = registry.histogram(
+    "gi_http_request_seconds", "HTTP request latency by route template", ("method", "route", "status"))
+stage_seconds = registry.histogram(
+    "gi_stage_seconds", "Time spent per stage (db, sentiment_*, upstream_*, llm, serialize)", ("stage",))
+db_seconds = registry.histogram(
+    "gi_db_query_seconds", "Database statement latency by statement type", ("op",))
+upstream_seconds = registry.histogram(
+    "gi_upstream_request_seconds", "Upstream API call latency", ("source", "status"))
+llm_seconds = registry.histogram(
+    "gi_llm_request_seconds", "LLM call latency per attempt", ("model", "outcome"))
+ingest_items = registry.counter(
+    "gi_ingest_items_total", "Fetched items by what ingest did with them (scored, known, duplicate, expired_or_empty)",
+    ("outcome",))
+sentiment_texts = registry.counter(
+    "gi_sentiment_texts_total", "Texts per sentiment engine by result (cache_hit, scored, fallback)",
+    ("engine", "result"))
+
+
+# ---------------------------
+# Per-request stage timings
+# ---------------------------
+_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("gi_timings", default=None)
+
+
+def record(stage: str, seconds: float):
+    stage_seconds.observe(seconds, stage)
+    t = _timings.get()
+    if t is not None:
+        t[stage] = t.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - t0)
+
+
+@contextmanager
+def collect_timings() -> Iterator[Dict[str, float]]:
+    """Stage totals of the enclosed work, outside a request (scripts, benchmarks)."""
+    timings: Dict[str, float] = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def server_timing(timings: Dict[str, float], total: float) -> str:
+    parts = [f"{name};dur={secs * 1000:.1f}" for name, secs in timings.items()]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def observe_upstream(source: str, status: str, seconds: float):
+    upstream_seconds.observe(seconds, source, status)
+    record(f"upstream_{source}", seconds)
+
+
+_DB_OPS = frozenset(("select", "insert", "update", "delete", "begin", "commit", "pragma", "with", "create"))
+
+
+def instrument_engine(engine):
+    """Time every statement of a (sync) SQLAlchemy engine; pass async_engine.sync_engine for async ones."""
+    if not METRICS_ENABLED:
+        return
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info["gi_t0"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        t0 = conn.info.pop("gi_t0", None)
+        if t0 is None:
+            return
+        secs = time.perf_counter() - t0
+        op = statement.lstrip()[:7].split(None, 1)[0].lower() if statement.strip() else "other"
+        db_seconds.observe(secs, op if op in _DB_OPS else "other")
+        record("db", secs)
+
+
+class MetricsMiddleware:
+    """ASGI middleware: request latency histogram + Server-Timing header with the request's stages."""
+
+    def __init__(self, app, server_timing_header: bool = METRICS_SERVER_TIMING):
+        self.app = app
+        self.server_timing_header = server_timing_header
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        timings: Dict[str, float] = {}
+        token = _timings.set(timings)
+        t0 = time.perf_counter()
+        status = 500
+
+        async def _send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing_header:
+                    value = server_timing(timings, time.perf_counter() - t0).encode("latin-1")
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", value)]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            _timings.reset(token)
+            route = getattr(scope.get("route"), "path", "unmatched")  # template, not the raw path
+            http_seconds.observe(time.perf_counter() - t0, scope.get("method", ""), route, str(status))
@@ -0,0 +1,100 @@
+# backend/migrations.py
+"""
+Tiny forward-only migration runner. create_all() only creates missing tables, so
+anything that changes an existing table (indexes, columns, backfills) goes here.
+Each migration runs once, in order, and is recorded in schema_migrations.
+"""
+from datetime import datetime, timezone
+from typing import Callable, List, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+
+def _m001_posts_window_indexes(conn: Connection):
+    from models import Post
+    for ix in Post.__table__.indexes:
+        if ix.name == "ix_posts_keyword_cc_created_score":
+            ix.create(conn, checkfirst=True)
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_posts_keyword_created_at ON posts (keyword, created_at DESC)"))
+    # prefix of ix_posts_keyword_created_at; only costs writes now
+    conn.execute(text("DROP INDEX IF EXISTS ix_posts_keyword"))
+    if conn.dialect.name == "sqlite":
+        conn.execute(text("ANALYZE posts"))  # planner stats so it picks the new indexes
+
+
+def _m002_posts_keyset_index(conn: Connection):
+    from models import Post
+    for ix in Post.__table__.indexes:
+        if ix.name == "ix_posts_keyword_created_at_id":
+            ix.create(conn, checkfirst=True)
+    conn.execute(text("DROP INDEX IF EXISTS ix_posts_keyword_created_at"))  # prefix of the new one
+    if conn.dialect.name == "sqlite":
+        conn.execute(text("ANALYZE posts"))
+
+
+def _m003_backfill_post_rollups(conn: Connection):
+    """Build post_rollups from existing posts (the table itself comes from create_all)."""
+    if conn.dialect.name == "sqlite":
+        bucket = "strftime('%Y-%m-%d %H:00:00.000000', created_at)"
+    else:
+        bucket = "date_trunc('hour', created_at)"
+    conn.execute(text("DELETE FROM post_rollups"))
+    conn.execute(text(f"""
+        INSERT INTO post_rollups (keyword, bucket, country_code, source, n, score_sum, score_sq_sum, pos, neu, neg)
+        SELECT keyword, {bucket}, COALESCE(country_code, ''), COALESCE(source, ''),
+               COUNT(*),
+               COALESCE(SUM(sentiment_score), 0),
+               COALESCE(SUM(sentiment_score * sentiment_score), 0),
+               SUM(CASE WHEN sentiment_label LIKE 'pos%' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN sentiment_label LIKE 'pos%' OR sentiment_label LIKE 'neg%' THEN 0 ELSE 1 END),
+               SUM(CASE WHEN sentiment_label LIKE 'neg%' THEN 1 ELSE 0 END)
+        FROM posts
+        WHERE keyword IS NOT NULL AND created_at IS NOT NULL
+        GROUP BY keyword, {bucket}, COALESCE(country_code, ''), COALESCE(source, '')
+    """))
+
+
+def _m004_posts_aspect_mask(conn: Connection):
+    """Column only; heuristics.ensure_aspect_masks() fills it (and refills it when the lexicon changes)."""
+    cols = {c["name"] for c in inspect(conn).get_columns("posts")}
+    if "aspect_mask" not in cols:  # fresh databases get it from create_all
+        conn.execute(text("ALTER TABLE posts ADD COLUMN aspect_mask INTEGER"))
+
+
+def _m005_posts_fulltext(conn: Connection):
+    """FTS5 table + triggers on SQLite, GIN tsvector index on Postgres; filled from existing posts."""
+    from fulltext import ensure_index
+    ensure_index(conn)
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "posts composite window indexes", _m001_posts_window_indexes),
+    (2, "posts (keyword, created_at, id) keyset index", _m002_posts_keyset_index),
+    (3, "backfill hourly post_rollups", _m003_backfill_post_rollups),
+    (4, "posts.aspect_mask", _m004_posts_aspect_mask),
+    (5, "posts full-text index", _m005_posts_fulltext),
+]
+
+
+def run_migrations(engine: Engine) -> List[int]:
+    """Apply pending migrations; returns the versions applied in this call."""
+    applied_now = []
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, name VARCHAR NOT NULL, applied_at VARCHAR NOT NULL)"
+        ))
+        done = {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+    for version, name, fn in MIGRATIONS:
+        if version in done:
+            continue
+        with engine.begin() as conn:  # one transaction per migration
+            fn(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:v, :n, :t)"),
+                {"v": version, "n": name, "t": datetime.now(timezone.utc).isoformat()},
+            )
+        print(f"[migrations] applied {version}: {name}")
+        applied_now.append(version)
+    return applied_now
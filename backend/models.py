@@ -1,14 +1,27 @@
 # backend/models.py
-from sqlalchemy import Column, String, Float, DateTime, create_engine, Integer
+from sqlalchemy import BigInteger, Column, String, Float, DateTime, create_engine, event, Integer, Index, Text, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import declarative_base, sessionmaker
 from datetime import datetime, timezone
 
+from metrics import instrument_engine
+from settings import (
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE_SEC,
+    DB_POOL_SIZE,
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_SYNCHRONOUS,
+    SQLITE_WAL,
+)
+
 Base = declarative_base()
 
 class Post(Base):
     __tablename__ = "posts"
     id = Column(String, primary_key=True, index=True)
-    keyword = Column(String, index=True)
+    keyword = Column(String)
     source = Column(String)
     author = Column(String)
     text = Column(String)
@@ -16,12 +29,174 @@ class Post(Base):
     sentiment_score = Column(Float)
     sentiment_label = Column(String)
     country_code = Column(String(2), index=True, default=None)
+    aspect_mask = Column(Integer, default=None)  # bit i = text mentions aspect i of heuristics.lexicon
+
+    __table_args__ = (
+        # every endpoint filters keyword = ? AND created_at >= ? (most order by created_at desc);
+        # id breaks ties for /api/search keyset pagination
+        Index("ix_posts_keyword_created_at_id", "keyword", created_at.desc(), id.desc()),
+        # covering index for per-country aggregates: GROUP BY country_code without touching rows
+        Index("ix_posts_keyword_cc_created_score", "keyword", "country_code", "created_at", "sentiment_score"),
+    )
+
+class PostRollup(Base):
+    """
+    Hourly aggregates per (keyword, bucket, country, source), maintained by the ingest
+    upsert. country_code/source use "" for unknown so they can sit in the primary key.
+    """
+    __tablename__ = "post_rollups"
+    keyword = Column(String, primary_key=True)
+    bucket = Column(DateTime, primary_key=True)  # UTC hour start
+    country_code = Column(String(2), primary_key=True, default="")
+    source = Column(String, primary_key=True, default="")
+    n = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Float, nullable=False, default=0.0)
+    score_sq_sum = Column(Float, nullable=False, default=0.0)
+    pos = Column(Integer, nullable=False, default=0)
+    neu = Column(Integer, nullable=False, default=0)
+    neg = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # per-country reads (/api/geo, country-filtered time series) without a sort
+        Index("ix_post_rollups_keyword_cc_bucket", "keyword", "country_code", "bucket", "n", "score_sum"),
+    )
+
+class SentimentCacheEntry(Base):
+    """Persistent sentiment results keyed by hash(engine, model, clean_text(text))."""
+    __tablename__ = "sentiment_cache"
+    key = Column(String(64), primary_key=True)
+    engine = Column(String)
+    model = Column(String)
+    sentiment_score = Column(Float)
+    sentiment_label = Column(String)
+    last_used = Column(DateTime, index=True, default=lambda: datetime.now(timezone.utc))
+
+class PostSignature(Base):
+    """
+    SimHash of every ingested text (dedup.py). Duplicates that were dropped keep a row
+    pointing at their canonical post. seq lets each process pick up rows written by others.
+    """
+    __tablename__ = "post_signatures"
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    post_id = Column(String, nullable=False, unique=True)
+    keyword = Column(String, nullable=False)
+    simhash = Column(BigInteger, nullable=False)  # signed 64-bit
+    canonical_id = Column(String, default=None)  # set when this id was dropped as a duplicate
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))  # when it was ingested
+
+    __table_args__ = (
+        Index("ix_post_signatures_keyword_seq", "keyword", "seq"),
+    )
+
+class IngestWatermark(Base):
+    """How far live ingest got per (keyword, source), so refreshes only ask upstream for newer items (watermarks.py)."""
+    __tablename__ = "ingest_watermarks"
+    keyword = Column(String, primary_key=True)
+    source = Column(String, primary_key=True)
+    published_at = Column(DateTime, default=None)  # newest upstream publish time seen (UTC)
+    searched_at = Column(DateTime, default=None)  # YouTube: last search call
+    etag = Column(String, default=None)  # of the last search / list response
+    seen_ids = Column(Text, default=None)  # JSON; YouTube: video id -> {published_at, newest comment, etag}
+    page_tokens = Column(Text, default=None)  # JSON; YouTube: video id -> {token, until} for a comment backlog
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+class IngestJob(Base):
+    """
+    Durable refresh job queue (jobqueue.py): the API enqueues, API threads and worker.py
+    processes lease and run. status: queued | running | done | failed (retries used up).
+    """
+    __tablename__ = "ingest_jobs"
+    id = Column(String(32), primary_key=True)
+    keyword = Column(String, nullable=False)
+    sources = Column(String, nullable=False)  # comma-separated
+    engine = Column(String, nullable=False, default="auto")
+    status = Column(String, nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    available_at = Column(DateTime, nullable=False)  # queued: not before (retry backoff)
+    lease_owner = Column(String, default=None)  # running: worker id
+    lease_expires_at = Column(DateTime, default=None)  # running: reclaimed by another worker after this
+    enqueued_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime, default=None)
+    finished_at = Column(DateTime, default=None)
+    fetched = Column(Integer, default=None)
+    error = Column(Text, default=None)
+
+    __table_args__ = (
+        # claiming: oldest queued job that is due, or a running one whose lease ran out
+        Index("ix_ingest_jobs_status_available", "status", "available_at"),
+        # at most one pending job per keyword, also when several processes enqueue at once
+        Index("ux_ingest_jobs_pending_keyword", "keyword", unique=True,
+              sqlite_where=text("status IN ('queued', 'running')"),
+              postgresql_where=text("status IN ('queued', 'running')")),
+        Index("ix_ingest_jobs_keyword_finished", "keyword", "finished_at"),
+    )
+
+class AppMeta(Base):
+    """Small key/value facts about derived data (e.g. which aspect lexicon built posts.aspect_mask)."""
+    __tablename__ = "app_meta"
+    key = Column(String, primary_key=True)
+    value = Column(Text)
+
+class ResponseCacheEntry(Base):
+    """Persistent tier of response_cache.ResponseCache (e.g. /api/insights results as JSON)."""
+    __tablename__ = "response_cache"
+    key = Column(String(64), primary_key=True)
+    namespace = Column(String)
+    value = Column(Text)
+    compute_ms = Column(Float)  # what producing the value cost; counted as saved on each hit
+    expires_at = Column(DateTime, index=True)
+
+def engine_kwargs(url: str) -> dict:
+    """Pool settings from settings.py; in-memory SQLite keeps SQLAlchemy's single-connection pool."""
+    kw = {"pool_pre_ping": DB_POOL_PRE_PING}
+    if url.startswith("sqlite"):
+        kw["connect_args"] = {"check_same_thread": False}
+        if make_url(url).database in (None, "", ":memory:"):
+            return kw
+    elif url.startswith("postgresql"):
+        # columns are naive UTC and the code binds aware UTC datetimes: keep the session in UTC
+        # so timestamp <-> timestamptz conversions never shift by the server's zone
+        if "+asyncpg" in url:
+            kw["connect_args"] = {"server_settings": {"timezone": "UTC"}}
+        else:
+            kw["connect_args"] = {"options": "-c timezone=UTC"}
+    return {**kw, "pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW, "pool_recycle": DB_POOL_RECYCLE_SEC}
+
+def apply_sqlite_pragmas(dbapi_conn):
+    """Per-connection SQLite settings (sync and aiosqlite connections alike)."""
+    cur = dbapi_conn.cursor()
+    if SQLITE_WAL:
+        cur.execute("PRAGMA journal_mode=WAL")  # persistent on the file, cheap to repeat
+    cur.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cur.execute(f"PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT_MS)}")
+    cur.close()
+
+engine = create_engine(DATABASE_URL, **engine_kwargs(DATABASE_URL))
+instrument_engine(engine)
+# Same pool; transactions on write_engine take SQLite's write lock at BEGIN (below).
+write_engine = engine.execution_options(sqlite_write_lock=True)
+SessionLocal = sessionmaker(bind=write_engine)  # transactions that write (ingest, caches, jobs, retention)
+ReadSessionLocal = sessionmaker(bind=engine)  # read-only transactions: never wait on writers
 
-# Use globalinsights.db instead of sentiscout.db
-DATABASE_URL = "sqlite:///globalinsights.db"
+if engine.dialect.name == "sqlite":
+    # Writes are mostly read-then-write transactions. A deferred BEGIN that later upgrades to a
+    # write lock fails with "database is locked" as soon as another connection wrote in between
+    # (busy_timeout can't help there), so writers take the lock up front: BEGIN IMMEDIATE waits
+    # on busy_timeout like any other lock. Readers keep a deferred BEGIN: under WAL they read a
+    # snapshot alongside the writer and never block it.
+    @event.listens_for(engine, "connect")
+    def _sqlite_connect(dbapi_conn, _record):
+        dbapi_conn.isolation_level = None  # SQLAlchemy's begin event issues BEGIN itself
+        apply_sqlite_pragmas(dbapi_conn)
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(bind=engine)
+    @event.listens_for(engine, "begin")
+    def _sqlite_begin(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE" if conn.get_execution_options().get("sqlite_write_lock") else "BEGIN")
 
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    from migrations import run_migrations
+    from heuristics import ensure_aspect_masks
+    Base.metadata.create_all(bind=write_engine)
+    run_migrations(write_engine)
+    ensure_aspect_masks(write_engine)
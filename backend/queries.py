@@ -0,0 +1,105 @@
+# backend/queries.py
+"""
+SQL behind the API endpoints, kept in one place so query_plan_audit.py can
+EXPLAIN exactly what the routes run.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.sql import Select
+
+import fulltext
+from models import Post
+from rollups import (
+    geo_edge_stmt,
+    geo_many_edge_stmt,
+    geo_many_rollup_stmt,
+    geo_rollup_stmt,
+    hour_ceil,
+    hour_floor,
+    timeseries_many_stmt,
+    timeseries_stmt,
+)
+
+
+def cutoff_for(hours: int) -> datetime:
+    return datetime.now(timezone.utc) - timedelta(hours=hours)
+
+
+def recent_posts_stmt(kw: str, cutoff: datetime, limit: Optional[int] = None) -> Select:
+    """Posts for keyword in window, newest first (search / insights)."""
+    stmt = (
+        select(Post)
+        .where(Post.keyword == kw, Post.created_at >= cutoff)
+        .order_by(Post.created_at.desc())
+    )
+    return stmt.limit(limit) if limit else stmt
+
+
+# columns /api/search can project with fields=...
+POST_FIELDS = (
+    "id", "source", "author", "text", "created_at",
+    "sentiment_score", "sentiment_label", "country_code",
+)
+
+
+def search_page_stmt(kw: str, cutoff: datetime, limit: int,
+                     after: Optional[Tuple[datetime, str]] = None,
+                     fields: Sequence[str] = POST_FIELDS) -> Select:
+    """
+    One keyset page of the window, ordered (created_at, id) desc. Selects only the
+    requested columns (plus created_at/id for the cursor) instead of Post entities.
+    `after` is the (created_at, id) of the last row of the previous page.
+    """
+    names = list(dict.fromkeys(["created_at", "id", *fields]))
+    stmt = (
+        select(*[getattr(Post, n) for n in names])
+        .where(Post.keyword == kw, Post.created_at >= cutoff)
+    )
+    if after is not None:
+        ts, pid = after
+        stmt = stmt.where(or_(Post.created_at < ts, and_(Post.created_at == ts, Post.id < pid)))
+    return stmt.order_by(Post.created_at.desc(), Post.id.desc()).limit(limit)
+
+
+def window_count_stmt(kw: str, cutoff: datetime) -> Select:
+    return select(func.count()).select_from(Post).where(Post.keyword == kw, Post.created_at >= cutoff)
+
+
+def window_version_stmt(kw: str, cutoff: datetime) -> Select:
+    """(max(created_at), count) for the window: changes whenever its posts do (insights cache key)."""
+    return (
+        select(func.max(Post.created_at), func.count())
+        .select_from(Post)
+        .where(Post.keyword == kw, Post.created_at >= cutoff)
+    )
+
+
+def window_ids_stmt(kw: str, cutoff: datetime) -> Select:
+    """Ids in the window (chat retrieval reconciles its in-memory index with these)."""
+    return select(Post.id).where(Post.keyword == kw, Post.created_at >= cutoff)
+
+
+def endpoint_queries(dialect: str = "sqlite") -> Dict[str, Select]:
+    """One representative statement per endpoint, for the query plan audit."""
+    kw, cutoff = "electric cars", cutoff_for(24)
+    kws = [kw, "heat pumps", "solar panels"]
+    clauses = fulltext.parse_query('electric "battery range" charg*')
+    return {
+        "search": search_page_stmt(kw, cutoff, limit=200),
+        "search_next_page": search_page_stmt(kw, cutoff, limit=200, after=(cutoff, "x"), fields=("text",)),
+        "search_count": window_count_stmt(kw, cutoff),
+        "search_fulltext": fulltext.search_stmt(dialect, clauses, cutoff, limit=200, fields=POST_FIELDS),
+        "search_fulltext_count": fulltext.count_stmt(dialect, clauses, cutoff),
+        "geo_rollup": geo_rollup_stmt(kw, hour_ceil(cutoff)),
+        "geo_edge": geo_edge_stmt(kw, cutoff, hour_ceil(cutoff)),
+        "timeseries": timeseries_stmt(kw, hour_floor(cutoff)),
+        "timeseries_country": timeseries_stmt(kw, hour_floor(cutoff), cc="US"),
+        "compare_geo": geo_many_rollup_stmt(kws, hour_ceil(cutoff)),
+        "compare_geo_edge": geo_many_edge_stmt(kws, cutoff, hour_ceil(cutoff)),
+        "compare_timeseries": timeseries_many_stmt(kws, hour_floor(cutoff)),
+        "insights_version": window_version_stmt(kw, cutoff),
+        "insights": recent_posts_stmt(kw, cutoff, limit=120),
+        "chat_window_ids": window_ids_stmt(kw, cutoff),
+    }
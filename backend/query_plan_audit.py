@@ -0,0 +1,59 @@
+# backend/query_plan_audit.py
+"""
+EXPLAIN every endpoint query and fail if one falls back to a full table scan or
+an extra sort. Usage (from backend/):  python query_plan_audit.py
+Exit code 1 if any query has a bad plan.
+"""
+import sys
+from typing import List, Tuple
+
+from models import engine, init_db
+from queries import endpoint_queries
+
+# SQLite EXPLAIN QUERY PLAN details / Postgres EXPLAIN node names that mean "no usable index"
+_BAD_SQLITE = ("USE TEMP B-TREE",)
+_BAD_POSTGRES = ("Seq Scan", "Sort  (")
+
+
+def _sqlite_plan(conn, stmt) -> List[str]:
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    params = tuple(compiled.params[k] for k in compiled.positiontup)
+    params = tuple(p.isoformat(" ") if hasattr(p, "isoformat") else p for p in params)
+    rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + compiled.string, params).all()
+    return [r[-1] for r in rows]
+
+
+def _postgres_plan(conn, stmt) -> List[str]:
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    rows = conn.exec_driver_sql("EXPLAIN " + compiled.string, compiled.params).all()
+    return [r[0] for r in rows]
+
+
+def _is_bad(dialect: str, line: str) -> bool:
+    if dialect == "sqlite":
+        full_scan = line.startswith("SCAN ") and "INDEX" not in line
+        return full_scan or any(b in line for b in _BAD_SQLITE)
+    return any(b in line for b in _BAD_POSTGRES)
+
+
+def audit() -> List[Tuple[str, List[str], bool]]:
+    """Returns [(query name, plan lines, ok)]."""
+    init_db()
+    out = []
+    with engine.connect() as conn:
+        dialect = conn.dialect.name
+        plan_fn = _sqlite_plan if dialect == "sqlite" else _postgres_plan
+        for name, stmt in endpoint_queries(dialect).items():
+            plan = plan_fn(conn, stmt)
+            out.append((name, plan, not any(_is_bad(dialect, line) for line in plan)))
+    return out
+
+
+if __name__ == "__main__":
+    failed = 0
+    for name, plan, ok in audit():
+        print(f"[{'ok' if ok else 'FAIL'}] {name}")
+        for line in plan:
+            print("    " + line)
+        failed += not ok
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,54 @@
+# backend/ratelimit.py
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens/sec refill, up to `capacity` banked.
+    rate <= 0 means unlimited.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._ts = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._ts) * self.rate)
+        self._ts = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Take tokens if available. Returns 0.0 on success, else seconds to wait before retrying."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (min(tokens, self.capacity) - self._tokens) / self.rate
+
+    def refund(self, tokens: float = 1.0):
+        """Give back tokens taken for work that then didn't happen."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + tokens)
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Block until tokens are available (or timeout seconds pass). Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return True
+            if deadline is not None:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return False
+                wait = min(wait, left)
+            time.sleep(wait)
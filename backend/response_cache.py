@@ -0,0 +1,211 @@
+# backend/response_cache.py
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from sqlalchemy import delete, select
+from starlette.concurrency import run_in_threadpool
+
+from models import ReadSessionLocal, ResponseCacheEntry, SessionLocal
+from storage import upsert_rows
+
+_PURGE_EVERY = 100  # persisted writes between deletes of expired rows
+
+
+class _Flight:
+    """One in-flight computation that concurrent identical requests await on the event loop."""
+
+    def __init__(self):
+        self.done = asyncio.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+        self.abandoned = False  # the leader was cancelled: a follower takes over
+
+
+class ResponseCache:
+    """
+    TTL + LRU cache for expensive JSON responses, with single-flight: while a key
+    is being computed, identical requests await that result instead of
+    computing it again. Only the leader occupies a worker thread; followers wait
+    on the event loop. persist=True adds the response_cache table behind the
+    in-memory tier so results survive restarts. Errors are never cached.
+    """
+
+    def __init__(self, namespace: str, ttl_sec: int, max_items: int, persist: bool = False):
+        self.namespace = namespace
+        self.ttl_sec = max(0, int(ttl_sec))
+        self.max_items = max(0, int(max_items))
+        self.persist = persist
+        # key -> (expires_at monotonic, value, compute seconds)
+        self._mem: "OrderedDict[str, Tuple[float, Any, float]]" = OrderedDict()
+        self._inflight: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.persisted_hits = 0
+        self.shared = 0
+        self.misses = 0
+        self.saved_sec = 0.0
+
+    def _key(self, key: Hashable) -> str:
+        raw = json.dumps([self.namespace, key], default=str, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _remember(self, k: str, value: Any, cost: float, ttl: float):
+        # caller holds the lock
+        self._mem[k] = (time.monotonic() + ttl, value, cost)
+        self._mem.move_to_end(k)
+        while len(self._mem) > self.max_items:
+            self._mem.popitem(last=False)
+
+    def _mem_get(self, k: str) -> Optional[Tuple[Any, float]]:
+        # caller holds the lock
+        entry = self._mem.get(k)
+        if entry is None:
+            return None
+        expires, value, cost = entry
+        if expires <= time.monotonic():
+            del self._mem[k]
+            return None
+        self._mem.move_to_end(k)
+        return value, cost
+
+    def _db_get(self, k: str) -> Optional[Tuple[Any, float, float]]:
+        """(value, compute seconds, remaining ttl) from the table, if present and fresh."""
+        sess = ReadSessionLocal()
+        try:
+            row = sess.execute(select(ResponseCacheEntry).where(ResponseCacheEntry.key == k)).scalar_one_or_none()
+            if row is None:
+                return None
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            remaining = (row.expires_at - now).total_seconds()
+            if remaining <= 0:
+                return None
+            return json.loads(row.value), (row.compute_ms or 0.0) / 1000.0, remaining
+        finally:
+            sess.close()
+
+    def _db_put(self, k: str, value: Any, cost: float, ttl: float):
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        sess = SessionLocal()
+        try:
+            upsert_rows(sess, ResponseCacheEntry.__table__, [{
+                "key": k, "namespace": self.namespace, "value": json.dumps(value, default=str),
+                "compute_ms": cost * 1000.0, "expires_at": now + timedelta(seconds=ttl),
+            }], ["key"])
+            with self._lock:
+                self._writes += 1
+                purge = self._writes % _PURGE_EVERY == 0
+            if purge:
+                sess.execute(delete(ResponseCacheEntry).where(ResponseCacheEntry.expires_at <= now))
+            sess.commit()
+        finally:
+            sess.close()
+
+    def _produce(self, k: str, compute: Callable[[], Any],
+                 ttl_of: Optional[Callable[[Any], float]]) -> Tuple[Any, float, float, str]:
+        """Leader's blocking part: persisted tier, else compute (and persist). -> (value, cost, ttl, status)"""
+        stored = self._db_get(k) if self.persist else None
+        if stored is not None:
+            value, cost, ttl = stored
+            return value, cost, ttl, "hit"
+        t0 = time.perf_counter()
+        value = compute()
+        cost = time.perf_counter() - t0
+        ttl = min(self.ttl_sec, ttl_of(value)) if ttl_of is not None else self.ttl_sec
+        if self.persist and ttl > 0:
+            try:
+                self._db_put(k, value, cost, ttl)
+            except Exception as e:
+                print(f"[cache][{self.namespace}] persist failed:", repr(e))
+        return value, cost, ttl, "miss"
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Any],
+                             run: Callable[..., Awaitable[Any]] = run_in_threadpool,
+                             ttl_of: Optional[Callable[[Any], float]] = None) -> Tuple[Any, str]:
+        """
+        Returns (value, status) where status is "hit", "shared" (awaited an
+        identical in-flight request) or "miss" (computed here). Blocking work
+        (compute, the persisted tier) goes through `run`, e.g. the upstream pool.
+        ttl_of(value) can shorten the TTL of a computed value (0 = don't cache it,
+        e.g. a degraded answer); requests already waiting still share it.
+        """
+        if self.ttl_sec <= 0 or self.max_items <= 0:
+            return await run(compute), "miss"
+        k = self._key(key)
+        while True:
+            with self._lock:
+                cached = self._mem_get(k)
+                if cached is not None:
+                    self.hits += 1
+                    self.saved_sec += cached[1]
+                    return cached[0], "hit"
+                flight = self._inflight.get(k)
+                leader = flight is None
+                if leader:
+                    flight = self._inflight[k] = _Flight()
+            if leader:
+                break
+            await flight.done.wait()
+            if flight.abandoned:
+                continue
+            if flight.error is not None:
+                raise flight.error
+            with self._lock:
+                self.shared += 1
+                self.saved_sec += self._mem.get(k, (0, None, 0.0))[2]
+            return flight.value, "shared"
+
+        try:
+            value, cost, ttl, status = await run(self._produce, k, compute, ttl_of)
+            flight.value = value
+            with self._lock:
+                if ttl > 0:
+                    self._remember(k, value, cost, ttl)
+                if status == "hit":
+                    self.hits += 1
+                    self.persisted_hits += 1
+                    self.saved_sec += cost
+                else:
+                    self.misses += 1
+            return value, status
+        except Exception as e:
+            flight.error = e
+            raise
+        except BaseException:
+            flight.abandoned = True
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(k, None)
+            flight.done.set()
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+        if self.persist:
+            sess = SessionLocal()
+            try:
+                sess.execute(delete(ResponseCacheEntry).where(ResponseCacheEntry.namespace == self.namespace))
+                sess.commit()
+            finally:
+                sess.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.shared + self.misses
+            return {
+                "hits": self.hits,
+                "persisted_hits": self.persisted_hits,
+                "shared": self.shared,
+                "misses": self.misses,
+                "hit_ratio": round((self.hits + self.shared) / total, 4) if total else 0.0,
+                "saved_sec": round(self.saved_sec, 3),
+                "mem_items": len(self._mem),
+                "inflight": len(self._inflight),
+            }
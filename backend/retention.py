@@ -0,0 +1,226 @@
+# backend/retention.py
+"""
+Retention for posts: raw rows older than RETENTION_DAYS are written to monthly
+archive files and deleted in small batches; post_rollups keep their aggregates,
+so /api/geo and /api/timeseries still cover those periods (the raw-post edge of
+a window that starts before the horizon is gone, though). Optionally, hourly
+rollups older than RETENTION_ROLLUP_DAILY_AFTER_DAYS are merged into day buckets.
+
+Runs on a background thread from the API (RETENTION_INTERVAL_SEC) or once from
+the command line:  python retention.py
+Archive files are at-least-once: a crash between writing a batch and deleting
+it can repeat rows, so dedupe by id when reading them back.
+"""
+import gzip
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import bindparam, delete, or_, select
+
+from models import Post, PostRollup, PostSignature, ReadSessionLocal, SessionLocal
+from rollups import ROLLUP_KEY_COLS
+from settings import (
+    RETENTION_ARCHIVE_DIR,
+    RETENTION_ARCHIVE_FORMAT,
+    RETENTION_BATCH_SIZE,
+    RETENTION_DAYS,
+    RETENTION_INTERVAL_SEC,
+    RETENTION_ROLLUP_DAILY_AFTER_DAYS,
+)
+from storage import lock_posts_for_write, upsert_rows
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except Exception:
+    pa = pq = None
+
+_BATCH_PAUSE_SEC = 0.05  # between delete transactions, so ingest writes interleave
+_METRICS = ("n", "score_sum", "score_sq_sum", "pos", "neu", "neg")
+
+
+def retention_horizon() -> Optional[datetime]:
+    """Posts created before this are archived (and not re-ingested). None when retention is off."""
+    if RETENTION_DAYS <= 0:
+        return None
+    return datetime.now(timezone.utc) - timedelta(days=RETENTION_DAYS)
+
+
+def _keywords() -> List[str]:
+    # every post contributes to a rollup row, and keyword leads the rollup primary key
+    sess = ReadSessionLocal()
+    try:
+        return [kw for (kw,) in sess.execute(select(PostRollup.keyword).distinct())]
+    finally:
+        sess.close()
+
+
+def _post_record(p: Post) -> Dict[str, Any]:
+    return {
+        "id": p.id,
+        "keyword": p.keyword,
+        "source": p.source,
+        "author": p.author,
+        "text": p.text,
+        "created_at": p.created_at.isoformat() if p.created_at else None,
+        "sentiment_score": p.sentiment_score,
+        "sentiment_label": p.sentiment_label,
+        "country_code": p.country_code,
+    }
+
+
+def _write_archive(records: List[Dict[str, Any]], archive_dir: str, fmt: str) -> None:
+    """Append records to one file per created_at month."""
+    by_month: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for r in records:
+        by_month[(r["created_at"] or "unknown")[:7]].append(r)
+    os.makedirs(archive_dir, exist_ok=True)
+    for month, recs in by_month.items():
+        if fmt == "parquet":
+            # Parquet files can't be appended to: one part file per batch under the month
+            part_dir = os.path.join(archive_dir, f"posts-{month}")
+            os.makedirs(part_dir, exist_ok=True)
+            path = os.path.join(part_dir, f"part-{time.time_ns()}.parquet")
+            pq.write_table(pa.Table.from_pylist(recs), path, compression="zstd")
+        else:
+            # each append is its own gzip member; gzip.open reads them back as one stream
+            with gzip.open(os.path.join(archive_dir, f"posts-{month}.jsonl.gz"), "at", encoding="utf-8") as f:
+                for r in recs:
+                    f.write(json.dumps(r, ensure_ascii=False) + "\n")
+
+
+def archive_old_posts(horizon: datetime, archive_dir: str = RETENTION_ARCHIVE_DIR,
+                      fmt: str = RETENTION_ARCHIVE_FORMAT, batch_size: int = RETENTION_BATCH_SIZE) -> int:
+    """Archive + delete posts created before horizon, oldest first, one short transaction per batch."""
+    if fmt == "parquet" and pq is None:
+        print("[retention] pyarrow not installed, archiving as jsonl")
+        fmt = "jsonl"
+    batch_size = max(1, int(batch_size))
+    total = 0
+    keywords = _keywords()
+    sess = SessionLocal()
+    try:
+        for kw in keywords:
+            while True:
+                lock_posts_for_write(sess)
+                batch = sess.execute(
+                    select(Post)
+                    .where(Post.keyword == kw, Post.created_at < horizon)
+                    .order_by(Post.created_at)
+                    .limit(batch_size)
+                ).scalars().all()
+                if not batch:
+                    sess.commit()
+                    break
+                _write_archive([_post_record(p) for p in batch], archive_dir, fmt)
+                # plain delete: the rollups keep counting these posts
+                ids = [p.id for p in batch]
+                sess.execute(delete(Post).where(Post.id.in_(ids)))
+                # their dedup signatures (and duplicates linked to them) go too
+                sess.execute(delete(PostSignature).where(
+                    or_(PostSignature.post_id.in_(ids), PostSignature.canonical_id.in_(ids))))
+                sess.commit()
+                total += len(batch)
+                if len(batch) < batch_size:
+                    break
+                time.sleep(_BATCH_PAUSE_SEC)
+    finally:
+        sess.close()
+    return total
+
+
+def downsample_rollups(before: datetime) -> int:
+    """Merge hourly rollup rows older than `before` (floored to a day) into their day bucket."""
+    day = before.astimezone(timezone.utc).replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+    table = PostRollup.__table__
+    delete_stmt = table.delete().where(*[table.c[c] == bindparam(f"k_{c}") for c in ROLLUP_KEY_COLS])
+    merged = 0
+    keywords = _keywords()
+    sess = SessionLocal()
+    try:
+        for kw in keywords:
+            lock_posts_for_write(sess)
+            hourly = [
+                r for r in sess.execute(
+                    select(table).where(table.c.keyword == kw, table.c.bucket < day)
+                ).mappings()
+                if r["bucket"].hour or r["bucket"].minute
+            ]
+            if not hourly:
+                sess.commit()
+                continue
+            acc: Dict[tuple, List[float]] = defaultdict(lambda: [0, 0.0, 0.0, 0, 0, 0])
+            for r in hourly:
+                m = acc[(kw, r["bucket"].replace(hour=0, minute=0), r["country_code"], r["source"])]
+                for i, name in enumerate(_METRICS):
+                    m[i] += r[name]
+            days = [{**dict(zip(ROLLUP_KEY_COLS, k)), **dict(zip(_METRICS, m))} for k, m in acc.items()]
+            upsert_rows(sess, table, days, ROLLUP_KEY_COLS, accumulate=True)
+            sess.execute(delete_stmt, [{f"k_{c}": r[c] for c in ROLLUP_KEY_COLS} for r in hourly])
+            sess.commit()
+            merged += len(hourly)
+    finally:
+        sess.close()
+    return merged
+
+
+def run_retention() -> Dict[str, Any]:
+    """One compaction pass; returns what it did."""
+    started = time.perf_counter()
+    out: Dict[str, Any] = {"archived": 0, "rollups_merged": 0}
+    horizon = retention_horizon()
+    if horizon is not None:
+        out["archived"] = archive_old_posts(horizon)
+    if RETENTION_ROLLUP_DAILY_AFTER_DAYS > 0:
+        out["rollups_merged"] = downsample_rollups(
+            datetime.now(timezone.utc) - timedelta(days=RETENTION_ROLLUP_DAILY_AFTER_DAYS))
+    out["elapsed_ms"] = round((time.perf_counter() - started) * 1000)
+    out["finished_at"] = datetime.now(timezone.utc).isoformat()
+    return out
+
+
+class RetentionJob:
+    """Background thread running run_retention() every interval_sec (first pass at start)."""
+
+    def __init__(self, interval_sec: int = RETENTION_INTERVAL_SEC):
+        self.interval_sec = int(interval_sec)
+        self.last_run: Optional[Dict[str, Any]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _loop(self):
+        while True:
+            try:
+                self.last_run = run_retention()
+                if self.last_run["archived"] or self.last_run["rollups_merged"]:
+                    print("[retention]", self.last_run)
+            except Exception as e:
+                print("[retention][error]", repr(e))
+            if self._stop.wait(self.interval_sec):
+                return
+
+    def start(self):
+        enabled = RETENTION_DAYS > 0 or RETENTION_ROLLUP_DAILY_AFTER_DAYS > 0
+        if self._thread or self.interval_sec <= 0 or not enabled:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="retention", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+
+retention_job = RetentionJob()
+
+
+if __name__ == "__main__":
+    from models import init_db
+    init_db()
+    print("[retention]", run_retention())
@@ -0,0 +1,267 @@
+# backend/retrieval.py
+"""
+Context selection for /api/chat: an in-memory BM25 index per keyword picks the
+posts most relevant to the user's message (and recent user turns) instead of
+sending the newest slice of the window.
+
+Indexes are built on the first chat about a keyword and then kept current: the
+ingest path adds every stored chunk to an already-loaded index, and each chat
+reconciles the window's ids with the database (loading only posts it hasn't
+seen, dropping ones that were deleted), so posts written by other processes
+show up too. Countries named in the message match posts inferred to be from
+there, via a pseudo-term per country. Selection fills a token budget, optionally
+round-robin across (country, sentiment) strata so one group can't crowd out the rest.
+"""
+import math
+import re
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from country_matcher import matcher as country_matcher, tokenize
+from models import Post
+from queries import window_ids_stmt
+from settings import (
+    CHAT_CONTEXT_MAX_POSTS,
+    CHAT_CONTEXT_TOKENS,
+    CHAT_SNIPPET_CHARS,
+    CHAT_STRATIFY,
+    RETRIEVAL_MAX_DOCS_PER_KEYWORD,
+    RETRIEVAL_MAX_KEYWORDS,
+)
+from storage import chunked
+
+_K1, _B = 1.2, 0.75
+_HISTORY_WEIGHT = 0.5  # earlier user turns count half as much as the current message
+_HISTORY_TURNS = 4
+_LINE_OVERHEAD_TOKENS = 8  # "- [US][negative] " prefix and newline
+_STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from has have how i in is it its me my of on or "
+    "our so than that the their them there these they this to was we were what when where which who "
+    "why will with you your about any more most some people think say said".split()
+)
+_SUFFIX_RE = re.compile(r"(?:ing|ies|es|s|ed)$")
+
+
+def _terms(text: Optional[str]) -> List[str]:
+    """tokenize() minus stopwords, with a light plural/-ing/-ed strip so "chargers" meets "charger"."""
+    out = []
+    for t in tokenize(text):
+        if t in _STOPWORDS or len(t) < 2:
+            continue
+        if len(t) > 4 and not t.isdigit():
+            t = _SUFFIX_RE.sub("", t)
+        out.append(t)
+    return out
+
+
+def _cc_term(cc: str) -> str:
+    return f"cc:{cc.lower()}"  # can't collide with tokenize() output ([a-z0-9]+)
+
+
+def _aware(dt: datetime) -> datetime:
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+@dataclass
+class _Doc:
+    created_at: datetime
+    country_code: Optional[str]
+    label: str
+    source: Optional[str]
+    snippet: str
+    tf: Counter
+    length: int
+
+
+class _KeywordIndex:
+    def __init__(self):
+        self.docs: Dict[str, _Doc] = {}
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.total_len = 0
+
+    def add(self, pid: str, text: Optional[str], created_at: datetime, country_code: Optional[str],
+            label: Optional[str], source: Optional[str]):
+        if pid in self.docs:
+            self.remove(pid)
+        terms = _terms(text)
+        if country_code:
+            terms.append(_cc_term(country_code))
+        tf = Counter(terms)
+        snippet = " ".join((text or "").split())[:CHAT_SNIPPET_CHARS]
+        self.docs[pid] = _Doc(_aware(created_at), country_code, label or "neutral", source, snippet, tf, len(terms))
+        for term, n in tf.items():
+            self.postings[term][pid] = n
+        self.total_len += len(terms)
+
+    def remove(self, pid: str):
+        doc = self.docs.pop(pid, None)
+        if doc is None:
+            return
+        for term in doc.tf:
+            post = self.postings.get(term)
+            if post is not None:
+                post.pop(pid, None)
+                if not post:
+                    del self.postings[term]
+        self.total_len -= doc.length
+
+    def trim(self, max_docs: int):
+        """Drop the oldest posts beyond max_docs."""
+        if len(self.docs) <= max_docs:
+            return
+        for pid in sorted(self.docs, key=lambda p: self.docs[p].created_at)[:len(self.docs) - max_docs]:
+            self.remove(pid)
+
+    def bm25(self, query: Dict[str, float], in_window: Set[str]) -> Dict[str, float]:
+        n = len(self.docs)
+        if not n:
+            return {}
+        avgdl = max(1.0, self.total_len / n)
+        scores: Dict[str, float] = defaultdict(float)
+        for term, weight in query.items():
+            post = self.postings.get(term)
+            if not post:
+                continue
+            df = len(post)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for pid, tf in post.items():
+                if pid not in in_window:
+                    continue
+                dl = self.docs[pid].length
+                scores[pid] += weight * idf * tf * (_K1 + 1) / (tf + _K1 * (1 - _B + _B * dl / avgdl))
+        return scores
+
+
+def _query_terms(message: str, history: Iterable[Dict[str, Any]]) -> Dict[str, float]:
+    q: Dict[str, float] = defaultdict(float)
+    turns = [m.get("content") or "" for m in (history or []) if m.get("role") == "user"][-_HISTORY_TURNS:]
+    for text, weight in [(t, _HISTORY_WEIGHT) for t in turns] + [(message, 1.0)]:
+        for t in _terms(text):
+            q[t] += weight
+        for _, cc in country_matcher.find_all(text):
+            q[_cc_term(cc)] += weight
+    return dict(q)
+
+
+def _stratified(ranked: List[str], docs: Dict[str, _Doc]) -> List[str]:
+    """Round-robin over (country, label) groups, groups ordered by their best post."""
+    groups: "OrderedDict[Tuple[str, str], List[str]]" = OrderedDict()
+    for pid in ranked:
+        d = docs[pid]
+        groups.setdefault((d.country_code or "", d.label), []).append(pid)
+    out: List[str] = []
+    queues = [iter(g) for g in groups.values()]
+    while queues:
+        alive = []
+        for q in queues:
+            pid = next(q, None)
+            if pid is not None:
+                out.append(pid)
+                alive.append(q)
+        queues = alive
+    return out
+
+
+class RetrievalIndex:
+    def __init__(self, max_keywords: int = RETRIEVAL_MAX_KEYWORDS,
+                 max_docs: int = RETRIEVAL_MAX_DOCS_PER_KEYWORD):
+        self.max_keywords = max(1, int(max_keywords))
+        self.max_docs = max(1, int(max_docs))
+        self._kw: "OrderedDict[str, _KeywordIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add_rows(self, keyword: str, rows: List[Dict[str, Any]]):
+        """Ingest hook: index freshly stored rows, only for keywords someone is chatting about."""
+        with self._lock:
+            idx = self._kw.get(keyword)
+            if idx is None:
+                return
+            for r in rows:
+                if r.get("id"):
+                    idx.add(r["id"], r.get("text"), r["created_at"], r.get("country_code"),
+                            r.get("sentiment_label"), r.get("source"))
+            idx.trim(self.max_docs)
+
+    def _sync(self, sess: Session, keyword: str, cutoff: datetime) -> Tuple[_KeywordIndex, Set[str]]:
+        """Bring the keyword's index in line with the window in the DB; returns (index, window ids)."""
+        window = {pid for (pid,) in sess.execute(window_ids_stmt(keyword, cutoff))}
+        with self._lock:
+            idx = self._kw.get(keyword)
+            if idx is None:
+                idx = self._kw[keyword] = _KeywordIndex()
+                while len(self._kw) > self.max_keywords:
+                    self._kw.popitem(last=False)
+            self._kw.move_to_end(keyword)
+            missing = [pid for pid in window if pid not in idx.docs]
+            cutoff = _aware(cutoff)
+            gone = [pid for pid, d in idx.docs.items() if d.created_at >= cutoff and pid not in window]
+            for pid in gone:
+                idx.remove(pid)
+        loaded = []
+        for part in chunked(missing, 500):
+            loaded.extend(sess.execute(
+                select(Post.id, Post.text, Post.created_at, Post.country_code, Post.sentiment_label, Post.source)
+                .where(Post.id.in_(part))
+            ).all())
+        with self._lock:
+            for row in loaded:
+                idx.add(*row)
+            idx.trim(self.max_docs)
+        return idx, window
+
+    def select_context(self, sess: Session, keyword: str, cutoff: datetime, message: str,
+                       history: Optional[List[Dict[str, Any]]] = None,
+                       budget_tokens: int = CHAT_CONTEXT_TOKENS, max_posts: int = CHAT_CONTEXT_MAX_POSTS,
+                       stratify: bool = CHAT_STRATIFY) -> Dict[str, Any]:
+        """
+        Posts for the chat prompt, most relevant first, within budget_tokens (~4 chars/token).
+        Falls back to the newest posts when nothing matches the message.
+        Returns {"posts": [...], "stats": window totals, "strategy": "bm25" | "recent"}.
+        """
+        idx, window = self._sync(sess, keyword, cutoff)
+        with self._lock:
+            window = {pid for pid in window if pid in idx.docs}  # trimmed ones are out of reach
+            scores = idx.bm25(_query_terms(message, history or []), window)
+            if scores:
+                ranked = sorted(scores, key=lambda p: (-scores[p], p))
+                strategy = "bm25"
+            else:
+                ranked = sorted(window, key=lambda p: idx.docs[p].created_at, reverse=True)
+                strategy = "recent"
+            if stratify:
+                ranked = _stratified(ranked, idx.docs)
+            posts, used = [], 0
+            for pid in ranked:
+                d = idx.docs[pid]
+                cost = len(d.snippet) // 4 + _LINE_OVERHEAD_TOKENS
+                if len(posts) >= max_posts or used + cost > budget_tokens:
+                    break
+                used += cost
+                posts.append({
+                    "id": pid,
+                    "text": d.snippet,
+                    "sentiment_label": d.label,
+                    "country_code": d.country_code,
+                    "source": d.source,
+                    "created_at": d.created_at.isoformat(),
+                    "score": round(scores.get(pid, 0.0), 4),
+                })
+            labels = Counter(idx.docs[pid].label for pid in window)
+            countries = Counter(idx.docs[pid].country_code for pid in window if idx.docs[pid].country_code)
+        stats = {
+            "n": len(window),
+            "positive": labels.get("positive", 0),
+            "neutral": labels.get("neutral", 0),
+            "negative": labels.get("negative", 0),
+            "top_countries": countries.most_common(5),
+        }
+        return {"posts": posts, "stats": stats, "strategy": strategy, "tokens": used}
+
+
+retrieval_index = RetrievalIndex()
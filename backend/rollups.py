@@ -0,0 +1,243 @@
+# backend/rollups.py
+"""
+Hourly rollups (post_rollups) behind /api/geo, /api/timeseries and /api/compare:
+reads are O(buckets) instead of O(posts). The partial hour at the start of a
+window is read from raw posts so results match a scan of the window exactly.
+The *_many variants answer several keywords with one grouped query each.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from models import Post, PostRollup
+
+ROLLUP_KEY_COLS = ("keyword", "bucket", "country_code", "source")
+ROLLUP_SOURCE_COLS = ("keyword", "created_at", "country_code", "source", "sentiment_score", "sentiment_label")
+_METRICS = ("n", "score_sum", "score_sq_sum", "pos", "neu", "neg")
+
+
+def _naive_utc(dt: datetime) -> datetime:
+    return dt.astimezone(timezone.utc).replace(tzinfo=None) if dt.tzinfo else dt
+
+
+def hour_floor(dt: datetime) -> datetime:
+    return _naive_utc(dt).replace(minute=0, second=0, microsecond=0)
+
+
+def hour_ceil(dt: datetime) -> datetime:
+    floor = hour_floor(dt)
+    return floor if floor == _naive_utc(dt) else floor + timedelta(hours=1)
+
+
+def _label_col(label: Optional[str]) -> str:
+    lab = str(label or "")
+    return "pos" if lab.startswith("pos") else "neg" if lab.startswith("neg") else "neu"
+
+
+def rollup_deltas(old_rows: Iterable[Dict[str, Any]], new_rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Net rollup change for replacing old_rows with new_rows (post dicts with
+    ROLLUP_SOURCE_COLS). Overwritten posts subtract their previous contribution.
+    """
+    acc: Dict[Tuple, List[float]] = defaultdict(lambda: [0, 0.0, 0.0, 0, 0, 0])
+
+    def add(r: Dict[str, Any], sign: int):
+        key = (r["keyword"], hour_floor(r["created_at"]), r.get("country_code") or "", r.get("source") or "")
+        score = float(r.get("sentiment_score") or 0.0)
+        m = acc[key]
+        m[0] += sign
+        m[1] += sign * score
+        m[2] += sign * score * score
+        m[3 + ("pos", "neu", "neg").index(_label_col(r.get("sentiment_label")))] += sign
+
+    for r in old_rows:
+        add(r, -1)
+    for r in new_rows:
+        add(r, +1)
+    return [
+        {**dict(zip(ROLLUP_KEY_COLS, key)), **dict(zip(_METRICS, m))}
+        for key, m in acc.items()
+        if any(m)
+    ]
+
+
+# ---------------------------
+# Reads
+# ---------------------------
+def geo_rollup_stmt(kw: str, since_bucket: datetime) -> Select:
+    return (
+        select(
+            PostRollup.country_code.label("cc"),
+            func.sum(PostRollup.n).label("n"),
+            func.sum(PostRollup.score_sum).label("score_sum"),
+        )
+        .where(PostRollup.keyword == kw, PostRollup.country_code > "", PostRollup.bucket >= since_bucket)
+        .group_by(PostRollup.country_code)
+    )
+
+
+def geo_edge_stmt(kw: str, cutoff: datetime, until: datetime) -> Select:
+    """Raw posts in the partial first hour of the window [cutoff, until)."""
+    return (
+        select(
+            Post.country_code.label("cc"),
+            func.count().label("n"),
+            func.sum(Post.sentiment_score).label("score_sum"),
+        )
+        .where(
+            Post.keyword == kw,
+            Post.country_code.isnot(None),
+            Post.created_at >= cutoff,
+            Post.created_at < until,
+        )
+        .group_by(Post.country_code)
+    )
+
+
+def geo_many_rollup_stmt(kws: Sequence[str], since_bucket: datetime) -> Select:
+    """geo_rollup_stmt for several keywords at once: GROUP BY keyword, country_code."""
+    return (
+        select(
+            PostRollup.keyword,
+            PostRollup.country_code.label("cc"),
+            func.sum(PostRollup.n).label("n"),
+            func.sum(PostRollup.score_sum).label("score_sum"),
+        )
+        .where(PostRollup.keyword.in_(kws), PostRollup.country_code > "", PostRollup.bucket >= since_bucket)
+        .group_by(PostRollup.keyword, PostRollup.country_code)
+    )
+
+
+def geo_many_edge_stmt(kws: Sequence[str], cutoff: datetime, until: datetime) -> Select:
+    return (
+        select(
+            Post.keyword,
+            Post.country_code.label("cc"),
+            func.count().label("n"),
+            func.sum(Post.sentiment_score).label("score_sum"),
+        )
+        .where(
+            Post.keyword.in_(kws),
+            Post.country_code.isnot(None),
+            Post.created_at >= cutoff,
+            Post.created_at < until,
+        )
+        .group_by(Post.keyword, Post.country_code)
+    )
+
+
+def _geo_points(acc: Dict[str, List[float]]) -> List[Dict[str, Any]]:
+    return [
+        {"cc": cc, "n": int(n), "avg": s / n}
+        for cc, (n, s) in sorted(acc.items())
+        if n > 0
+    ]
+
+
+def geo_from_rollups(sess: Session, kw: str, cutoff: datetime) -> List[Dict[str, Any]]:
+    """[{cc, n, avg}] for keyword since cutoff; same numbers as aggregating raw posts."""
+    first_full = hour_ceil(cutoff)
+    acc: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0])
+    rows = list(sess.execute(geo_rollup_stmt(kw, first_full)))
+    if first_full != _naive_utc(cutoff):
+        rows += list(sess.execute(geo_edge_stmt(kw, cutoff, first_full)))
+    for cc, n, score_sum in rows:
+        acc[cc][0] += int(n or 0)
+        acc[cc][1] += float(score_sum or 0.0)
+    return _geo_points(acc)
+
+
+def geo_from_rollups_many(sess: Session, kws: Sequence[str], cutoff: datetime) -> Dict[str, List[Dict[str, Any]]]:
+    """keyword -> geo_from_rollups(), from one grouped query (plus one for the partial first hour)."""
+    if not kws:
+        return {}
+    first_full = hour_ceil(cutoff)
+    acc: Dict[str, Dict[str, List[float]]] = {kw: defaultdict(lambda: [0, 0.0]) for kw in kws}
+    rows = list(sess.execute(geo_many_rollup_stmt(kws, first_full)))
+    if first_full != _naive_utc(cutoff):
+        rows += list(sess.execute(geo_many_edge_stmt(kws, cutoff, first_full)))
+    for kw, cc, n, score_sum in rows:
+        acc[kw][cc][0] += int(n or 0)
+        acc[kw][cc][1] += float(score_sum or 0.0)
+    return {kw: _geo_points(a) for kw, a in acc.items()}
+
+
+def timeseries_stmt(kw: str, since_bucket: datetime, cc: Optional[str] = None) -> Select:
+    stmt = select(
+        PostRollup.bucket,
+        func.sum(PostRollup.n).label("n"),
+        func.sum(PostRollup.score_sum).label("score_sum"),
+        func.sum(PostRollup.score_sq_sum).label("score_sq_sum"),
+        func.sum(PostRollup.pos).label("pos"),
+        func.sum(PostRollup.neu).label("neu"),
+        func.sum(PostRollup.neg).label("neg"),
+    ).where(PostRollup.keyword == kw, PostRollup.bucket >= since_bucket)
+    if cc:
+        stmt = stmt.where(PostRollup.country_code == cc)
+    return stmt.group_by(PostRollup.bucket).order_by(PostRollup.bucket)
+
+
+def timeseries_many_stmt(kws: Sequence[str], since_bucket: datetime) -> Select:
+    """timeseries_stmt for several keywords at once: GROUP BY keyword, bucket."""
+    return select(
+        PostRollup.keyword,
+        PostRollup.bucket,
+        func.sum(PostRollup.n).label("n"),
+        func.sum(PostRollup.score_sum).label("score_sum"),
+        func.sum(PostRollup.score_sq_sum).label("score_sq_sum"),
+        func.sum(PostRollup.pos).label("pos"),
+        func.sum(PostRollup.neu).label("neu"),
+        func.sum(PostRollup.neg).label("neg"),
+    ).where(
+        PostRollup.keyword.in_(kws), PostRollup.bucket >= since_bucket,
+    ).group_by(PostRollup.keyword, PostRollup.bucket).order_by(PostRollup.keyword, PostRollup.bucket)
+
+
+def _add_bucket(acc: Dict[datetime, List[float]], row, bucket: str):
+    t = row.bucket if bucket == "hour" else row.bucket.replace(hour=0)
+    m = acc.setdefault(t, [0, 0.0, 0.0, 0, 0, 0])
+    for i, name in enumerate(_METRICS):
+        m[i] += getattr(row, name) or 0
+
+
+def timeseries(sess: Session, kw: str, cutoff: datetime, bucket: str = "hour",
+               cc: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Per-hour (or per-day) points since cutoff, bucket-aligned: the hour containing
+    cutoff is included whole. Each point: t, n, avg, std, pos, neu, neg.
+    """
+    acc: Dict[datetime, List[float]] = {}
+    for row in sess.execute(timeseries_stmt(kw, hour_floor(cutoff), cc)):
+        _add_bucket(acc, row, bucket)
+    return _series_points(acc)
+
+
+def timeseries_many(sess: Session, kws: Sequence[str], cutoff: datetime,
+                    bucket: str = "hour") -> Dict[str, List[Dict[str, Any]]]:
+    """keyword -> timeseries(), from one grouped query."""
+    if not kws:
+        return {}
+    accs: Dict[str, Dict[datetime, List[float]]] = {kw: {} for kw in kws}
+    for row in sess.execute(timeseries_many_stmt(kws, hour_floor(cutoff))):
+        _add_bucket(accs[row.keyword], row, bucket)
+    return {kw: _series_points(acc) for kw, acc in accs.items()}
+
+
+def _series_points(acc: Dict[datetime, List[float]]) -> List[Dict[str, Any]]:
+    points = []
+    for t, (n, s, sq, pos, neu, neg) in sorted(acc.items()):
+        if n <= 0:
+            continue
+        mean = s / n
+        points.append({
+            "t": t.replace(tzinfo=timezone.utc).isoformat(),
+            "n": int(n),
+            "avg": mean,
+            "std": max(0.0, sq / n - mean * mean) ** 0.5,
+            "pos": int(pos), "neu": int(neu), "neg": int(neg),
+        })
+    return points
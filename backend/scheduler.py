@@ -0,0 +1,137 @@
+# backend/scheduler.py
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from jobqueue import job_queue
+from models import ReadSessionLocal
+from settings import (
+    INGEST_REFRESH_INTERVAL_SEC,
+    INGEST_WORKERS,
+    INGEST_TRACK_TTL_SEC,
+)
+from worker import run_jobs
+
+
+class IngestScheduler:
+    """
+    Keeps a registry of tracked keywords and feeds refresh jobs into the durable queue
+    (jobqueue.py), which worker threads here and/or worker.py processes run.
+    - track(): register/touch a keyword (called on every search)
+    - enqueue(): queue a refresh job now; a keyword never has two pending jobs
+    - a ticker re-enqueues tracked keywords older than the refresh interval
+    """
+
+    def __init__(self, interval_sec: int = INGEST_REFRESH_INTERVAL_SEC,
+                 workers: int = INGEST_WORKERS, track_ttl_sec: int = INGEST_TRACK_TTL_SEC):
+        self.interval_sec = max(1, int(interval_sec))
+        self.workers = max(0, int(workers))
+        self.track_ttl_sec = int(track_ttl_sec)
+        self._lock = threading.Lock()
+        self._tracked: Dict[str, Dict[str, Any]] = {}
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+
+    # --- registry ---
+    def track(self, keyword: str, sources: List[str], engine: str = "auto") -> bool:
+        """Register a keyword (or refresh its settings). Returns True if it was not tracked before."""
+        with self._lock:
+            entry = self._tracked.get(keyword)
+            is_new = entry is None
+            if is_new:
+                entry = self._tracked[keyword] = {"last_refreshed": None}
+            entry.update(sources=list(sources), engine=engine, last_requested=time.time())
+            return is_new
+
+    def freshness(self, keyword: str) -> Optional[datetime]:
+        """When the keyword's last refresh finished, as of the last tick or job poll."""
+        with self._lock:
+            entry = self._tracked.get(keyword)
+            return entry["last_refreshed"] if entry else None
+
+    def tracked(self) -> List[str]:
+        with self._lock:
+            return list(self._tracked)
+
+    def _refreshed(self, keyword: str, at: Optional[datetime]):
+        with self._lock:
+            entry = self._tracked.get(keyword)
+            if entry is not None and at is not None and (entry["last_refreshed"] is None or at > entry["last_refreshed"]):
+                entry["last_refreshed"] = at
+
+    # --- jobs ---
+    def enqueue(self, keyword: str, sources: Optional[List[str]] = None,
+                engine: Optional[str] = None) -> Dict[str, Any]:
+        """Blocking (one DB write): call it off the event loop."""
+        with self._lock:
+            entry = dict(self._tracked.get(keyword) or {})
+        return job_queue.enqueue(
+            keyword,
+            sources if sources is not None else entry.get("sources", ["youtube", "news"]),
+            engine or entry.get("engine", "auto"),
+        )
+
+    def job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Blocking (one DB read): call it off the event loop."""
+        job = job_queue.get(job_id)
+        if job and job["status"] == "done":
+            self._refreshed(job["keyword"], job["finished_at"])
+        return job
+
+    # --- threads ---
+    def _tick(self):
+        now = time.time()
+        with self._lock:
+            for kw, entry in list(self._tracked.items()):
+                if now - entry["last_requested"] > self.track_ttl_sec:
+                    del self._tracked[kw]  # nobody is looking at it anymore
+            keywords = list(self._tracked)
+        sess = ReadSessionLocal()
+        try:
+            last = job_queue.last_done(sess, keywords)
+            pending = job_queue.pending(sess, keywords)
+        finally:
+            sess.close()
+        due = []
+        for kw in keywords:
+            self._refreshed(kw, last.get(kw))
+            at = last.get(kw)
+            if kw not in pending and (at is None or now - at.timestamp() >= self.interval_sec):
+                due.append(kw)
+        for kw in due:
+            self.enqueue(kw)
+        job_queue.prune()
+
+    def _ticker_loop(self):
+        tick = min(30.0, self.interval_sec / 2)
+        while not self._stop.wait(tick):
+            try:
+                self._tick()
+            except Exception as e:
+                print("[scheduler][tick-error]", repr(e))
+
+    def start(self, periodic: bool = True):
+        """
+        Start job workers (INGEST_WORKERS threads; none when worker.py runs them); with
+        periodic=True also re-refresh tracked keywords on the interval.
+        """
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            t = threading.Thread(target=run_jobs, args=(self._stop,), name=f"ingest-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        if periodic:
+            t = threading.Thread(target=self._ticker_loop, name="ingest-ticker", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        self._stop.set()
+        job_queue.wake()
+        self._threads = []
+
+
+scheduler = IngestScheduler()
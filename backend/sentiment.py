@@ -0,0 +1,221 @@
+# backend/sentiment.py
+import json
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+from nltk.sentiment.vader import SentimentIntensityAnalyzer
+
+from llm_gateway import LLMGateway, LLMUnavailable, gateway
+from metrics import sentiment_texts, timed
+from sentiment_cache import SentimentCache, sentiment_cache
+from settings import (
+    USE_GEMINI_SENTIMENT,
+    GEMINI_SENTIMENT_MODEL,
+    GEMINI_SENTIMENT_BATCH_SIZE,
+    GEMINI_SENTIMENT_RETRIES,
+    VADER_WORKERS,
+    VADER_POOL_MIN_BATCH,
+)
+
+Score = Tuple[float, str]
+
+LABELS = ("positive", "neutral", "negative")
+
+analyzer = SentimentIntensityAnalyzer()
+
+
+def _vader_label(comp: float) -> str:
+    if comp >= 0.05:
+        return "positive"
+    if comp <= -0.05:
+        return "negative"
+    return "neutral"
+
+
+def _vader_chunk(texts: List[str]) -> List[Score]:
+    """Runs inside pool workers too; each process has its own module-level analyzer."""
+    out = []
+    for t in texts:
+        comp = analyzer.polarity_scores(t or "")["compound"]
+        out.append((comp, _vader_label(comp)))
+    return out
+
+
+class SentimentEngine:
+    """
+    Scores texts in batches. Subclasses implement _score_texts(), returning None for
+    any text they could not score; those go to `fallback` (VADER for LLM engines).
+    """
+    name = "base"
+    model = ""
+
+    def __init__(self, fallback: Optional["SentimentEngine"] = None,
+                 cache: Optional[SentimentCache] = sentiment_cache):
+        self.fallback = fallback
+        self.cache = cache
+
+    def score(self, text: str) -> Score:
+        return self.score_batch([text])[0]
+
+    def score_batch(self, texts: Sequence[str]) -> List[Score]:
+        """Cache lookups first; only the misses reach _score_texts(), then the fallback."""
+        texts = list(texts)
+        if not texts:
+            return []
+        results: List[Optional[Score]] = (
+            self.cache.get_many(self.name, self.model, texts) if self.cache else [None] * len(texts)
+        )
+        todo = [i for i, r in enumerate(results) if r is None]
+        if len(todo) < len(texts):
+            sentiment_texts.inc(self.name, "cache_hit", amount=len(texts) - len(todo))
+        if todo:
+            with timed(f"sentiment_{self.name}"):
+                scored = self._score_texts([texts[i] for i in todo])
+            fresh = [(i, r) for i, r in zip(todo, scored) if r is not None]
+            sentiment_texts.inc(self.name, "scored", amount=len(fresh))
+            for i, r in fresh:
+                results[i] = r
+            if self.cache and fresh:
+                self.cache.put_many(self.name, self.model, [texts[i] for i, _ in fresh], [r for _, r in fresh])
+        missing = [i for i, r in enumerate(results) if r is None]
+        if missing:
+            if self.fallback is None:
+                raise RuntimeError(f"{self.name} could not score {len(missing)} texts and has no fallback")
+            sentiment_texts.inc(self.name, "fallback", amount=len(missing))
+            for i, r in zip(missing, self.fallback.score_batch([texts[i] for i in missing])):
+                results[i] = r
+        return results  # type: ignore[return-value]
+
+    def _score_texts(self, texts: List[str]) -> List[Optional[Score]]:
+        raise NotImplementedError
+
+
+class VaderEngine(SentimentEngine):
+    """VADER compound score; large batches are split across a process pool."""
+    name = "vader"
+    model = "vader"
+
+    def __init__(self, workers: int = VADER_WORKERS, pool_min_batch: int = VADER_POOL_MIN_BATCH,
+                 cache: Optional[SentimentCache] = sentiment_cache):
+        super().__init__(cache=cache)
+        self.workers = max(1, int(workers))
+        self.pool_min_batch = max(1, int(pool_min_batch))
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def _score_texts(self, texts: List[str]) -> List[Optional[Score]]:
+        if self.workers == 1 or len(texts) < self.pool_min_batch:
+            return _vader_chunk(texts)
+        size = -(-len(texts) // (self.workers * 4))  # a few chunks per worker for balance
+        chunks = [texts[i:i + size] for i in range(0, len(texts), size)]
+        out: List[Optional[Score]] = []
+        for part in self._get_pool().map(_vader_chunk, chunks):
+            out.extend(part)
+        return out
+
+
+class GeminiEngine(SentimentEngine):
+    """
+    Packs many texts into one JSON-array prompt per chunk, through the LLM gateway (which
+    retries upstream errors, paces calls with its per-model RPM/TPM buckets and fails fast
+    while its breaker is open). Items the model skipped are re-asked up to `retries` times;
+    texts still unscored fall back to VADER.
+    """
+    name = "gemini"
+
+    def __init__(self, fallback: SentimentEngine, model: str = GEMINI_SENTIMENT_MODEL,
+                 batch_size: int = GEMINI_SENTIMENT_BATCH_SIZE, retries: int = GEMINI_SENTIMENT_RETRIES,
+                 cache: Optional[SentimentCache] = sentiment_cache, llm: LLMGateway = gateway):
+        super().__init__(fallback, cache)
+        self.llm = llm
+        self.model = model
+        self.batch_size = max(1, int(batch_size))
+        self.retries = max(0, int(retries))
+
+    def _prompt(self, texts: List[str]) -> str:
+        items = [{"i": i, "text": t[:1000]} for i, t in enumerate(texts)]
+        return (
+            "Classify the sentiment of each item as one of: positive, neutral, negative. "
+            "Also provide a real-valued score in [-1,1] (negative numbers = negative). "
+            'Return STRICT JSON: an array of {"i":<item index>,"label":"positive|neutral|negative","score":<number>}, '
+            "one entry per item.\n"
+            f"Items: {json.dumps(items, ensure_ascii=False)}"
+        )
+
+    def _call(self, texts: List[str]) -> List[Optional[Score]]:
+        text = self.llm.generate(self.model, self._prompt(texts), json_mode=True, temperature=0.0)
+        data = json.loads((text or "[]").strip())
+        if isinstance(data, dict):  # tolerate {"items": [...]}
+            data = next((v for v in data.values() if isinstance(v, list)), [])
+        out: List[Optional[Score]] = [None] * len(texts)
+        for row in data:
+            try:
+                i = int(row["i"])
+                label = str(row.get("label", "")).lower()
+                score = max(-1.0, min(1.0, float(row.get("score", 0.0))))  # clamp
+            except Exception:
+                continue
+            if 0 <= i < len(texts) and label in LABELS:
+                out[i] = (score, label)
+        return out
+
+    def _score_chunk(self, texts: List[str]) -> List[Optional[Score]]:
+        out: List[Optional[Score]] = [None] * len(texts)
+        todo = list(range(len(texts)))
+        for _ in range(self.retries + 1):
+            try:
+                got = self._call([texts[i] for i in todo])
+            except LLMUnavailable as e:
+                print("[sentiment][gemini-unavailable]", e)
+                break  # the gateway already retried; the rest goes to VADER
+            except Exception as e:
+                print("[sentiment][gemini-error]", repr(e))  # unparsable answer: ask again
+                continue
+            for i, r in zip(todo, got):
+                out[i] = r
+            todo = [i for i in todo if out[i] is None]  # only retry what the model skipped
+            if not todo:
+                break
+        return out
+
+    def _score_texts(self, texts: List[str]) -> List[Optional[Score]]:
+        out: List[Optional[Score]] = [None] * len(texts)
+        if not self.llm.ready(self.model):
+            return out
+        for start in range(0, len(texts), self.batch_size):
+            out[start:start + self.batch_size] = self._score_chunk(texts[start:start + self.batch_size])
+        return out
+
+
+_vader = VaderEngine()
+_gemini = GeminiEngine(fallback=_vader)
+
+
+def get_engine(choice: str = "auto") -> SentimentEngine:
+    """'gemini' | 'vader' | 'auto' (Gemini if enabled+available; otherwise VADER)."""
+    if choice == "gemini":
+        return _gemini
+    if choice == "vader":
+        return _vader
+    if USE_GEMINI_SENTIMENT and gateway.available():
+        return _gemini
+    return _vader
+
+
+def analyze_sentiment_vader(text: str) -> Score:
+    return _vader.score(text)
+
+
+def analyze_sentiment_gemini(text: str) -> Score:
+    return _gemini.score(text)
+
+
+def analyze_sentiment_auto(text: str) -> Score:
+    return get_engine("auto").score(text)
@@ -0,0 +1,160 @@
+# backend/sentiment_cache.py
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, func, select, update
+
+from models import ReadSessionLocal, SentimentCacheEntry, SessionLocal
+from settings import (
+    SENTIMENT_CACHE_ENABLED,
+    SENTIMENT_CACHE_MEM_ITEMS,
+    SENTIMENT_CACHE_MAX_ROWS,
+)
+from storage import chunked, upsert_rows
+
+Score = Tuple[float, str]
+
+_EVICT_CHECK_EVERY = 5000  # rows written between size checks on the table
+
+
+def cache_key(engine: str, model: str, text: str) -> str:
+    """Key for (engine, model, text); text is normalized the same way ingest cleans it."""
+    norm = " ".join((text or "").split())
+    return hashlib.sha256(f"{engine}\x1f{model}\x1f{norm}".encode("utf-8")).hexdigest()
+
+
+class SentimentCache:
+    """
+    Two-tier cache of sentiment results: an in-memory LRU in front of the
+    sentiment_cache table. Shared across keywords; keyed per engine + model.
+    """
+
+    def __init__(self, mem_items: int = SENTIMENT_CACHE_MEM_ITEMS,
+                 max_rows: int = SENTIMENT_CACHE_MAX_ROWS, enabled: bool = SENTIMENT_CACHE_ENABLED):
+        self.enabled = enabled
+        self.mem_items = max(0, int(mem_items))
+        self.max_rows = max(0, int(max_rows))
+        self._mem: "OrderedDict[str, Score]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._written_since_check = 0
+        self.hits = 0
+        self.mem_hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def _remember(self, key: str, value: Score):
+        # caller holds the lock
+        self._mem[key] = value
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.mem_items:
+            self._mem.popitem(last=False)
+
+    def get_many(self, engine: str, model: str, texts: Sequence[str]) -> List[Optional[Score]]:
+        if not self.enabled:
+            return [None] * len(texts)
+        keys = [cache_key(engine, model, t) for t in texts]
+        out: List[Optional[Score]] = [None] * len(texts)
+        cold: Dict[str, List[int]] = {}
+        with self._lock:
+            for i, k in enumerate(keys):
+                v = self._mem.get(k)
+                if v is not None:
+                    self._mem.move_to_end(k)
+                    out[i] = v
+                else:
+                    cold.setdefault(k, []).append(i)
+            self.mem_hits += len(texts) - sum(len(ix) for ix in cold.values())
+
+        if cold:
+            found: Dict[str, Score] = {}
+            sess = ReadSessionLocal()
+            try:
+                for part in chunked(list(cold)):
+                    for key, score, label in sess.execute(
+                        select(SentimentCacheEntry.key, SentimentCacheEntry.sentiment_score,
+                               SentimentCacheEntry.sentiment_label)
+                        .where(SentimentCacheEntry.key.in_(part))
+                    ):
+                        found[key] = (score, label)
+            finally:
+                sess.close()
+            if found:  # only hits take the write lock (to bump last_used for eviction)
+                now = datetime.now(timezone.utc)
+                sess = SessionLocal()
+                try:
+                    for part in chunked(list(found)):
+                        sess.execute(update(SentimentCacheEntry)
+                                     .where(SentimentCacheEntry.key.in_(part))
+                                     .values(last_used=now))
+                    sess.commit()
+                finally:
+                    sess.close()
+            with self._lock:
+                for key, value in found.items():
+                    self._remember(key, value)
+                    for i in cold[key]:
+                        out[i] = value
+
+        n_hit = sum(1 for v in out if v is not None)
+        with self._lock:
+            self.hits += n_hit
+            self.misses += len(texts) - n_hit
+        return out
+
+    def put_many(self, engine: str, model: str, texts: Sequence[str], scores: Sequence[Score]):
+        if not self.enabled or not texts:
+            return
+        now = datetime.now(timezone.utc)
+        rows = {}
+        for t, (score, label) in zip(texts, scores):
+            k = cache_key(engine, model, t)
+            rows[k] = {
+                "key": k, "engine": engine, "model": model,
+                "sentiment_score": score, "sentiment_label": label, "last_used": now,
+            }
+        with self._lock:
+            for k, r in rows.items():
+                self._remember(k, (r["sentiment_score"], r["sentiment_label"]))
+            self._written_since_check += len(rows)
+            check = self._written_since_check >= _EVICT_CHECK_EVERY
+            if check:
+                self._written_since_check = 0
+        sess = SessionLocal()
+        try:
+            upsert_rows(sess, SentimentCacheEntry.__table__, list(rows.values()), ["key"])
+            sess.commit()
+            if check:
+                self._evict(sess)
+        finally:
+            sess.close()
+
+    def _evict(self, sess):
+        """Trim the table back to max_rows, least recently used first."""
+        total = sess.execute(select(func.count()).select_from(SentimentCacheEntry)).scalar() or 0
+        excess = total - self.max_rows
+        if excess <= 0:
+            return
+        oldest = (select(SentimentCacheEntry.key)
+                  .order_by(SentimentCacheEntry.last_used.asc())
+                  .limit(excess)
+                  .scalar_subquery())
+        sess.execute(delete(SentimentCacheEntry).where(SentimentCacheEntry.key.in_(oldest)))
+        sess.commit()
+        with self._lock:
+            self.evicted += excess
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "mem_hits": self.mem_hits,
+                "misses": self.misses,
+                "evicted": self.evicted,
+                "mem_items": len(self._mem),
+            }
+
+
+sentiment_cache = SentimentCache()
@@ -0,0 +1,94 @@
+# backend/storage.py
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Table, select, text
+from sqlalchemy.orm import Session
+
+from models import Post, PostRollup
+from rollups import ROLLUP_KEY_COLS, ROLLUP_SOURCE_COLS, rollup_deltas
+
+UPSERT_CHUNK = 500  # rows per executemany call / IN (...) lookup
+_PG_POSTS_WRITE_LOCK = 0x6769_706F  # pg_advisory_xact_lock key serializing post upserts
+
+
+def _dialect_insert(sess: Session, table: Table):
+    name = sess.get_bind().dialect.name
+    if name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"upsert not supported for dialect {name!r}")
+    return insert(table)
+
+
+def upsert_rows(sess: Session, table: Table, rows: Sequence[Dict[str, Any]],
+                key_cols: Iterable[str], update_cols: Optional[Iterable[str]] = None,
+                chunk_size: int = UPSERT_CHUNK, accumulate: bool = False) -> None:
+    """
+    INSERT ... ON CONFLICT(key) DO UPDATE, executed as one batched statement per chunk.
+    accumulate=True adds the new values onto the stored ones (counters) instead of replacing them.
+    Caller commits.
+    """
+    key_cols = list(key_cols)
+    if not rows:
+        return
+    if update_cols is None:
+        update_cols = [c for c in rows[0] if c not in key_cols]
+    stmt = _dialect_insert(sess, table)
+    update_cols = list(update_cols)
+    if update_cols:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=key_cols,
+            set_={
+                c: (table.c[c] + getattr(stmt.excluded, c)) if accumulate else getattr(stmt.excluded, c)
+                for c in update_cols
+            },
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=key_cols)
+    for part in chunked(rows, chunk_size):
+        sess.execute(stmt, list(part))  # executemany: SQLAlchemy packs these into multi-row VALUES
+
+
+def chunked(seq: Sequence[Any], size: int = UPSERT_CHUNK) -> List[Sequence[Any]]:
+    return [seq[i:i + size] for i in range(0, len(seq), size)]
+
+
+def lock_posts_for_write(sess: Session) -> None:
+    """
+    Serialize transactions that read posts/rollups and then write based on what they
+    saw (rollup deltas, compaction), across threads and processes. SQLite already
+    gets this from BEGIN IMMEDIATE (models.py); Postgres takes a transaction-scoped
+    advisory lock.
+    """
+    if sess.get_bind().dialect.name == "postgresql":
+        sess.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": _PG_POSTS_WRITE_LOCK})
+
+
+def upsert_posts(sess: Session, rows: Iterable[Dict[str, Any]]) -> Tuple[int, int]:
+    """
+    Bulk replacement for per-row sess.merge(Post(...)): one existence check and one
+    INSERT ... ON CONFLICT(id) DO UPDATE per chunk. Like merge, a later row with the
+    same id wins and every column is overwritten. The hourly rollups are adjusted in
+    the same transaction (old contribution out, new one in).
+    Returns (inserted, updated); caller commits.
+    """
+    by_id: Dict[str, Dict[str, Any]] = {}
+    for r in rows:
+        if r.get("id"):
+            by_id[r["id"]] = r
+    if not by_id:
+        return 0, 0
+    lock_posts_for_write(sess)
+    old_rows: List[Dict[str, Any]] = []
+    for part in chunked(list(by_id)):
+        old_rows.extend(
+            row._asdict() for row in sess.execute(
+                select(*[Post.__table__.c[c] for c in ROLLUP_SOURCE_COLS]).where(Post.id.in_(part))
+            )
+        )
+    upsert_rows(sess, Post.__table__, list(by_id.values()), ["id"])
+    upsert_rows(sess, PostRollup.__table__, rollup_deltas(old_rows, by_id.values()),
+                ROLLUP_KEY_COLS, accumulate=True)
+    return len(by_id) - len(old_rows), len(old_rows)
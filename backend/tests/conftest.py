@@ -0,0 +1,46 @@
+# backend/tests/conftest.py
+"""
+Database fixtures. Tests run against a throwaway SQLite file by default; set
+TEST_DATABASE_URL (e.g. postgresql+psycopg://user:pw@localhost/gi_test) to run the
+same tests on PostgreSQL. Tables in that database are emptied between tests.
+
+settings.py / models.py read DATABASE_URL at import, so it is set here first.
+"""
+import os
+import sys
+import tempfile
+
+_TMP = tempfile.TemporaryDirectory(prefix="gi-tests-")
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL") or f"sqlite:///{_TMP.name}/test.db"
+os.environ.setdefault("SQLITE_BUSY_TIMEOUT_MS", "1000")  # lock tests wait this long, not the default 10s
+os.environ.setdefault("ASYNC_DB", "false")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+from sqlalchemy import delete  # noqa: E402
+
+from models import Base, engine, init_db, write_engine  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def db_engine():
+    init_db()
+    yield engine
+    engine.dispose()
+    _TMP.cleanup()
+
+
+@pytest.fixture
+def db(db_engine):
+    """An empty database for each test; yields the engine."""
+    with write_engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(delete(table))
+    yield db_engine
+
+
+@pytest.fixture
+def sqlite_only(db):
+    if db.dialect.name != "sqlite":
+        pytest.skip("SQLite-specific")
+    return db
@@ -0,0 +1,35 @@
+# backend/tests/test_build_gazetteer.py
+from build_gazetteer import build
+from country_map import load_gazetteer
+
+COUNTRIES = [("US", "United States"), ("FR", "France"), ("CA", "Canada"), ("GE", "Georgia")]
+ADMIN1 = [("US.GA", "Georgia"), ("CA.08", "Ontario"), ("US.OR", "Oregon"), ("FR.11", "Île-de-France")]
+CITIES = [("Paris", "FR", 2100000), ("Paris", "US", 25000), ("Springfield", "US", 160000),
+          ("Orléans", "FR", 116000), ("Orleans", "CA", 100000), ("Ontario", "US", 175000),
+          ("Nice", "FR", 340000), ("Ede", "NG", 160000)]
+
+
+def _geonames(cache):
+    cache.mkdir()
+    (cache / "countryInfo.txt").write_text(
+        "#ISO\tISO3\tISO-Numeric\tfips\tCountry\n"
+        + "".join(f"{cc}\tXXX\t0\t{cc}\t{name}\n" for cc, name in COUNTRIES), encoding="utf-8")
+    (cache / "admin1CodesASCII.txt").write_text(
+        "".join(f"{code}\t{name}\t{name}\t{i}\n" for i, (code, name) in enumerate(ADMIN1)), encoding="utf-8")
+    (cache / "cities15000.txt").write_text("".join(
+        "\t".join([str(i), name, name, "", "0", "0", "P", "PPL", cc] + [""] * 5 + [str(pop), "", "", "UTC", ""]) + "\n"
+        for i, (name, cc, pop) in enumerate(CITIES)), encoding="utf-8")
+
+
+def test_build_merges_geonames_under_curated(tmp_path):
+    _geonames(tmp_path / "geo")
+    base, out = tmp_path / "base.tsv", tmp_path / "full.tsv"
+    base.write_text("# curated\nparis\tFR\nspringfield\tUS\n", encoding="utf-8")
+    build(str(base), str(out), "cities15000", 0, str(tmp_path / "geo"))
+    assert load_gazetteer(str(out)) == {
+        "paris": "FR", "springfield": "US",  # curated, first
+        "united states": "US", "france": "FR", "canada": "CA", "georgia": "GE",
+        "ontario": "CA",  # region beats the US city of the same name
+        "oregon": "US", "ile de france": "FR",
+        # skipped: orleans (two similar-sized places), nice (common word), ede (too short)
+    }
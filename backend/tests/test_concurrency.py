@@ -0,0 +1,92 @@
+# backend/tests/test_concurrency.py
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import OperationalError
+
+from models import Post, PostRollup, ReadSessionLocal, SessionLocal, engine
+from settings import SQLITE_BUSY_TIMEOUT_MS
+from storage import upsert_posts
+
+T0 = datetime(2026, 1, 5, 10, 0)
+
+
+def test_sqlite_pragmas(sqlite_only):
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar().lower() == "wal"
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == SQLITE_BUSY_TIMEOUT_MS
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+
+
+def test_reader_does_not_wait_on_writer(sqlite_only):
+    writer = SessionLocal()
+    try:
+        writer.execute(text("SELECT 1"))  # BEGIN IMMEDIATE: holds the write lock
+        reader = ReadSessionLocal()
+        try:
+            t0 = time.perf_counter()
+            assert reader.execute(select(func.count()).select_from(Post)).scalar() == 0
+            assert time.perf_counter() - t0 < SQLITE_BUSY_TIMEOUT_MS / 2000
+        finally:
+            reader.close()
+    finally:
+        writer.close()
+
+
+def test_second_writer_waits_for_busy_timeout(sqlite_only):
+    writer = SessionLocal()
+    try:
+        writer.execute(text("SELECT 1"))
+        other = SessionLocal()
+        try:
+            t0 = time.perf_counter()
+            with pytest.raises(OperationalError, match="locked"):
+                other.execute(text("SELECT 1"))
+            assert time.perf_counter() - t0 >= SQLITE_BUSY_TIMEOUT_MS / 1000 * 0.9
+        finally:
+            other.close()
+    finally:
+        writer.close()
+
+
+def test_concurrent_upserts_keep_rollups_consistent(db):
+    # every thread re-upserts the same ids with its own score: rollup deltas read the
+    # stored row first, so unserialized writers would double-count
+    threads, rounds, ids = 4, 5, 20
+    errors = []
+
+    def work(t):
+        try:
+            for r in range(rounds):
+                sess = SessionLocal()
+                try:
+                    upsert_posts(sess, [
+                        {"id": f"p{i}", "keyword": "kw", "source": "news", "text": "x",
+                         "created_at": T0 + timedelta(minutes=i), "sentiment_score": t / 10,
+                         "sentiment_label": "positive", "country_code": "US"}
+                        for i in range(ids)
+                    ])
+                    sess.commit()
+                finally:
+                    sess.close()
+        except Exception as e:  # surfaced in the main thread
+            errors.append(e)
+
+    pool = [threading.Thread(target=work, args=(t,)) for t in range(threads)]
+    for th in pool:
+        th.start()
+    for th in pool:
+        th.join()
+    assert not errors
+
+    sess = ReadSessionLocal()
+    try:
+        n, score_sum = sess.execute(select(func.sum(PostRollup.n), func.sum(PostRollup.score_sum))).one()
+        stored = sess.execute(select(func.count(), func.sum(Post.sentiment_score))).one()
+    finally:
+        sess.close()
+    assert n == stored[0] == ids
+    assert score_sum == pytest.approx(stored[1])
@@ -0,0 +1,42 @@
+# backend/tests/test_dedup.py
+from dedup import DedupIndex, _KeywordIndex
+
+
+def _index(max_items):
+    return _KeywordIndex(DedupIndex(max_distance=3).bands, max_items)
+
+
+A, B, C = 0, 0xFFFF_FFFF_0000_0000, 0x0000_0000_FFFF_FFFF  # 32 bits apart from each other
+
+
+def test_duplicates_are_evicted_through_the_fifo():
+    idx = _index(3)
+    idx.add("a", A)
+    idx.add("a-dup", A, canonical="a")
+    idx.add("b", B)
+    idx.add("c", C)
+    assert list(idx.order) == ["a-dup", "b", "c"]
+    assert set(idx.by_id) == {"a-dup", "b", "c"}
+    assert idx.find(A, 3) is None  # "a" left the band tables with it
+    for i in range(5):
+        idx.add(f"d{i}", B, canonical="b")
+    assert set(idx.by_id) == set(idx.order) == {"d2", "d3", "d4"}
+    assert not any(idx.tables)
+
+
+TEXT = "the new phone has a great camera and the battery lasts two full days"
+
+
+def test_check_stages_until_add_verdicts(db):
+    dd = DedupIndex(max_distance=3, window_days=0)
+    ids = ["p1", "p2", "p3"]
+    verdicts = dd.check("kw", ids, [TEXT, TEXT.upper(), "completely different words about the weather in town"])
+    assert [c for _, c in verdicts] == [None, "p1", None]  # caught inside the batch
+    # nothing committed (e.g. the ingest transaction rolled back): the index is unchanged
+    assert dd.stats()["signatures"] == 0
+    assert dd.check("kw", ["p4"], [TEXT])[0][1] is None
+
+    dd.add_verdicts("kw", ids, verdicts)
+    assert dd.stats()["signatures"] == 3
+    assert dd.check("kw", ["p5"], [TEXT])[0][1] == "p1"
+    assert dd.check("kw", ["p2"], [TEXT])[0][1] == "p1"  # re-fetch of a dropped id
@@ -0,0 +1,63 @@
+# backend/tests/test_insights.py
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+import app as api
+from llm_gateway import LLMUnavailable, gateway
+from models import SessionLocal
+from settings import GEMINI_SENTIMENT_MODEL
+from storage import upsert_posts
+
+
+@pytest.fixture
+def posts(db):
+    now = datetime.now(timezone.utc)
+    sess = SessionLocal()
+    try:
+        upsert_posts(sess, [
+            {"id": f"p{i}", "keyword": "phone", "source": "news", "text": "the price is great",
+             "created_at": now - timedelta(minutes=i), "sentiment_score": 0.6, "sentiment_label": "positive"}
+            for i in range(5)
+        ])
+        sess.commit()
+    finally:
+        sess.close()
+    api.insights_cache.clear()
+    yield
+    api.insights_cache.clear()
+
+
+def _get():
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://t") as c:
+            return await c.get("/api/insights", params={"q": "phone"})
+    r = asyncio.run(main())
+    assert r.status_code == 200
+    return r.headers["x-insights-model"], r.headers["x-cache"]
+
+
+def test_gemini_failure_is_not_pinned_in_the_cache(posts, monkeypatch):
+    monkeypatch.setattr(api, "INSIGHTS_FALLBACK_TTL_SEC", 0)
+    monkeypatch.setattr(gateway, "ready", lambda model: True)
+
+    def down(*a, **kw):
+        raise LLMUnavailable("breaker open")
+
+    monkeypatch.setattr(gateway, "generate", down)
+    assert _get() == ("heuristic", "miss")
+    assert _get() == ("heuristic", "miss")  # the stand-in was not cached under the Gemini key
+
+    summary = {"summary": "s", "themes": [], "aspects": {}, "quotes": []}
+    monkeypatch.setattr(gateway, "generate", lambda *a, **kw: json.dumps(summary))
+    assert _get() == (GEMINI_SENTIMENT_MODEL, "miss")
+    assert _get() == (GEMINI_SENTIMENT_MODEL, "hit")
+
+
+def test_heuristic_model_is_cached_normally(posts, monkeypatch):
+    monkeypatch.setattr(gateway, "ready", lambda model: False)
+    assert _get() == ("heuristic", "miss")
+    assert _get() == ("heuristic", "hit")
@@ -0,0 +1,35 @@
+# backend/tests/test_llm_gateway.py
+import threading
+
+import pytest
+
+from llm_gateway import FakeBackend, LLMGateway, LLMUnavailable, _ModelLimits
+
+
+def test_tpm_rejection_refunds_the_rpm_token():
+    gw = LLMGateway(backend=FakeBackend(latency_ms=0), max_rate_wait_sec=0.01)
+    lim = gw._models["m"] = _ModelLimits(rpm=60, tpm=600, concurrency=4)
+    lim.tpm.try_acquire(600)  # TPM spent for the next minute
+    rpm_before = lim.rpm._tokens
+    with pytest.raises(LLMUnavailable):
+        gw.generate("m", "x" * 400)
+    assert lim.rpm._tokens == pytest.approx(rpm_before, abs=0.01)
+    assert gw.stats()["models"]["m"]["rate_rejected"] == 1
+
+
+def test_metrics_are_exact_under_concurrency():
+    gw = LLMGateway(backend=FakeBackend(latency_ms=0), retries=0, concurrency=64)
+    threads, calls = 16, 200
+
+    def work():
+        for _ in range(calls):
+            gw.generate("m", "hello")
+
+    pool = [threading.Thread(target=work) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    m = gw.stats()["models"]["m"]
+    assert m["requests"] == m["ok"] == threads * calls
+    assert m["in_flight"] == 0
@@ -0,0 +1,79 @@
+# backend/tests/test_response_cache.py
+import asyncio
+import threading
+import time
+
+import pytest
+
+from response_cache import ResponseCache
+
+
+def _counting_run():
+    calls = []
+
+    async def run(fn, *args):
+        calls.append(fn)
+        return await asyncio.to_thread(fn, *args)
+
+    return run, calls
+
+
+def test_followers_await_the_leader_without_a_thread():
+    cache = ResponseCache("test", ttl_sec=60, max_items=10)
+    run, calls = _counting_run()
+    release = threading.Event()
+
+    def compute():
+        release.wait(5)
+        return {"v": 1}
+
+    async def main():
+        tasks = [asyncio.create_task(cache.get_or_compute("k", compute, run=run)) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        assert len(calls) == 1  # only the leader went to the pool
+        release.set()
+        return await asyncio.gather(*tasks)
+
+    out = asyncio.run(main())
+    assert sorted(status for _, status in out) == ["miss"] + ["shared"] * 4
+    assert all(value == {"v": 1} for value, _ in out)
+    assert asyncio.run(cache.get_or_compute("k", compute, run=run)) == ({"v": 1}, "hit")
+    assert cache.stats()["inflight"] == 0
+
+
+def test_leader_error_reaches_followers_and_is_not_cached():
+    cache = ResponseCache("test", ttl_sec=60, max_items=10)
+    run, calls = _counting_run()
+
+    def boom():
+        raise ValueError("upstream down")
+
+    async def main():
+        return await asyncio.gather(*[cache.get_or_compute("k", boom, run=run) for _ in range(3)],
+                                    return_exceptions=True)
+
+    assert all(isinstance(r, ValueError) for r in asyncio.run(main()))
+    assert len(calls) == 1
+    assert asyncio.run(cache.get_or_compute("k", lambda: 2, run=run)) == (2, "miss")
+
+
+def test_follower_takes_over_when_the_leader_is_cancelled():
+    cache = ResponseCache("test", ttl_sec=60, max_items=10)
+    run, calls = _counting_run()
+
+    def slow():
+        time.sleep(0.2)
+        return 1
+
+    async def main():
+        leader = asyncio.create_task(cache.get_or_compute("k", slow, run=run))
+        await asyncio.sleep(0.05)
+        follower = asyncio.create_task(cache.get_or_compute("k", lambda: 2, run=run))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == (2, "miss")
+    assert len(calls) == 2
@@ -0,0 +1,95 @@
+# backend/tests/test_storage.py
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from models import Post, PostRollup, SessionLocal
+from rollups import hour_floor
+from storage import upsert_posts, upsert_rows
+
+T0 = datetime(2026, 1, 5, 10, 15)
+
+
+def _post(i, **kw):
+    row = {"id": f"p{i}", "keyword": "kw", "source": "news", "author": "a", "text": f"text {i}",
+           "created_at": T0 + timedelta(minutes=i), "sentiment_score": 0.5, "sentiment_label": "positive",
+           "country_code": "US", "aspect_mask": 0}
+    row.update(kw)
+    return row
+
+
+def _upsert(rows):
+    sess = SessionLocal()
+    try:
+        out = upsert_posts(sess, rows)
+        sess.commit()
+        return out
+    finally:
+        sess.close()
+
+
+def _rollups():
+    sess = SessionLocal()
+    try:
+        return {
+            (r.bucket, r.country_code, r.source): (r.n, round(r.score_sum, 6), r.pos, r.neu, r.neg)
+            for r in sess.execute(select(PostRollup).where(PostRollup.keyword == "kw")).scalars()
+        }
+    finally:
+        sess.close()
+
+
+def _post_count():
+    sess = SessionLocal()
+    try:
+        return sess.execute(select(func.count()).select_from(Post)).scalar()
+    finally:
+        sess.close()
+
+
+def test_upsert_posts_is_idempotent(db):
+    rows = [_post(i) for i in range(5)]
+    assert _upsert(rows) == (5, 0)
+    first = _rollups()
+    assert _upsert(rows) == (0, 5)
+    assert _post_count() == 5
+    assert _rollups() == first == {(hour_floor(T0), "US", "news"): (5, 2.5, 5, 0, 0)}
+
+
+def test_upsert_posts_last_duplicate_in_batch_wins(db):
+    assert _upsert([_post(1, sentiment_score=0.1), _post(1, sentiment_score=-0.4, sentiment_label="negative")]) == (1, 0)
+    assert _rollups() == {(hour_floor(T0), "US", "news"): (1, -0.4, 0, 0, 1)}
+
+
+def test_reupsert_moves_rollup_contribution(db):
+    _upsert([_post(1), _post(2)])
+    # p1 changes sentiment, p2 changes country and hour
+    later = T0 + timedelta(hours=2)
+    _upsert([_post(1, sentiment_score=-0.5, sentiment_label="negative"),
+             _post(2, country_code="DE", created_at=later)])
+    assert _rollups() == {
+        (hour_floor(T0), "US", "news"): (1, -0.5, 0, 0, 1),
+        (hour_floor(later), "DE", "news"): (1, 0.5, 1, 0, 0),
+    }
+
+
+def test_rollup_rows_drop_to_zero_not_negative(db):
+    _upsert([_post(1)])
+    _upsert([_post(1, source="youtube")])
+    assert _rollups() == {
+        (hour_floor(T0), "US", "news"): (0, 0.0, 0, 0, 0),
+        (hour_floor(T0), "US", "youtube"): (1, 0.5, 1, 0, 0),
+    }
+
+
+def test_upsert_rows_accumulate_adds_counters(db):
+    key = {"keyword": "kw", "bucket": hour_floor(T0), "country_code": "", "source": ""}
+    delta = {**key, "n": 2, "score_sum": 1.0, "score_sq_sum": 0.5, "pos": 1, "neu": 1, "neg": 0}
+    sess = SessionLocal()
+    try:
+        for _ in range(3):
+            upsert_rows(sess, PostRollup.__table__, [delta], key.keys(), accumulate=True)
+        sess.commit()
+    finally:
+        sess.close()
+    assert _rollups() == {(hour_floor(T0), "", ""): (6, 3.0, 3, 3, 0)}
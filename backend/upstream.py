@@ -0,0 +1,49 @@
+# backend/upstream.py
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from settings import UPSTREAM_MAX_PENDING, UPSTREAM_WORKERS
+
+T = TypeVar("T")
+
+
+class UpstreamBusy(RuntimeError):
+    """Raised when the upstream executor already has its maximum of queued jobs."""
+
+
+class BoundedExecutor:
+    """
+    Thread pool for slow, blocking upstream work (ingest scoring/writes, LLM calls),
+    kept apart from the server's default threadpool. At most workers + max_pending
+    jobs are admitted; beyond that submit() raises UpstreamBusy instead of queueing.
+    """
+
+    def __init__(self, workers: int = UPSTREAM_WORKERS, max_pending: int = UPSTREAM_MAX_PENDING):
+        self.workers = max(1, int(workers))
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="upstream")
+        self._slots = threading.BoundedSemaphore(self.workers + max(0, int(max_pending)))
+
+    def submit(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> "Future[T]":
+        if not self._slots.acquire(blocking=False):
+            raise UpstreamBusy("upstream executor is full")
+        try:
+            # carry the caller's contextvars (per-request stage timings) into the worker
+            fut = self._pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        fut.add_done_callback(lambda _: self._slots.release())
+        return fut
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Await fn(*args, **kwargs) on the pool without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+upstream = BoundedExecutor()
@@ -0,0 +1,115 @@
+# backend/watermarks.py
+"""
+Per-(keyword, source) ingest watermarks, so a live refresh asks upstream only for
+what it hasn't stored yet:
+
+- news:    newest publishedAt seen -> NewsAPI `from`
+- youtube: newest video publishedAt -> search `publishedAfter` (and the time of the
+           last search, which runs at most every YT_SEARCH_MIN_INTERVAL_SEC); per
+           watched video the newest comment stored and the list ETag, so polling a
+           quiet video is one conditional request; page tokens of comment backlogs
+           that one refresh's budget couldn't cover
+
+Fetchers advance a Watermark in memory as they go; callers save() it only after the
+fetched items are committed, so a failed ingest re-fetches instead of losing items.
+"""
+import json
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import IngestWatermark, ReadSessionLocal, SessionLocal
+from settings import YT_WATCH_VIDEOS
+from storage import upsert_rows
+
+
+@dataclass
+class Watermark:
+    keyword: str
+    source: str
+    published_at: Optional[datetime] = None  # naive UTC, like the DB columns
+    searched_at: Optional[datetime] = None
+    etag: Optional[str] = None
+    videos: Dict[str, Dict[str, Any]] = field(default_factory=dict)  # video id -> {published_at, newest, etag}
+    page_tokens: Dict[str, Dict[str, str]] = field(default_factory=dict)  # video id -> {token, until}
+
+    def advance(self, published: Optional[datetime]):
+        if published is not None:
+            published = _naive_utc(published)
+            if self.published_at is None or published > self.published_at:
+                self.published_at = published
+
+    def watch(self, video_id: str, published: Optional[datetime]):
+        """Add a video found by search; only the YT_WATCH_VIDEOS newest stay watched."""
+        if video_id not in self.videos:
+            self.videos[video_id] = {"published_at": rfc3339(published)}
+        if len(self.videos) > YT_WATCH_VIDEOS:
+            keep = sorted(self.videos, key=lambda v: self.videos[v].get("published_at") or "", reverse=True)
+            for vid in keep[YT_WATCH_VIDEOS:]:
+                self.videos.pop(vid, None)
+                self.page_tokens.pop(vid, None)
+
+    def watched(self) -> List[str]:
+        return sorted(self.videos, key=lambda v: self.videos[v].get("published_at") or "", reverse=True)
+
+
+def _naive_utc(dt: datetime) -> datetime:
+    return dt.astimezone(timezone.utc).replace(tzinfo=None) if dt.tzinfo else dt
+
+
+def rfc3339(dt: Optional[datetime]) -> Optional[str]:
+    """Watermark time as upstream APIs take it (YouTube publishedAfter, NewsAPI from)."""
+    return _naive_utc(dt).strftime("%Y-%m-%dT%H:%M:%SZ") if dt else None
+
+
+def load(sess: Session, keyword: str, source: str) -> Watermark:
+    row = sess.execute(
+        select(IngestWatermark).where(IngestWatermark.keyword == keyword, IngestWatermark.source == source)
+    ).scalar_one_or_none()
+    if row is None:
+        return Watermark(keyword, source)
+    return Watermark(
+        keyword, source,
+        published_at=row.published_at,
+        searched_at=row.searched_at,
+        etag=row.etag,
+        videos=json.loads(row.seen_ids or "{}"),
+        page_tokens=json.loads(row.page_tokens or "{}"),
+    )
+
+
+def save(*marks: Watermark):
+    """Persist watermarks in their own transaction (after the items they cover are committed)."""
+    if not marks:
+        return
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "keyword": wm.keyword,
+            "source": wm.source,
+            "published_at": wm.published_at,
+            "searched_at": wm.searched_at,
+            "etag": wm.etag,
+            "seen_ids": json.dumps(wm.videos, sort_keys=True) if wm.videos else None,
+            "page_tokens": json.dumps(wm.page_tokens, sort_keys=True) if wm.page_tokens else None,
+            "updated_at": now,
+        }
+        for wm in marks
+    ]
+    sess = SessionLocal()
+    try:
+        upsert_rows(sess, IngestWatermark.__table__, rows, ["keyword", "source"])
+        sess.commit()
+    finally:
+        sess.close()
+
+
+def load_all(keyword: str, sources: List[str]) -> Dict[str, Watermark]:
+    sess = ReadSessionLocal()
+    try:
+        return {src: load(sess, keyword, src) for src in sources}
+    finally:
+        sess.close()
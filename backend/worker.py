@@ -0,0 +1,141 @@
+# backend/worker.py
+"""
+Ingest workers: lease refresh jobs from the durable queue (jobqueue.py) and run them
+with refresh_keyword() (live fetchers + ingest_live).
+
+    python worker.py                    one process per core (INGEST_WORKER_PROCESSES)
+    python worker.py --processes 4
+    python worker.py --once             drain the queue in this process, then exit
+    python worker.py --failed           list dead-lettered jobs
+    python worker.py --retry-failed     queue them again
+
+Run it next to the API with INGEST_WORKERS=0, so the API only enqueues. Each process
+runs one job at a time, so scoring spreads over cores. A stopped or crashed worker
+loses nothing: its job's lease runs out and another worker runs it again.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from ingest import refresh_keyword
+from jobqueue import job_queue
+from settings import INGEST_JOB_POLL_SEC, INGEST_WORKER_PROCESSES
+
+
+def _owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def run_job(job: Dict[str, Any], owner: str) -> bool:
+    """Run one leased job, renewing the lease meanwhile. True when it finished."""
+    done = threading.Event()
+
+    def heartbeat():
+        while not done.wait(max(1.0, job_queue.lease_sec / 3)):
+            try:
+                if not job_queue.renew(job["id"], owner):
+                    print("[worker][lease-lost]", job["keyword"], job["id"])
+                    return
+            except Exception as e:
+                print("[worker][renew-error]", job["keyword"], repr(e))
+
+    threading.Thread(target=heartbeat, name=f"lease-{job['id'][:8]}", daemon=True).start()
+    try:
+        fetched = refresh_keyword(job["keyword"], job["sources"], engine_choice=job["engine"])
+    except Exception as e:
+        print("[worker][job-error]", job["keyword"], f"attempt {job['attempts']}/{job['max_attempts']}", repr(e))
+        job_queue.fail(job["id"], owner, repr(e))
+        return False
+    finally:
+        done.set()
+    job_queue.finish(job["id"], owner, fetched)
+    return True
+
+
+def run_jobs(stop: threading.Event, owner: Optional[str] = None, once: bool = False) -> int:
+    """Claim and run jobs until `stop` is set (or, with once, the queue is empty). Returns #jobs run."""
+    owner = owner or _owner()
+    n = 0
+    while not stop.is_set():
+        try:
+            job = job_queue.claim(owner)
+        except Exception as e:
+            print("[worker][claim-error]", repr(e))
+            job = None
+        if job is None:
+            if once:
+                break
+            job_queue.wait(INGEST_JOB_POLL_SEC)
+            continue
+        run_job(job, owner)
+        n += 1
+    return n
+
+
+def _process_main():
+    stop = threading.Event()
+    # finish the running job, then exit (a second signal kills: the lease brings the job back)
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    run_jobs(stop)
+
+
+def serve(processes: int):
+    """Keep `processes` worker processes running (restarting any that die) until SIGINT/SIGTERM."""
+    ctx = mp.get_context("spawn")  # fresh interpreters: no DB connections or threads inherited
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    signal.signal(signal.SIGINT, lambda *_: stopping.set())
+    procs: List[Optional[mp.Process]] = [None] * processes
+    print(f"[worker] {processes} processes")
+    while not stopping.is_set():
+        for i, p in enumerate(procs):
+            if p is None or not p.is_alive():
+                if p is not None:
+                    print("[worker][restart]", i, "exit code", p.exitcode)
+                procs[i] = ctx.Process(target=_process_main, name=f"ingest-worker-{i}", daemon=False)
+                procs[i].start()
+        stopping.wait(1.0)
+    print("[worker] stopping after the current jobs")
+    for p in procs:
+        if p is not None and p.is_alive():
+            p.terminate()  # SIGTERM: the child finishes its job first
+    for p in procs:
+        if p is not None:
+            p.join()
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Run ingest jobs from the durable queue.")
+    ap.add_argument("--processes", type=int, default=INGEST_WORKER_PROCESSES, help="0 = one per CPU core")
+    ap.add_argument("--once", action="store_true", help="run queued jobs in this process, then exit")
+    ap.add_argument("--failed", action="store_true", help="list failed (dead-lettered) jobs")
+    ap.add_argument("--retry-failed", nargs="*", metavar="JOB_ID", help="queue failed jobs again (all by default)")
+    args = ap.parse_args(argv)
+
+    from models import init_db
+    init_db()
+    if args.failed:
+        for job in job_queue.failed():
+            print(job["finished_at"].isoformat(), job["id"], job["keyword"], f"attempts={job['attempts']}", job["error"])
+        return 0
+    if args.retry_failed is not None:
+        print("[worker] requeued", job_queue.retry_failed(args.retry_failed or None))
+        return 0
+    if args.once:
+        t0 = time.perf_counter()
+        n = run_jobs(threading.Event(), once=True)
+        print(f"[worker] ran {n} jobs in {time.perf_counter() - t0:.1f}s")
+        return 0
+    serve(max(1, args.processes or os.cpu_count() or 1))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,5 @@
 // frontend/src/App.tsx
-import { useState } from "react";
+import { useEffect, useState } from "react";
 import SentimentMap from "./components/SentimentMap";
 // Comment out these imports if you haven’t created the files yet.
 import SummaryCards from "./components/SummaryCards";
@@ -18,6 +18,7 @@ export default function App() {
   const [geo, setGeo] = useState<any>(null);
   const [loading, setLoading] = useState(false);
   const [selectedCC, setSelectedCC] = useState<string | null>(null);
+  const [series, setSeries] = useState<{ t: string; avg: number }[]>([]);
 
   // Controls
   const [hours, setHours] = useState<number>(168); // 7d default so you see more data
@@ -50,6 +51,17 @@ export default function App() {
     }
   }
 
+  async function waitForJob(jobId: string, timeoutMs = 60000) {
+    const started = Date.now();
+    while (Date.now() - started < timeoutMs) {
+      const job = await fetch(`${API_BASE}/api/jobs/${jobId}`)
+        .then((r) => (r.ok ? r.json() : null))
+        .catch(() => null);
+      if (!job || job.status === "done" || job.status === "failed") return;
+      await new Promise((res) => setTimeout(res, 1000));
+    }
+  }
+
   async function runSearch(q: string, useSample = false) {
     if (!q.trim()) return;
     setLoading(true);
@@ -64,9 +76,30 @@ export default function App() {
       });
       if (useSample) params.append("use_sample", "true");
 
+      // Only the columns the dashboard renders (skips author), largest page
+      const searchParams = new URLSearchParams(params);
+      searchParams.append("limit", "1000");
+      searchParams.append(
+        "fields",
+        "id,source,text,created_at,sentiment_score,sentiment_label,country_code"
+      );
+
+      // Live searches ask the backend scheduler for a refresh; results come
+      // straight from the DB, so wait for the job and then read again.
+      const refreshParams = new URLSearchParams(searchParams);
+      if (!useSample) refreshParams.append("refresh", "true");
+      const first = await fetch(`${API_BASE}/api/search?${refreshParams}`).then(
+        (r) => r.json()
+      );
+      if (first?.job_id) {
+        await waitForJob(first.job_id);
+      }
+
       // Fetch search + geo in parallel
       const [s, g] = await Promise.all([
-        fetch(`${API_BASE}/api/search?${params}`).then((r) => r.json()),
+        first?.job_id
+          ? fetch(`${API_BASE}/api/search?${searchParams}`).then((r) => r.json())
+          : Promise.resolve(first),
         fetch(`${API_BASE}/api/geo?${params}`).then((r) => r.json()),
       ]);
 
@@ -115,29 +148,30 @@ export default function App() {
     { pos: 0, neu: 0, neg: 0 }
   );
 
-  // Time series (avg sentiment per hour)
-  const series = (() => {
-    const m = new Map<string, { sum: number; n: number }>();
-    filteredPosts.forEach((p: any) => {
-      const d = new Date(p.created_at);
-      const bucket = new Date(
-        d.getFullYear(),
-        d.getMonth(),
-        d.getDate(),
-        d.getHours(),
-        0,
-        0
-      );
-      const k = bucket.toISOString();
-      const v = m.get(k) || { sum: 0, n: 0 };
-      v.sum += p.sentiment_score;
-      v.n += 1;
-      m.set(k, v);
+  // Time series (avg sentiment per hour) from the server-side hourly rollups,
+  // so it covers the whole window rather than just the posts page we hold.
+  useEffect(() => {
+    if (!search?.keyword) {
+      setSeries([]);
+      return;
+    }
+    const params = new URLSearchParams({
+      q: search.keyword,
+      hours: String(hours),
+      bucket: "hour",
     });
-    return [...m.entries()]
-      .sort((a, b) => a[0].localeCompare(b[0]))
-      .map(([t, v]) => ({ t, avg: v.sum / v.n }));
-  })();
+    if (selectedCC) params.append("cc", selectedCC);
+    let cancelled = false;
+    fetch(`${API_BASE}/api/timeseries?${params}`)
+      .then((r) => r.json())
+      .then((d) => {
+        if (!cancelled) setSeries(Array.isArray(d?.points) ? d.points : []);
+      })
+      .catch((e) => console.error("timeseries error", e));
+    return () => {
+      cancelled = true;
+    };
+  }, [search, selectedCC, hours]);
 
   return (
     <div className="min-h-screen bg-gray-100">
@@ -211,7 +245,11 @@ export default function App() {
           <div className="text-sm text-gray-600">
             Engine: <b>{search.engine_used ?? engine}</b> • Window:{" "}
             <b>last {hours}h</b> • Returned:{" "}
-            <b>{search.count ?? (search.posts?.length || 0)}</b> posts
+            <b>{search.count ?? (search.posts?.length || 0)}</b>
+            {search.total != null && search.total > search.count
+              ? ` of ${search.total}`
+              : ""}{" "}
+            posts
             {selectedCC ? (
               <>
                 {" "}